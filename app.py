@@ -1,45 +1,55 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import json
 import os
 import sys
 
-# Après la ligne d'import de os et sys
-
-# Affichage des informations de diagnostic
-print("Chemin Python:", sys.path)
-print("Dossier courant:", os.getcwd())
-print("Contenu du dossier:", os.listdir())
-
-# Ajouter le répertoire courant au chemin d'importation
-sys.path.append(os.getcwd())
-
-# Vérifier si le dossier queries existe
-if os.path.exists("queries"):
-    print("Contenu du dossier queries:", os.listdir("queries"))
-else:
-    print("Le dossier queries n'existe pas!")
-    # Tenter de créer le dossier __init__.py si nécessaire
-    os.makedirs("queries", exist_ok=True)
-    with open(os.path.join("queries", "__init__.py"), "w") as f:
-        pass  # Créer un fichier vide
+# Ajouter le répertoire courant au chemin d'importation (une seule fois par processus)
+if os.getcwd() not in sys.path:
+    sys.path.append(os.getcwd())
 
 # Importer les modules de connexion
 from mongodb_connect import MongoDBConnector
 from neo4j_connect import Neo4jConnector
+from queries.async_executor import AsyncQueryExecutor
+from queries.instrumentation import INSTRUMENTATION
+from queries.charts import ChartSpec
+from queries.film_stats import FilmStatsMaterializer
 
-# Importer les modules de requêtes
-try:
-    # Essayer d'importer directement
-    sys.path.append("queries")
-    from queries.mongodb_queries import MongoDBQueries
-    from queries.neo4j_queries import Neo4jQueries
-    queries_imported = True
-    print("✅ Modules de requêtes importés avec succès!")
-except ImportError as e:
-    print(f"❌ Erreur d'importation: {e}")
+@st.cache_resource(show_spinner=False)
+def load_query_modules():
+    """
+    Découvre et importe les modules de requêtes une seule fois par processus
+    
+    Returns:
+        tuple: (MongoDBQueries, Neo4jQueries, QUERY_CACHE), ou (None, None, None) en cas d'échec
+    """
+    # Affichage des informations de diagnostic
+    print("Chemin Python:", sys.path)
+    print("Dossier courant:", os.getcwd())
+    print("Contenu du dossier:", os.listdir())
+    
+    # Vérifier si le dossier queries existe
+    if os.path.exists("queries"):
+        print("Contenu du dossier queries:", os.listdir("queries"))
+    else:
+        print("Le dossier queries n'existe pas!")
+        # Tenter de créer le dossier __init__.py si nécessaire
+        os.makedirs("queries", exist_ok=True)
+        with open(os.path.join("queries", "__init__.py"), "w") as f:
+            pass  # Créer un fichier vide
+    
+    # Importer les modules de requêtes
+    try:
+        # Essayer d'importer directement
+        from queries.mongodb_queries import MongoDBQueries
+        from queries.neo4j_queries import Neo4jQueries
+        from queries.cache import QUERY_CACHE
+        print("✅ Modules de requêtes importés avec succès!")
+        return MongoDBQueries, Neo4jQueries, QUERY_CACHE
+    except ImportError as e:
+        print(f"❌ Erreur d'importation: {e}")
+    
     try:
         # Essayer une autre méthode d'importation
         import importlib.util
@@ -60,16 +70,87 @@ except ImportError as e:
         neo4j_queries = importlib.util.module_from_spec(spec_neo4j)
         spec_neo4j.loader.exec_module(neo4j_queries)
         
-        # Accéder aux classes
-        MongoDBQueries = mongodb_queries.MongoDBQueries
-        Neo4jQueries = neo4j_queries.Neo4jQueries
-        
-        queries_imported = True
         print("✅ Modules de requêtes importés avec la méthode alternative!")
+        return mongodb_queries.MongoDBQueries, neo4j_queries.Neo4jQueries, sys.modules["queries.cache"].QUERY_CACHE
     except Exception as e2:
         print(f"❌ Erreur d'importation alternative: {e2}")
-        queries_imported = False
-        st.warning("Les modules de requêtes n'ont pas été trouvés. Certaines fonctionnalités seront limitées.")
+        return None, None, None
+
+MongoDBQueries, Neo4jQueries, QUERY_CACHE = load_query_modules()
+queries_imported = MongoDBQueries is not None
+if not queries_imported:
+    st.warning("Les modules de requêtes n'ont pas été trouvés. Certaines fonctionnalités seront limitées.")
+
+# Connecteurs et objets de requêtes partagés par toutes les sessions du processus :
+# un seul pool de connexions par base, quel que soit le nombre d'utilisateurs
+@st.cache_resource(show_spinner=False)
+def get_mongo_resources(connection_string=None, local=True):
+    """Retourne le connecteur MongoDB partagé et ses requêtes pour ces paramètres"""
+    connector = MongoDBConnector(connection_string=connection_string, local=local)
+    queries = MongoDBQueries(connector) if queries_imported else None
+    if connector.client:
+        # Statistiques du mode rapide tenues à jour en arrière-plan (une fois par connecteur)
+        FilmStatsMaterializer(connector).schedule()
+    return connector, queries
+
+@st.cache_resource(show_spinner=False)
+def get_neo4j_resources(uri=None, user=None, password=None, local=True):
+    """Retourne le connecteur Neo4j partagé et ses requêtes pour ces paramètres"""
+    connector = Neo4jConnector(uri=uri, user=user, password=password, local=local)
+    queries = Neo4jQueries(connector) if queries_imported else None
+    return connector, queries
+
+@st.cache_resource(show_spinner=False)
+def get_async_executor(mongo_params=None, neo4j_params=None):
+    """Retourne l'exécuteur partagé qui lance en parallèle les requêtes indépendantes d'une page"""
+    mongo = get_mongo_resources(**dict(mongo_params))[0] if mongo_params else None
+    neo4j = get_neo4j_resources(**dict(neo4j_params))[0] if neo4j_params else None
+    return AsyncQueryExecutor(mongo, neo4j)
+
+def session_async_executor():
+    """Exécuteur asynchrone correspondant aux connexions de la session"""
+    def key(params):
+        return tuple(sorted(params.items())) if params is not None else None
+    return get_async_executor(key(st.session_state.mongo_params), key(st.session_state.neo4j_params))
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server(port):
+    """Démarre une seule fois par processus l'endpoint Prometheus /metrics"""
+    return INSTRUMENTATION.serve_prometheus(port=port)
+
+@st.cache_resource(show_spinner=False)
+def get_columnar_queries(path):
+    """Charge une seule fois par processus le moteur colonnaire (répertoire enregistré ou fichier JSON)"""
+    from queries.columnar import ColumnarFilmStore, ColumnarFilmQueries
+    store = ColumnarFilmStore.load(path) if os.path.isdir(path) else ColumnarFilmStore.from_json(path)
+    return ColumnarFilmQueries(store)
+
+def show_chart(chart):
+    """Affiche un graphique déclaratif : le navigateur le dessine à partir de sa spécification Vega-Lite"""
+    st.vega_lite_chart(chart.to_vega_lite(), use_container_width=True)
+
+def runtime_revenue_chart(df):
+    """Nuage durée/revenus avec droite de régression (échantillonné au-delà de MAX_SCATTER_POINTS)"""
+    return ChartSpec("scatter", df, "Runtime (Minutes)", "Revenue (Millions)",
+                     "Corrélation entre durée et revenus des films", trend=True)
+
+def connect_mongo(**params):
+    """Associe la session au connecteur MongoDB partagé (reconnexion immédiate si nécessaire)"""
+    st.session_state.mongo_params = params
+    connector, queries = get_mongo_resources(**params)
+    connector.ensure_connected(max_age=0)
+    st.session_state.mongo_connector = connector
+    st.session_state.mongo_queries = queries
+    return connector
+
+def connect_neo4j(**params):
+    """Associe la session au connecteur Neo4j partagé (reconnexion immédiate si nécessaire)"""
+    st.session_state.neo4j_params = params
+    connector, queries = get_neo4j_resources(**params)
+    connector.ensure_connected(max_age=0)
+    st.session_state.neo4j_connector = connector
+    st.session_state.neo4j_queries = queries
+    return connector
 
 # Titre et description
 st.title("🎬 Exploration et interrogation de bases de données NoSQL")
@@ -82,18 +163,22 @@ Cette application permet d'explorer et d'interroger des données de films stock
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
     "Sélectionnez une page",
-    ["Accueil", "Configuration", "MongoDB - Requêtes", "Neo4j - Requêtes", "Visualisations", "À propos"]
+    ["Accueil", "Configuration", "MongoDB - Requêtes", "Neo4j - Requêtes", "Visualisations", "Diagnostics", "À propos"]
 )
 
-# Variables de session pour stocker les connecteurs
-if 'mongo_connector' not in st.session_state:
-    st.session_state.mongo_connector = None
-if 'neo4j_connector' not in st.session_state:
-    st.session_state.neo4j_connector = None
-if 'mongo_queries' not in st.session_state:
-    st.session_state.mongo_queries = None
-if 'neo4j_queries' not in st.session_state:
-    st.session_state.neo4j_queries = None
+# Variables de session : paramètres de connexion et références vers les ressources partagées
+for key in ('mongo_params', 'neo4j_params', 'mongo_connector', 'neo4j_connector', 'mongo_queries', 'neo4j_queries',
+            'columnar_queries'):
+    if key not in st.session_state:
+        st.session_state[key] = None
+
+# Rattacher la session aux connecteurs partagés (vérification de santé et reconnexion paresseuse)
+if st.session_state.mongo_params is not None:
+    st.session_state.mongo_connector, st.session_state.mongo_queries = get_mongo_resources(**st.session_state.mongo_params)
+    st.session_state.mongo_connector.ensure_connected()
+if st.session_state.neo4j_params is not None:
+    st.session_state.neo4j_connector, st.session_state.neo4j_queries = get_neo4j_resources(**st.session_state.neo4j_params)
+    st.session_state.neo4j_connector.ensure_connected()
 
 # Page d'accueil
 if page == "Accueil":
@@ -129,22 +214,16 @@ elif page == "Configuration":
     
     with mongo_tab1:
         if st.button("Connexion MongoDB locale"):
-            st.session_state.mongo_connector = MongoDBConnector(local=True)
-            if st.session_state.mongo_connector.client:
+            if connect_mongo(connection_string=None, local=True).client:
                 st.success("Connexion à MongoDB locale établie avec succès!")
-                if queries_imported:
-                    st.session_state.mongo_queries = MongoDBQueries(st.session_state.mongo_connector)
             else:
                 st.error("Échec de la connexion à MongoDB locale.")
     
     with mongo_tab2:
         connection_string = st.text_input("Chaîne de connexion MongoDB Atlas", type="password")
         if st.button("Connexion MongoDB Atlas"):
-            st.session_state.mongo_connector = MongoDBConnector(connection_string=connection_string, local=False)
-            if st.session_state.mongo_connector.client:
+            if connect_mongo(connection_string=connection_string, local=False).client:
                 st.success("Connexion à MongoDB Atlas établie avec succès!")
-                if queries_imported:
-                    st.session_state.mongo_queries = MongoDBQueries(st.session_state.mongo_connector)
             else:
                 st.error("Échec de la connexion à MongoDB Atlas.")
     
@@ -161,18 +240,34 @@ elif page == "Configuration":
         if st.button("Importer les données", disabled=not file_exists):
             st.session_state.mongo_connector.import_json_data(json_file)
             st.success("Données importées avec succès!")
-    
+        
+        st.write("Ajouter les champs normalisés (genres, actors, revenue, runtime, metascore) aux documents déjà importés")
+        if st.button("Normaliser les documents existants"):
+            modified = st.session_state.mongo_connector.normalize_existing_documents()
+            st.success(f"{modified} documents normalisés.")
+
+        st.write("Recalculer les statistiques précalculées (collection 'films_stats') utilisées par le mode rapide")
+        if st.button("Recalculer les statistiques"):
+            written = FilmStatsMaterializer(st.session_state.mongo_connector).refresh()
+            st.success(f"{written} compartiments de statistiques écrits.")
+        
+        st.write("Créer les index manquants et vérifier (explain) qu'aucune requête ne parcourt toute la collection")
+        if st.button("Analyser les index"):
+            from queries.index_advisor import IndexAdvisor
+            st.session_state.mongo_connector.ensure_indexes()
+            results = IndexAdvisor(st.session_state.mongo_connector).report()
+            if results["collscan"].eq(True).any():
+                st.warning("Certaines requêtes parcourent toute la collection (COLLSCAN).")
+            st.dataframe(results)
+
     # Configuration Neo4j
     st.subheader("Configuration Neo4j")
     neo4j_tab1, neo4j_tab2 = st.tabs(["Connexion locale", "Connexion cloud"])
     
     with neo4j_tab1:
         if st.button("Connexion Neo4j locale"):
-            st.session_state.neo4j_connector = Neo4jConnector(local=True)
-            if st.session_state.neo4j_connector.graph:
+            if connect_neo4j(uri=None, user=None, password=None, local=True).graph:
                 st.success("Connexion à Neo4j locale établie avec succès!")
-                if queries_imported:
-                    st.session_state.neo4j_queries = Neo4jQueries(st.session_state.neo4j_connector)
             else:
                 st.error("Échec de la connexion à Neo4j locale.")
     
@@ -181,14 +276,25 @@ elif page == "Configuration":
         user = st.text_input("Nom d'utilisateur Neo4j")
         password = st.text_input("Mot de passe Neo4j", type="password")
         if st.button("Connexion Neo4j cloud"):
-            st.session_state.neo4j_connector = Neo4jConnector(uri=uri, user=user, password=password, local=False)
-            if st.session_state.neo4j_connector.graph:
+            if connect_neo4j(uri=uri, user=user, password=password, local=False).graph:
                 st.success("Connexion à Neo4j cloud établie avec succès!")
-                if queries_imported:
-                    st.session_state.neo4j_queries = Neo4jQueries(st.session_state.neo4j_connector)
             else:
                 st.error("Échec de la connexion à Neo4j cloud.")
     
+    # Moteur colonnaire embarqué
+    st.subheader("Moteur colonnaire embarqué (sans serveur)")
+    st.write("Charger les films en colonnes NumPy pour exécuter les requêtes MongoDB sans base de données")
+    columnar_path = st.text_input("Fichier JSON ou répertoire enregistré", "data/movies.json")
+    if st.button("Charger le moteur colonnaire", disabled=not os.path.exists(columnar_path)):
+        st.session_state.columnar_queries = get_columnar_queries(columnar_path)
+        st.success(f"{len(st.session_state.columnar_queries.store)} films chargés en colonnes.")
+    if st.session_state.columnar_queries is not None:
+        columnar_dir = st.text_input("Répertoire d'enregistrement (ouverture instantanée par projection mémoire)",
+                                     "data/movies.columnar")
+        if st.button("Enregistrer le moteur colonnaire"):
+            st.session_state.columnar_queries.store.save(columnar_dir)
+            st.success(f"Moteur colonnaire enregistré dans {columnar_dir}")
+    
     # Import des données dans Neo4j depuis MongoDB
     if (st.session_state.mongo_connector and st.session_state.mongo_connector.client and 
         st.session_state.neo4j_connector and st.session_state.neo4j_connector.graph):
@@ -200,6 +306,17 @@ elif page == "Configuration":
             st.session_state.neo4j_connector.create_constraints_and_indexes()
             st.success("Contraintes et index créés avec succès!")
         
+        st.write("Construire tout le graphe (Film, Actor, Director, Genre) en une seule lecture de MongoDB")
+        graph_workers = st.number_input("Nombre de workers d'écriture", min_value=1, max_value=32, value=4)
+        if st.button("Construire le graphe complet"):
+            counts = st.session_state.neo4j_connector.build_graph(st.session_state.mongo_connector, workers=int(graph_workers))
+            if counts.get("completed"):
+                st.success(f"Graphe construit : {counts['films']} films, {counts['actors']} relations acteur, "
+                           f"{counts['directors']} relations réalisateur, {counts['genres']} relations genre.")
+            else:
+                st.error(f"Échec de la construction du graphe : {counts.get('error')} "
+                         f"({counts.get('films', 0)} films écrits avant l'erreur).")
+        
         st.write("Créer les nœuds Film")
         if st.button("Créer les nœuds Film"):
             st.session_state.neo4j_connector.create_film_nodes(st.session_state.mongo_connector)
@@ -207,14 +324,35 @@ elif page == "Configuration":
         
         st.write("Créer les nœuds Actor et leurs relations")
         if st.button("Créer les nœuds Actor"):
-            st.session_state.neo4j_connector.create_actor_nodes_and_relationships(st.session_state.mongo_connector)
-            st.success("Nœuds Actor et relations créés avec succès!")
+            pair_count, pair_rate = st.session_state.neo4j_connector.create_actor_nodes_and_relationships(st.session_state.mongo_connector)
+            st.success(f"Nœuds Actor et relations créés avec succès! ({pair_count} paires, {pair_rate:.0f} paires/s)")
         
         st.write("Créer les nœuds Director et leurs relations")
         if st.button("Créer les nœuds Director"):
             st.session_state.neo4j_connector.create_director_nodes_and_relationships(st.session_state.mongo_connector)
             st.success("Nœuds Director et relations créés avec succès!")
         
+        st.write("Convertir en nombres l'année, les votes et le revenu des films chargés avant la conversion à l'import")
+        if st.button("Convertir les propriétés des films"):
+            count = st.session_state.neo4j_connector.normalize_film_properties()
+            st.success(f"{count} films mis à jour.")
+        
+        st.write("Créer les nœuds Genre à partir des films déjà présents dans le graphe")
+        if st.button("Créer les nœuds Genre"):
+            linked = st.session_state.neo4j_connector.create_genre_nodes()
+            st.success(f"{linked} films rattachés à leurs genres.")
+        
+        st.write("Détecter les communautés d'acteurs et enregistrer leur identifiant (communityId)")
+        if st.button("Enregistrer les communautés"):
+            count = st.session_state.neo4j_queries.store_actor_communities()
+            st.success(f"{count} acteurs mis à jour.")
+        
+        st.write("Vérifier (EXPLAIN) que les requêtes Cypher partent d'un index")
+        if st.button("Analyser les plans Neo4j"):
+            from queries.index_advisor import GraphIndexAdvisor
+            results = GraphIndexAdvisor(st.session_state.neo4j_connector).report()
+            st.dataframe(results)
+        
         st.write("Ajouter les membres de l'équipe du projet")
         team_members = st.text_input("Noms des membres de l'équipe (séparés par des virgules)")
         if st.button("Ajouter l'équipe"):
@@ -229,14 +367,20 @@ elif page == "Configuration":
 elif page == "MongoDB - Requêtes":
     st.header("Requêtes MongoDB")
     
-    if not st.session_state.mongo_connector or not st.session_state.mongo_connector.client:
+    mongo_ready = bool(st.session_state.mongo_connector and st.session_state.mongo_connector.client)
+    use_columnar = False
+    if st.session_state.columnar_queries is not None:
+        use_columnar = st.checkbox("Utiliser le moteur colonnaire embarqué (sans serveur)", value=not mongo_ready)
+    
+    if not mongo_ready and not use_columnar:
         st.warning("Vous devez d'abord configurer la connexion à MongoDB!")
     elif not queries_imported:
         st.warning("Le module de requêtes MongoDB n'a pas été importé correctement.")
     else:
         # S'assurer que mongo_queries est instancié
-        if st.session_state.mongo_queries is None:
+        if not use_columnar and st.session_state.mongo_queries is None:
             st.session_state.mongo_queries = MongoDBQueries(st.session_state.mongo_connector)
+        mongo_queries = st.session_state.columnar_queries if use_columnar else st.session_state.mongo_queries
         
         # Liste des requêtes disponibles
         query_options = [
@@ -257,40 +401,41 @@ elif page == "MongoDB - Requêtes":
         ]
         
         selected_query = st.selectbox("Sélectionnez une requête", query_options)
+        fast_mode = st.checkbox("Mode rapide (statistiques précalculées de 'films_stats', requêtes 1, 3, 4, 7 et 13)")
         
         if st.button("Exécuter la requête"):
             # Exécuter la requête sélectionnée
             query_num = int(selected_query.split('.')[0])
             
             if query_num == 1:
-                year, count = st.session_state.mongo_queries.query_1_year_with_most_films()
+                year, count = mongo_queries.query_1_year_with_most_films(fast=fast_mode)
                 if year and count:
                     st.success(f"L'année avec le plus de films est {year} avec {count} films.")
                 else:
                     st.warning("Aucun résultat trouvé.")
             
             elif query_num == 2:
-                count = st.session_state.mongo_queries.query_2_films_after_1999()
+                count = mongo_queries.query_2_films_after_1999()
                 st.success(f"Nombre de films sortis après 1999 : {count}")
             
             elif query_num == 3:
-                avg_votes = st.session_state.mongo_queries.query_3_average_votes_2007()
+                avg_votes = mongo_queries.query_3_average_votes_2007(fast=fast_mode)
                 st.success(f"Moyenne des votes des films de 2007 : {avg_votes:.2f}")
             
             elif query_num == 4:
-                fig = st.session_state.mongo_queries.query_4_films_per_year_histogram()
-                if fig:
-                    st.pyplot(fig)
+                chart = mongo_queries.query_4_films_per_year_histogram(fast=fast_mode)
+                if chart:
+                    show_chart(chart)
                 else:
                     st.warning("Impossible de générer l'histogramme.")
             
             elif query_num == 5:
-                genres = st.session_state.mongo_queries.query_5_available_genres()
+                genres = mongo_queries.query_5_available_genres()
                 st.write("Genres disponibles dans la base :")
                 st.write(genres)
             
             elif query_num == 6:
-                film = st.session_state.mongo_queries.query_6_highest_revenue_film()
+                film = mongo_queries.query_6_highest_revenue_film()
                 if film:
                     st.success(f"Le film avec le plus de revenus est '{film.get('title')}' avec {film.get('Revenue (Millions)')} millions de dollars.")
                     st.json(film)
@@ -298,7 +443,7 @@ elif page == "MongoDB - Requêtes":
                     st.warning("Aucun film trouvé.")
             
             elif query_num == 7:
-                directors = st.session_state.mongo_queries.query_7_directors_with_more_than_5_films()
+                directors = mongo_queries.query_7_directors_with_more_than_5_films(fast=fast_mode)
                 if directors:
                     st.write("Réalisateurs ayant réalisé plus de 5 films :")
                     st.table(pd.DataFrame(directors).rename(columns={"_id": "Réalisateur", "count": "Nombre de films"}))
@@ -306,14 +451,14 @@ elif page == "MongoDB - Requêtes":
                     st.warning("Aucun réalisateur n'a réalisé plus de 5 films.")
             
             elif query_num == 8:
-                genre, avg_revenue = st.session_state.mongo_queries.query_8_highest_average_revenue_genre()
+                genre, avg_revenue = mongo_queries.query_8_highest_average_revenue_genre()
                 if genre:
                     st.success(f"Le genre '{genre}' rapporte en moyenne le plus de revenus avec {avg_revenue:.2f} millions de dollars par film.")
                 else:
                     st.warning("Aucun résultat trouvé.")
             
             elif query_num == 9:
-                top_films = st.session_state.mongo_queries.query_9_top_3_films_by_decade()
+                top_films = mongo_queries.query_9_top_3_films_by_decade()
                 if top_films:
                     st.write("Top 3 films par décennie :")
                     for decade, films in top_films.items():
@@ -323,7 +468,7 @@ elif page == "MongoDB - Requêtes":
                     st.warning("Aucun résultat trouvé.")
             
             elif query_num == 10:
-                longest_films = st.session_state.mongo_queries.query_10_longest_film_by_genre()
+                longest_films = mongo_queries.query_10_longest_film_by_genre()
                 if longest_films:
                     st.write("Film le plus long par genre :")
                     st.table(pd.DataFrame(longest_films))
@@ -331,38 +476,30 @@ elif page == "MongoDB - Requêtes":
                     st.warning("Aucun résultat trouvé.")
             
             elif query_num == 11:
-                count = st.session_state.mongo_queries.query_11_create_high_rated_high_revenue_view()
+                count = mongo_queries.query_11_create_high_rated_high_revenue_view()
                 st.success(f"Vue créée avec {count} films ayant une note > 80 et des revenus > 50M.")
             
             elif query_num == 12:
-                corr, p_value, df = st.session_state.mongo_queries.query_12_runtime_revenue_correlation()
+                corr, p_value, df = mongo_queries.query_12_runtime_revenue_correlation()
                 if df is not None:
                     st.success(f"Coefficient de corrélation entre durée et revenus : {corr:.4f} (p-value: {p_value:.4f})")
                     
-                    # Créer un scatter plot
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    sns.scatterplot(data=df, x='Runtime (Minutes)', y='Revenue (Millions)', ax=ax)
-                    ax.set_title('Corrélation entre durée et revenus des films')
-                    
-                    # Ajouter une ligne de tendance
-                    sns.regplot(data=df, x='Runtime (Minutes)', y='Revenue (Millions)', 
-                                scatter=False, ci=None, ax=ax, color='red')
-                    
-                    st.pyplot(fig)
+                    # Nuage de points avec ligne de tendance
+                    show_chart(runtime_revenue_chart(df))
                 else:
                     st.warning("Données insuffisantes pour calculer la corrélation.")
             
             elif query_num == 13:
-                avg_runtime_by_decade, fig = st.session_state.mongo_queries.query_13_average_runtime_by_decade()
+                avg_runtime_by_decade, chart = mongo_queries.query_13_average_runtime_by_decade(fast=fast_mode)
                 if avg_runtime_by_decade is not None:
                     st.write("Durée moyenne des films par décennie :")
                     st.table(avg_runtime_by_decade)
-                    st.pyplot(fig)
+                    show_chart(chart)
                 else:
                     st.warning("Données insuffisantes pour analyser la durée par décennie.")
             
             elif query_num == 27:
-                films_with_common_genres = st.session_state.mongo_queries.query_27_films_with_common_genres_different_directors()
+                films_with_common_genres = mongo_queries.query_27_films_with_common_genres_different_directors()
                 if films_with_common_genres:
                     st.write("Films avec des genres communs mais des réalisateurs différents :")
                     
@@ -370,7 +507,8 @@ elif page == "MongoDB - Requêtes":
                     df = pd.DataFrame(films_with_common_genres, columns=['Film 1', 'Film 2', 'Genres communs'])
                     st.table(df.head(20))  # Limiter à 20 lignes pour la lisibilité
                     
-                    st.info(f"Total trouvé : {len(films_with_common_genres)} paires de films (limité à 20 pour l'affichage)")
+                    total_pairs = mongo_queries.count_films_with_common_genres_different_directors()
+                    st.info(f"Total trouvé : {total_pairs} paires de films (limité à 20 pour l'affichage)")
                 else:
                     st.warning("Aucune paire de films trouvée.")
 
@@ -418,6 +556,8 @@ elif page == "Neo4j - Requêtes":
         elif query_num == 25:
             actor1 = st.text_input("Premier acteur")
             actor2 = st.text_input("Deuxième acteur")
+        elif query_num == 26:
+            community_method = st.selectbox("Méthode de détection", ["louvain", "label_propagation"])
         
         if st.button("Exécuter la requête"):
             # Exécuter la requête sélectionnée
@@ -510,7 +650,7 @@ elif page == "Neo4j - Requêtes":
             
             elif query_num == 24:
                 count = st.session_state.neo4j_queries.query_24_create_influence_relationships()
-                st.success(f"{count} relations d'influence créées entre réalisateurs.")
+                st.success(f"{count} relations d'influence entre réalisateurs.")
             
             elif query_num == 25:
                 if not actor1 or not actor2:
@@ -532,14 +672,16 @@ elif page == "Neo4j - Requêtes":
                                 path_display.append("→")
                         
                         st.markdown(" ".join(path_display))
+                        st.write(f"Degrés de séparation : {len(path) // 2}")
                     else:
                         st.warning(f"Aucun chemin trouvé entre {actor1} et {actor2}.")
             
             elif query_num == 26:
-                df_communities, graph = st.session_state.neo4j_queries.query_26_actor_communities()
+                df_communities, graph = st.session_state.neo4j_queries.query_26_actor_communities(method=community_method)
                 if df_communities is not None:
                     st.write("Communautés d'acteurs détectées :")
                     st.dataframe(df_communities)
+                    st.write(f"Modularité de la partition : {df_communities.attrs.get('modularity', 0):.3f}")
                     
                     # Ajouter un graphique simple pour visualiser
                     if graph:
@@ -560,7 +702,7 @@ elif page == "Neo4j - Requêtes":
             
             elif query_num == 29:
                 count = st.session_state.neo4j_queries.query_29_create_competition_relationship()
-                st.success(f"{count} relations de concurrence créées entre réalisateurs.")
+                st.success(f"{count} relations de concurrence entre réalisateurs.")
             
             elif query_num == 30:
                 df_collaborations, df_commercial = st.session_state.neo4j_queries.query_30_analyze_director_actor_collaborations()
@@ -607,41 +749,17 @@ elif page == "Visualisations":
                 
                 if st.button("Générer la visualisation MongoDB"):
                     if selected_mongo_viz == "Histogramme des films par année":
-                        fig = st.session_state.mongo_queries.query_4_films_per_year_histogram()
-                        if fig:
-                            st.pyplot(fig)
+                        chart = st.session_state.mongo_queries.query_4_films_per_year_histogram()
+                        if chart:
+                            show_chart(chart)
                     
                     elif selected_mongo_viz == "Distribution des genres":
-                        # Récupérer les genres et créer un graphique
-                        genres = st.session_state.mongo_queries.query_5_available_genres()
+                        # Compter les films par genre côté serveur
+                        df_genres = st.session_state.mongo_queries.genre_distribution()
                         
-                        if genres:
-                            # Compter les films par genre
-                            genre_counts = {}
-                            
-                            # Cette requête est simplifiée et pourrait être remplacée par une méthode dédiée
-                            films_data = list(st.session_state.mongo_connector.films.find({}, {"genre": 1}))
-                            
-                            for film in films_data:
-                                if "genre" in film and film["genre"]:
-                                    film_genres = [g.strip() for g in film["genre"].split(",")]
-                                    for g in film_genres:
-                                        genre_counts[g] = genre_counts.get(g, 0) + 1
-                            
-                            # Créer un DataFrame et trier
-                            df_genres = pd.DataFrame(list(genre_counts.items()), columns=["Genre", "Count"])
-                            df_genres = df_genres.sort_values("Count", ascending=False)
-                            
-                            # Créer le graphique
-                            fig, ax = plt.subplots(figsize=(12, 6))
-                            sns.barplot(data=df_genres, x="Genre", y="Count", ax=ax)
-                            ax.set_title("Nombre de films par genre")
-                            ax.set_xlabel("Genre")
-                            ax.set_ylabel("Nombre de films")
-                            plt.xticks(rotation=45, ha='right')
-                            plt.tight_layout()
-                            
-                            st.pyplot(fig)
+                        if not df_genres.empty:
+                            show_chart(ChartSpec("bar", df_genres, "Genre", "Count",
+                                                 "Nombre de films par genre", "Genre", "Nombre de films"))
                         else:
                             st.warning("Aucun genre trouvé.")
                     
@@ -650,24 +768,16 @@ elif page == "Visualisations":
                         if df is not None:
                             st.write(f"Coefficient de corrélation : {corr:.4f} (p-value: {p_value:.4f})")
                             
-                            # Créer un scatter plot
-                            fig, ax = plt.subplots(figsize=(10, 6))
-                            sns.scatterplot(data=df, x='Runtime (Minutes)', y='Revenue (Millions)', ax=ax)
-                            ax.set_title('Corrélation entre durée et revenus des films')
-                            
-                            # Ajouter une ligne de tendance
-                            sns.regplot(data=df, x='Runtime (Minutes)', y='Revenue (Millions)', 
-                                      scatter=False, ci=None, ax=ax, color='red')
-                            
-                            st.pyplot(fig)
+                            # Nuage de points avec ligne de tendance
+                            show_chart(runtime_revenue_chart(df))
                         else:
                             st.warning("Données insuffisantes pour calculer la corrélation.")
                     
                     elif selected_mongo_viz == "Évolution de la durée moyenne par décennie":
-                        avg_runtime_by_decade, fig = st.session_state.mongo_queries.query_13_average_runtime_by_decade()
+                        avg_runtime_by_decade, chart = st.session_state.mongo_queries.query_13_average_runtime_by_decade()
                         if avg_runtime_by_decade is not None:
                             st.table(avg_runtime_by_decade)
-                            st.pyplot(fig)
+                            show_chart(chart)
                         else:
                             st.warning("Données insuffisantes pour analyser la durée par décennie.")
                     
@@ -684,16 +794,8 @@ elif page == "Visualisations":
                             df_directors = pd.DataFrame(directors_data)
                             df_directors.columns = ["Director", "Films"]
                             
-                            # Créer le graphique
-                            fig, ax = plt.subplots(figsize=(12, 6))
-                            sns.barplot(data=df_directors, x="Director", y="Films", ax=ax)
-                            ax.set_title("Top 15 réalisateurs par nombre de films")
-                            ax.set_xlabel("Réalisateur")
-                            ax.set_ylabel("Nombre de films")
-                            plt.xticks(rotation=45, ha='right')
-                            plt.tight_layout()
-                            
-                            st.pyplot(fig)
+                            show_chart(ChartSpec("bar", df_directors, "Director", "Films",
+                                                 "Top 15 réalisateurs par nombre de films", "Réalisateur", "Nombre de films"))
                         else:
                             st.warning("Aucun réalisateur trouvé.")
         
@@ -720,7 +822,7 @@ elif page == "Visualisations":
                     if selected_neo4j_viz == "Top acteurs par nombre de films":
                         # Exécuter une requête pour obtenir les top acteurs
                         top_actors_query = """
-                        MATCH (a:Actor)-[:A_JOUE]->(f:Film)
+                        MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
                         WITH a.name AS actor, count(f) AS film_count
                         ORDER BY film_count DESC
                         LIMIT 15
@@ -734,16 +836,8 @@ elif page == "Visualisations":
                                 # Créer un DataFrame
                                 df_top_actors = pd.DataFrame(top_actors)
                                 
-                                # Créer le graphique
-                                fig, ax = plt.subplots(figsize=(12, 6))
-                                sns.barplot(data=df_top_actors, x="actor", y="film_count", ax=ax)
-                                ax.set_title("Top 15 acteurs par nombre de films")
-                                ax.set_xlabel("Acteur")
-                                ax.set_ylabel("Nombre de films")
-                                plt.xticks(rotation=45, ha='right')
-                                plt.tight_layout()
-                                
-                                st.pyplot(fig)
+                                show_chart(ChartSpec("bar", df_top_actors, "actor", "film_count",
+                                                     "Top 15 acteurs par nombre de films", "Acteur", "Nombre de films"))
                             else:
                                 st.warning("Aucun acteur trouvé.")
                         except Exception as e:
@@ -752,7 +846,7 @@ elif page == "Visualisations":
                     elif selected_neo4j_viz == "Statistiques des acteurs":
                         # Requête pour obtenir des statistiques sur les acteurs
                         actors_stats_query = """
-                        MATCH (a:Actor)-[:A_JOUE]->(f:Film)
+                        MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
                         WITH a, count(f) AS film_count
                         RETURN 
                             min(film_count) AS min_films,
@@ -761,8 +855,26 @@ elif page == "Visualisations":
                             count(a) AS total_actors
                         """
                         
+                        # Distribution des acteurs par nombre de films
+                        distribution_query = """
+                        MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
+                        WITH a, count(f) AS film_count
+                        RETURN film_count, count(a) AS actor_count
+                        ORDER BY film_count
+                        """
+                        
+                        # Les deux requêtes sont indépendantes : elles sont envoyées en même temps
+                        executor = session_async_executor()
+                        results, timings = executor.run({
+                            "stats": executor.cypher(actors_stats_query),
+                            "distribution": executor.cypher(distribution_query)
+                        })
+                        
                         try:
-                            stats = st.session_state.neo4j_connector.graph.run(actors_stats_query).data()[0]
+                            for result in results.values():
+                                if isinstance(result, Exception):
+                                    raise result
+                            stats = results["stats"][0]
                             
                             # Afficher les statistiques
                             st.write("Statistiques des acteurs :")
@@ -771,28 +883,15 @@ elif page == "Visualisations":
                             st.write(f"Nombre maximum de films par acteur : {stats['max_films']}")
                             st.write(f"Nombre moyen de films par acteur : {stats['avg_films']:.2f}")
                             
-                            # Distribution des acteurs par nombre de films
-                            distribution_query = """
-                            MATCH (a:Actor)-[:A_JOUE]->(f:Film)
-                            WITH a, count(f) AS film_count
-                            RETURN film_count, count(a) AS actor_count
-                            ORDER BY film_count
-                            """
-                            
-                            distribution = st.session_state.neo4j_connector.graph.run(distribution_query).data()
+                            distribution = results["distribution"]
                             
                             if distribution:
                                 df_dist = pd.DataFrame(distribution)
                                 
-                                # Créer le graphique
-                                fig, ax = plt.subplots(figsize=(12, 6))
-                                sns.barplot(data=df_dist, x="film_count", y="actor_count", ax=ax)
-                                ax.set_title("Distribution des acteurs par nombre de films")
-                                ax.set_xlabel("Nombre de films")
-                                ax.set_ylabel("Nombre d'acteurs")
-                                plt.tight_layout()
-                                
-                                st.pyplot(fig)
+                                show_chart(ChartSpec("bar", df_dist, "film_count", "actor_count",
+                                                     "Distribution des acteurs par nombre de films",
+                                                     "Nombre de films", "Nombre d'acteurs"))
+                            st.caption(f"Requêtes exécutées en parallèle en {timings['total']:.2f} s")
                         except Exception as e:
                             st.error(f"Erreur lors de l'exécution de la requête: {e}")
                     
@@ -809,26 +908,59 @@ elif page == "Visualisations":
                                 if 'avg_revenue' in df_commercial.columns:
                                     df_plot = df_commercial.sort_values('avg_revenue', ascending=False).head(10)
                                     
-                                    fig, ax = plt.subplots(figsize=(12, 6))
-                                    bars = sns.barplot(data=df_plot, x='director', y='avg_revenue', ax=ax)
-                                    
-                                    # Ajouter les noms des acteurs
-                                    for i, bar in enumerate(bars.patches):
-                                        bars.text(bar.get_x() + bar.get_width()/2., 
-                                                  bar.get_height() + 5,
-                                                  df_plot.iloc[i]['actor'],
-                                                  ha='center', va='bottom', rotation=0, size=8)
-                                    
-                                    ax.set_title("Top 10 collaborations réalisateur-acteur par revenus moyens")
-                                    ax.set_xlabel("Réalisateur")
-                                    ax.set_ylabel("Revenus moyens (millions $)")
-                                    plt.xticks(rotation=45, ha='right')
-                                    plt.tight_layout()
-                                    
-                                    st.pyplot(fig)
+                                    # Une barre par couple réalisateur-acteur
+                                    df_plot = df_plot.assign(collaboration=df_plot['director'] + " / " + df_plot['actor'])
+                                    show_chart(ChartSpec("bar", df_plot, "collaboration", "avg_revenue",
+                                                         "Top 10 collaborations réalisateur-acteur par revenus moyens",
+                                                         "Réalisateur / acteur", "Revenus moyens (millions $)"))
                         else:
                             st.warning("Aucune collaboration fréquente trouvée.")
 
+# Page Diagnostics
+elif page == "Diagnostics":
+    st.header("Diagnostics des requêtes")
+    st.write("""
+    Durée, lignes retournées et travail des bases pour chaque requête exécutée (hors résultats servis
+    par le cache). Les documents et clés examinés (explain), les dbHits (PROFILE) et le pic mémoire
+    correspondent au dernier appel profilé.
+    """)
+    
+    INSTRUMENTATION.sample_every = st.number_input(
+        "Profiler un appel sur N (0 pour désactiver le profilage)",
+        min_value=0, value=INSTRUMENTATION.sample_every, step=1
+    )
+    
+    query_metrics = INSTRUMENTATION.query_table()
+    if query_metrics.empty:
+        st.info("Aucune requête exécutée pour le moment.")
+    else:
+        st.subheader("Requêtes")
+        st.dataframe(query_metrics.sort_values("mean_ms", ascending=False), use_container_width=True)
+        slowest = query_metrics.sort_values("p95_ms", ascending=False).iloc[0]
+        st.write(f"Requête la plus lente (p95) : **{slowest['query']}** ({slowest['p95_ms']:.1f} ms)")
+    
+    ingest_metrics = INSTRUMENTATION.ingest_table()
+    if not ingest_metrics.empty:
+        st.subheader("Imports")
+        st.dataframe(ingest_metrics, use_container_width=True)
+    
+    st.subheader("Export Prometheus")
+    prometheus_text = INSTRUMENTATION.to_prometheus()
+    st.download_button("Télécharger les métriques", prometheus_text, file_name="moviedb.prom", mime="text/plain")
+    metrics_port = st.number_input("Port de l'endpoint /metrics", min_value=1024, max_value=65535, value=9108)
+    if st.button("Démarrer l'endpoint /metrics"):
+        try:
+            get_metrics_server(int(metrics_port))
+            st.success(f"Métriques disponibles sur http://localhost:{int(metrics_port)}/metrics")
+        except OSError as e:
+            st.error(f"Impossible d'ouvrir le port {int(metrics_port)}: {e}")
+    with st.expander("Aperçu"):
+        st.code(prometheus_text, language="text")
+    
+    if st.button("Remettre les mesures à zéro"):
+        INSTRUMENTATION.reset()
+        st.rerun()
+
 # Page À propos
 elif page == "À propos":
     st.header("À propos du projet")
@@ -867,6 +999,16 @@ elif page == "À propos":
     - **Matplotlib et Seaborn** : Visualisation de données
     """)
 
+# Statistiques du cache des requêtes
+if queries_imported:
+    with st.sidebar.expander("Cache des requêtes"):
+        cache_stats = QUERY_CACHE.stats()
+        st.write(f"Succès : {cache_stats['hits']} — Échecs : {cache_stats['misses']} "
+                 f"(taux de succès : {cache_stats['hit_rate']:.0%})")
+        st.write(f"Entrées : {cache_stats['size']}/{cache_stats['maxsize']} — Évictions : {cache_stats['evictions']}")
+        if st.button("Vider le cache"):
+            QUERY_CACHE.clear()
+
 # Pied de page
 st.sidebar.markdown("---")
 st.sidebar.markdown("© 2024-2025 - Projet NoSQL ESIEA")
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Benchmark de l'ingestion parallèle MongoDB -> Neo4j.
+
+Pour chaque nombre de workers demandé, le script vide le graphe, le reconstruit
+avec Neo4jConnector.build_graph puis affiche le débit obtenu et l'accélération
+par rapport à la première mesure (courbe de speedup).
+
+ATTENTION : le graphe Neo4j cible est entièrement vidé avant chaque mesure.
+
+Utilisation :
+    python -m benchmarks.ingestion_benchmark --workers 1,2,4,8 --yes
+"""
+
+import argparse
+import json
+import time
+
+from mongodb_connect import MongoDBConnector
+from neo4j_connect import Neo4jConnector
+
+
+def clear_graph(graph, batch_size=10000):
+    """Supprime tous les nœuds du graphe par lots pour limiter la taille des transactions."""
+    while True:
+        result = graph.run(
+            "MATCH (n) WITH n LIMIT $limit DETACH DELETE n RETURN count(*) AS deleted",
+            limit=batch_size
+        ).data()
+        if not result or result[0]["deleted"] == 0:
+            return
+
+
+def run_benchmark(mongo, neo4j, worker_counts, batch_size):
+    """
+    Mesure le temps de construction du graphe pour chaque nombre de workers
+
+    Returns:
+        list: Une mesure (dictionnaire) par nombre de workers
+    """
+    results = []
+    for workers in worker_counts:
+        clear_graph(neo4j.graph)
+        neo4j.create_constraints_and_indexes()
+
+        start = time.perf_counter()
+        counts = neo4j.build_graph(mongo, batch_size=batch_size, workers=workers)
+        elapsed = time.perf_counter() - start
+        if not counts.get("completed"):
+            print(f"❌ Construction interrompue ({workers} workers) : {counts.get('error')}")
+            continue
+
+        rows = sum(counts.get(key, 0) for key in ("films", "actors", "directors", "genres"))
+        results.append({
+            "workers": workers,
+            "batch_size": batch_size,
+            "rows": rows,
+            "seconds": elapsed,
+            "rows_per_s": rows / elapsed if elapsed > 0 else 0.0
+        })
+
+    baseline = results[0]["seconds"] if results else 0
+    for result in results:
+        result["speedup"] = baseline / result["seconds"] if result["seconds"] > 0 else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion parallèle vers Neo4j")
+    parser.add_argument("--workers", default="1,2,4,8", help="Nombres de workers séparés par des virgules")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Nombre de films par lot")
+    parser.add_argument("--json-file", help="Fichier JSON à importer dans MongoDB avant la mesure")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    parser.add_argument("--yes", action="store_true", help="Confirme que le graphe Neo4j peut être vidé")
+    args = parser.parse_args()
+
+    if not args.yes:
+        print("❌ Ce benchmark vide le graphe Neo4j. Relancez avec --yes pour confirmer.")
+        return
+
+    mongo = MongoDBConnector(local=True)
+    neo4j = Neo4jConnector(local=True)
+    if not mongo.client or not neo4j.graph:
+        print("❌ Connexions MongoDB et Neo4j requises.")
+        return
+
+    if args.json_file:
+        mongo.films.delete_many({})
+        mongo.import_json_data(args.json_file)
+
+    worker_counts = [int(value) for value in args.workers.split(",") if value.strip()]
+    results = run_benchmark(mongo, neo4j, worker_counts, args.batch_size)
+
+    print("\nworkers | lignes/s   | durée (s) | speedup")
+    for result in results:
+        print(f"{result['workers']:>7} | {result['rows_per_s']:>10.0f} | {result['seconds']:>9.2f} | {result['speedup']:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\n✅ Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Benchmark des 30 requêtes de MongoDBQueries et Neo4jQueries.
+
+Chaque méthode query_N est appelée après quelques exécutions de chauffe, puis
+mesurée sur plusieurs répétitions. Le cache des résultats est vidé avant chaque
+répétition (y compris pour les requêtes appelées en interne) pour
+mesurer le travail réel des bases. Le rapport contient, par requête :
+latence p50/p95/moyenne, pic mémoire Python (tracemalloc) et nombre de
+documents examinés par MongoDB (compteurs serverStatus, si disponibles).
+
+Utilisation :
+    python -m benchmarks.synthetic_data --films 100000
+    python -m benchmarks.query_benchmark --json-file benchmarks/data/movies_100000.json --output run.json
+    python -m benchmarks.query_benchmark --compare run.json --output new.json --threshold 0.2
+
+L'option --mongomock utilise une base MongoDB en mémoire (paquet mongomock)
+à la place d'un serveur ; certaines requêtes d'agrégation n'y sont pas supportées.
+"""
+
+import argparse
+import inspect
+import json
+import re
+import statistics
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from mongodb_connect import MongoDBConnector
+from neo4j_connect import Neo4jConnector
+from queries.cache import QUERY_CACHE, bump_dataset_version
+from queries.mongodb_queries import MongoDBQueries
+from queries.neo4j_queries import Neo4jQueries
+
+QUERY_NAME = re.compile(r"^query_(\d+)_")
+
+# Requêtes qui modifient les données (vue MongoDB, relations Neo4j)
+WRITE_QUERIES = {11, 24, 29}
+
+
+def list_queries(queries):
+    """
+    Liste les méthodes query_N d'une instance de requêtes, triées par numéro
+
+    Returns:
+        list: Tuples (numéro, nom, méthode non mise en cache)
+    """
+    found = []
+    for name, method in inspect.getmembers(type(queries), inspect.isfunction):
+        match = QUERY_NAME.match(name)
+        if match:
+            # Méthode d'origine, sans le cache des résultats ni l'instrumentation
+            raw = inspect.unwrap(method)
+            found.append((int(match.group(1)), name, raw.__get__(queries)))
+    return sorted(found)
+
+
+def pick_neo4j_arguments(graph):
+    """
+    Choisit des paramètres réalistes pour les requêtes qui en demandent
+
+    Les acteurs les plus prolifiques sont pris dans les données pour que les
+    requêtes de parcours aient du travail à faire.
+
+    Returns:
+        dict: Arguments par numéro de requête
+    """
+    rows = graph.run("""
+    MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
+    RETURN a.name AS name, count(f) AS films
+    ORDER BY films DESC
+    LIMIT 2
+    """).data()
+    names = [row["name"] for row in rows] or ["Anne Hathaway"]
+    first = names[0]
+    second = names[-1]
+
+    team = graph.run("MATCH (a:Actor {is_team_member: true}) RETURN a.name AS name LIMIT 1").data()
+    return {
+        19: (team[0]["name"] if team else first,),
+        23: (first,),
+        25: (first, second),
+        28: (first,)
+    }
+
+
+def scanned_documents(mongo):
+    """
+    Total des documents examinés par le serveur MongoDB depuis son démarrage
+
+    Returns:
+        int: Compteur, ou None si serverStatus n'est pas disponible
+    """
+    try:
+        status = mongo.db.command("serverStatus")
+        return status["metrics"]["queryExecutor"]["scannedObjects"]
+    except Exception:
+        return None
+
+
+def reset_caches():
+    """
+    Vide le cache des résultats et invalide les index conservés par les instances
+
+    Les requêtes appelées par une requête mesurée (ex. l'index de la requête 27)
+    passent par le cache : sans cette remise à zéro, les répétitions mesureraient
+    un résultat déjà calculé.
+    """
+    QUERY_CACHE.clear()
+    bump_dataset_version("mongodb")
+    bump_dataset_version("neo4j")
+
+
+def measure(method, args, warmup, repeat, mongo=None):
+    """
+    Mesure une requête
+
+    Returns:
+        dict: Latences (ms), pic mémoire (octets), documents examinés et éventuelle erreur
+    """
+    try:
+        for _ in range(warmup):
+            method(*args)
+            plt.close("all")
+
+        timings = []
+        peaks = []
+        scanned = []
+        for _ in range(repeat):
+            reset_caches()
+            before = scanned_documents(mongo) if mongo else None
+            tracemalloc.start()
+            start = time.perf_counter()
+            method(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            after = scanned_documents(mongo) if mongo else None
+            if before is not None and after is not None:
+                scanned.append(after - before)
+            plt.close("all")
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        plt.close("all")
+        return {"error": str(e)}
+
+    ordered = sorted(timings)
+    return {
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean_ms": statistics.fmean(ordered),
+        "peak_memory_bytes": max(peaks),
+        "docs_scanned": max(scanned) if scanned else None
+    }
+
+
+def run_benchmark(mongo=None, neo4j=None, warmup=1, repeat=5, include_writes=False, only=None):
+    """
+    Exécute toutes les requêtes disponibles
+
+    Args:
+        mongo: MongoDBConnector (None pour ignorer les requêtes MongoDB)
+        neo4j: Neo4jConnector (None pour ignorer les requêtes Neo4j)
+        warmup (int): Exécutions de chauffe non mesurées
+        repeat (int): Exécutions mesurées
+        include_writes (bool): Exécuter aussi les requêtes qui modifient les données
+        only (set): Numéros des requêtes à exécuter (None pour toutes)
+
+    Returns:
+        dict: Résultats par nom de requête
+    """
+    suites = []
+    if mongo is not None:
+        suites.append((MongoDBQueries(mongo), {}, mongo))
+    if neo4j is not None:
+        suites.append((Neo4jQueries(neo4j), pick_neo4j_arguments(neo4j.graph), None))
+
+    results = {}
+    for queries, arguments, counter_source in suites:
+        for number, name, method in list_queries(queries):
+            if only and number not in only:
+                continue
+            if number in WRITE_QUERIES and not include_writes:
+                continue
+            print(f"🔄 {name}...")
+            result = measure(method, arguments.get(number, ()), warmup, repeat, counter_source)
+            result["query"] = number
+            results[name] = result
+            if "error" in result:
+                print(f"❌ {name}: {result['error']}")
+            else:
+                print(f"✅ {name}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare les latences p50 à celles d'une exécution de référence
+
+    Args:
+        results (dict): Résultats de l'exécution courante
+        baseline (dict): Résultats de référence
+        threshold (float): Ralentissement relatif toléré (0.2 = +20 %)
+
+    Returns:
+        list: Tuples (requête, p50 de référence, p50 courant) des régressions
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or "p50_ms" not in reference or "p50_ms" not in result:
+            continue
+        if result["p50_ms"] > reference["p50_ms"] * (1 + threshold):
+            regressions.append((name, reference["p50_ms"], result["p50_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des requêtes MongoDB et Neo4j")
+    parser.add_argument("--mongo-uri", help="Chaîne de connexion MongoDB (par défaut : instance locale)")
+    parser.add_argument("--mongomock", action="store_true", help="Utiliser une base MongoDB en mémoire")
+    parser.add_argument("--neo4j", action="store_true", help="Mesurer aussi les requêtes Neo4j (instance locale)")
+    parser.add_argument("--json-file", help="Fichier JSON à importer dans MongoDB avant la mesure")
+    parser.add_argument("--warmup", type=int, default=1, help="Exécutions de chauffe par requête")
+    parser.add_argument("--repeat", type=int, default=5, help="Exécutions mesurées par requête")
+    parser.add_argument("--queries", help="Numéros des requêtes à exécuter, séparés par des virgules")
+    parser.add_argument("--include-writes", action="store_true", help="Exécuter aussi les requêtes 11, 24 et 29")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    parser.add_argument("--compare", help="Fichier JSON de référence pour détecter les régressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Ralentissement toléré (0.2 = +20 %%)")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        mongo = MongoDBConnector(client=mongomock.MongoClient())
+    elif args.mongo_uri:
+        mongo = MongoDBConnector(connection_string=args.mongo_uri, local=False)
+    else:
+        mongo = MongoDBConnector(local=True)
+    if not mongo.client:
+        print("❌ Connexion MongoDB requise.")
+        return 1
+
+    neo4j = None
+    if args.neo4j:
+        neo4j = Neo4jConnector(local=True)
+        if not neo4j.graph:
+            print("❌ Connexion Neo4j impossible, requêtes Neo4j ignorées.")
+            neo4j = None
+
+    if args.json_file:
+        mongo.films.delete_many({})
+        mongo.import_json_data(args.json_file)
+
+    only = {int(value) for value in args.queries.split(",") if value.strip()} if args.queries else None
+    results = run_benchmark(mongo, neo4j, args.warmup, args.repeat, args.include_writes, only)
+
+    report = {
+        "films": mongo.films.estimated_document_count(),
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\n✅ Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file).get("results", {})
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"⚠️ Régression {name}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            return 1
+        print("✅ Aucune régression détectée")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""
+Générateur de jeux de données synthétiques au format de data/movies.json.
+
+Les acteurs et réalisateurs sont tirés selon une loi de puissance : quelques
+personnes apparaissent dans beaucoup de films et la majorité dans très peu,
+comme dans un vrai catalogue. Le fichier est écrit en flux, un document par ligne.
+
+Utilisation :
+    python -m benchmarks.synthetic_data --films 1000 100000 1000000 --output-dir benchmarks/data
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Drama",
+    "Family", "Fantasy", "History", "Horror", "Music", "Musical", "Mystery",
+    "Romance", "Sci-Fi", "Sport", "Thriller", "War", "Western"
+]
+
+# Poids des genres (le drame et l'action sont bien plus fréquents que le western)
+GENRE_WEIGHTS = [12, 9, 3, 4, 10, 6, 18, 2, 4, 2, 4, 1, 1, 4, 5, 5, 1, 7, 1, 1]
+
+RATINGS = ["G", "PG", "PG-13", "R", "unrated"]
+
+FIRST_NAMES = [
+    "Anne", "Brad", "Cate", "Denzel", "Emma", "Frances", "George", "Helen", "Idris",
+    "Julia", "Keanu", "Laura", "Matt", "Natalie", "Owen", "Penelope", "Quentin",
+    "Rachel", "Samuel", "Tilda", "Uma", "Viola", "Will", "Xavier", "Yara", "Zoe"
+]
+LAST_NAMES = [
+    "Adams", "Bale", "Chastain", "Damon", "Elba", "Fassbender", "Gosling", "Hardy",
+    "Isaac", "Johansson", "Knightley", "Lawrence", "McAdams", "Nolan", "Oldman",
+    "Portman", "Quaid", "Redmayne", "Stone", "Theron", "Ullman", "Villeneuve",
+    "Washington", "Xu", "Yeoh", "Zellweger"
+]
+
+
+def _person_name(index):
+    """Nom unique et lisible pour la personne numéro index"""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    suffix = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" if suffix == 0 else f"{first} {last} {suffix + 1}"
+
+
+def _power_law_cum_weights(size, exponent):
+    """Poids cumulés d'une loi de puissance (rang r -> 1 / r^exponent)"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+def generate_movies(n_films, seed=42, actors_per_film=4):
+    """
+    Génère des films synthétiques au format de data/movies.json
+
+    Args:
+        n_films (int): Nombre de films à générer
+        seed (int): Graine du générateur aléatoire (résultats reproductibles)
+        actors_per_film (int): Nombre d'acteurs par film
+
+    Yields:
+        dict: Un document de film
+    """
+    rng = random.Random(seed)
+
+    # Environ un acteur distinct pour 1,5 film et un réalisateur pour 4 films
+    n_actors = max(10, int(n_films / 1.5))
+    n_directors = max(5, n_films // 4)
+    actor_weights = _power_law_cum_weights(n_actors, 0.9)
+    director_weights = _power_law_cum_weights(n_directors, 0.8)
+    actor_ids = range(n_actors)
+    director_ids = range(n_directors)
+
+    for film_id in range(n_films):
+        actors = set()
+        while len(actors) < actors_per_film:
+            actors.update(rng.choices(actor_ids, cum_weights=actor_weights, k=actors_per_film - len(actors)))
+
+        genres = sorted(set(rng.choices(GENRES, weights=GENRE_WEIGHTS, k=rng.randint(1, 3))))
+        # Les années récentes sont plus représentées
+        year = 2016 - min(46, int(rng.expovariate(0.15)))
+
+        revenue = round(rng.lognormvariate(3.5, 1.3), 2) if rng.random() > 0.12 else ""
+        metascore = rng.randint(15, 100) if rng.random() > 0.05 else ""
+
+        yield {
+            "_id": str(film_id),
+            "_rev": f"1-{rng.getrandbits(128):032x}",
+            "title": f"Film {film_id}",
+            "genre": ",".join(genres),
+            "Description": f"Synthetic film number {film_id}.",
+            "Director": _person_name(rng.choices(director_ids, cum_weights=director_weights)[0] + n_actors),
+            "Actors": ", ".join(_person_name(actor) for actor in actors),
+            "year": year,
+            "Runtime (Minutes)": int(rng.gauss(112, 18)) if rng.random() > 0.02 else "",
+            "rating": rng.choice(RATINGS),
+            "Votes": int(rng.lognormvariate(10, 1.6)),
+            "Revenue (Millions)": revenue,
+            "Metascore": metascore
+        }
+
+
+def write_movies(path, n_films, seed=42):
+    """
+    Écrit un jeu de données synthétique, un document JSON par ligne
+
+    Returns:
+        str: Chemin du fichier écrit
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for movie in generate_movies(n_films, seed=seed):
+            file.write(json.dumps(movie, ensure_ascii=False))
+            file.write("\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des jeux de données de films synthétiques")
+    parser.add_argument("--films", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Tailles des jeux de données à générer")
+    parser.add_argument("--output-dir", default="benchmarks/data", help="Dossier de sortie")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur aléatoire")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for n_films in args.films:
+        path = os.path.join(args.output_dir, f"movies_{n_films}.json")
+        write_movies(path, n_films, seed=args.seed)
+        print(f"✅ {n_films} films écrits dans {path}")
+
+
+if __name__ == "__main__":
+    main()
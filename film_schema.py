@@ -0,0 +1,99 @@
+"""
+Schéma typé des documents de films, appliqué une seule fois au chargement.
+
+Les champs numériques du fichier source peuvent être des nombres, des chaînes
+("123.5") ou des chaînes vides. Ils sont convertis ici en int/float, ou en None
+lorsque la valeur est absente, pour que MongoDB et Neo4j stockent des nombres
+et que les requêtes n'aient plus à convertir chaque ligne. Un document dont une
+valeur est présente mais invalide (texte, hors bornes) est rejeté et peut être
+mis en quarantaine.
+"""
+
+import math
+
+# Champ numérique -> (type, minimum, maximum) ; None pour une borne absente
+NUMERIC_SCHEMA = {
+    "year": (int, 1870, 2100),
+    "Votes": (int, 0, None),
+    "Revenue (Millions)": (float, 0, None),
+    "Runtime (Minutes)": (int, 1, None),
+    "Metascore": (int, 0, 100)
+}
+
+# Champs sans lesquels un film ne peut pas être chargé
+REQUIRED_FIELDS = ("_id", "title")
+
+
+def parse_number(value, kind=float):
+    """
+    Convertit une valeur en nombre du type demandé
+
+    Args:
+        value: Valeur lue dans le fichier (nombre, chaîne, None)
+        kind (type): int ou float
+
+    Returns:
+        int | float | None: Le nombre, ou None si la valeur est absente (None ou chaîne vide)
+
+    Raises:
+        ValueError: Si la valeur est présente mais n'est pas un nombre du type demandé
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"booléen au lieu d'un nombre: {value!r}")
+
+    number = value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"valeur non numérique: {value!r}") from None
+    if not isinstance(number, (int, float)) or math.isnan(number) or math.isinf(number):
+        raise ValueError(f"valeur non numérique: {value!r}")
+
+    if kind is int:
+        if not float(number).is_integer():
+            raise ValueError(f"entier attendu: {value!r}")
+        return int(number)
+    return float(number)
+
+
+def to_number(value, kind=float):
+    """Comme parse_number, mais retourne None au lieu de lever une erreur"""
+    try:
+        return parse_number(value, kind)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_movie(movie):
+    """
+    Valide un document de film et convertit ses champs numériques
+
+    Args:
+        movie (dict): Document tel que lu dans le fichier JSON (non modifié)
+
+    Returns:
+        tuple: (copie du document avec des champs numériques typés, liste des erreurs)
+            Le document est valide si la liste des erreurs est vide.
+    """
+    document = dict(movie)
+    errors = [f"{field}: champ obligatoire manquant" for field in REQUIRED_FIELDS
+              if document.get(field) in (None, "")]
+
+    for field, (kind, minimum, maximum) in NUMERIC_SCHEMA.items():
+        if field not in document:
+            continue
+        try:
+            number = parse_number(document[field], kind)
+        except (TypeError, ValueError) as e:
+            errors.append(f"{field}: {e}")
+            continue
+        if number is not None and ((minimum is not None and number < minimum) or
+                                   (maximum is not None and number > maximum)):
+            errors.append(f"{field}: valeur hors bornes ({number})")
+            continue
+        document[field] = number
+
+    return document, errors
@@ -45,7 +45,7 @@ def initialize_mongodb(json_file="data/movies.json", local=True, connection_stri
     
     return mongo
 
-def initialize_neo4j(mongo_connector, local=True, uri=None, user=None, password=None):
+def initialize_neo4j(mongo_connector, local=True, uri=None, user=None, password=None, workers=4):
     """Initialise Neo4j avec les données de MongoDB."""
     print("\n🔄 Initialisation de Neo4j...")
     
@@ -64,17 +64,9 @@ def initialize_neo4j(mongo_connector, local=True, uri=None, user=None, password=
         print("❌ MongoDB n'est pas connecté, impossible d'importer les données.")
         return neo4j
     
-    # Créer les nœuds Film
-    print("\n🔄 Création des nœuds Film...")
-    neo4j.create_film_nodes(mongo_connector)
-    
-    # Créer les nœuds Actor et leurs relations
-    print("\n🔄 Création des nœuds Actor et leurs relations...")
-    neo4j.create_actor_nodes_and_relationships(mongo_connector)
-    
-    # Créer les nœuds Director et leurs relations
-    print("\n🔄 Création des nœuds Director et leurs relations...")
-    neo4j.create_director_nodes_and_relationships(mongo_connector)
+    # Construire le graphe (Film, Actor, Director, Genre) en une seule lecture de MongoDB
+    print("\n🔄 Construction du graphe (Film, Actor, Director, Genre)...")
+    neo4j.build_graph(mongo_connector, workers=workers)
     
     # Ajouter les membres de l'équipe
     team_members = load_team_members()
@@ -104,6 +96,9 @@ def main():
         neo4j_user = input("Entrez le nom d'utilisateur Neo4j: ")
         neo4j_password = input("Entrez le mot de passe Neo4j: ")
     
+    workers_input = input("Nombre de workers pour l'import Neo4j (défaut 4): ").strip()
+    neo4j_workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 4
+    
     # Initialiser MongoDB
     mongo_connector = initialize_mongodb(
         local=use_local_mongodb,
@@ -117,7 +112,8 @@ def main():
             local=use_local_neo4j,
             uri=neo4j_uri,
             user=neo4j_user,
-            password=neo4j_password
+            password=neo4j_password,
+            workers=neo4j_workers
         )
     else:
         print("\n⚠️ Impossible d'initialiser Neo4j sans une connexion MongoDB fonctionnelle.")
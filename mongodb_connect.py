@@ -1,78 +1,536 @@
 import pymongo
 import json
-from pymongo import MongoClient
+import threading
+import time
+from datetime import datetime, timezone
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+from film_schema import NUMERIC_SCHEMA, to_number, validate_movie
+from queries.cache import ServerVersion, bump_dataset_version, in_dry_run
+from queries.film_stats import FilmStatsMaterializer
+from queries.instrumentation import COMMAND_RECORDER, INSTRUMENTATION
 import pandas as pd
 import matplotlib.pyplot as plt
 
 class MongoDBConnector:
-    def __init__(self, connection_string=None, local=True):
+    # Index de la collection 'films', déduits des requêtes de MongoDBQueries
+    # (les champs tableaux donnent des index multikey)
+    FILMS_INDEXES = [
+        IndexModel([("genres", ASCENDING)], name="genres_1"),
+        IndexModel([("actors", ASCENDING)], name="actors_1"),
+        # Requêtes 1 à 4 : filtre et regroupement par année (la requête 3 est couverte par l'index)
+        IndexModel([("year", ASCENDING), ("Votes", ASCENDING)], name="year_1_Votes_1"),
+        # Requête 6 : tri décroissant sur le revenu, seules les valeurs numériques sont indexées
+        IndexModel([("Revenue (Millions)", DESCENDING)], name="Revenue_-1_numeric",
+                   partialFilterExpression={"Revenue (Millions)": {"$type": "number"}}),
+        # Requête 7 : regroupement par réalisateur
+        IndexModel([("Director", ASCENDING)], name="Director_1"),
+        # Requête 11 : vue high_rated_high_revenue (Metascore > 80 et revenu > 50M)
+        IndexModel([("Metascore", ASCENDING), ("Revenue (Millions)", ASCENDING)],
+                   name="Metascore_1_Revenue_1_high_rated",
+                   partialFilterExpression={"Metascore": {"$gt": 80}}),
+        # Synchronisation vers Neo4j sans change stream : lecture des documents modifiés dans l'ordre
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1")
+    ]
+    
+    # Date de dernière écriture d'un document (UTC), utilisée par sync_daemon en mode polling
+    UPDATED_AT_FIELD = "updated_at"
+    
+    # Document de 'sync_state' comptant les écritures de la collection 'films' (tous processus)
+    DATA_VERSION_ID = "films_version"
+    
+    # Document de 'sync_state' signalant un import en cours (sync_daemon ne supprime rien pendant l'import)
+    IMPORT_STATE_ID = "films_import"
+    
+    # Champs numériques normalisés : champ source -> champ typé
+    NUMERIC_FIELDS = {
+        "Revenue (Millions)": "revenue",
+        "Runtime (Minutes)": "runtime",
+        "Metascore": "metascore"
+    }
+    
+    def __init__(self, connection_string=None, local=True, client=None):
         """
         Initialise la connexion à MongoDB
         
         Args:
             connection_string (str): Chaîne de connexion MongoDB Atlas (si local=False)
             local (bool): Si True, se connecte à MongoDB local, sinon utilise Atlas
+            client: Client déjà créé à utiliser tel quel (ex. mongomock.MongoClient pour les tests)
         """
+        self._connection_string = connection_string
+        self._use_local = local
+        self._client_override = client
+        self._last_check = time.monotonic()
+        # Sérialise les reconnexions (ensure_connected est appelé par plusieurs threads)
+        self._connect_lock = threading.Lock()
+        # Version des données lue sur le serveur (clé de queries.cache)
+        self.server_version = ServerVersion(self.data_version)
+        self._connect()
+    
+    def _connect(self):
+        """Ouvre la connexion (et son pool) vers MongoDB"""
+        client = None
         try:
-            if local:
-                self.client = MongoClient('mongodb://localhost:27017/')
+            if self._client_override is not None:
+                client = self._client_override
+            elif self._use_local:
+                client = MongoClient(self.connection_uri, event_listeners=[COMMAND_RECORDER])
             else:
-                if not connection_string:
+                if not self._connection_string:
                     raise ValueError("connection_string doit être fourni pour une connexion Atlas")
-                self.client = MongoClient(connection_string)
+                # Les commandes des requêtes profilées sont enregistrées pour explain (queries.instrumentation)
+                client = MongoClient(self._connection_string, event_listeners=[COMMAND_RECORDER])
                 
             # Vérifier la connexion
-            self.client.admin.command('ping')
-            print("✅ Connexion à MongoDB réussie!")
+            client.admin.command('ping')
             
             # Créer/accéder à la base de données 'entertainment'
-            self.db = self.client['entertainment']
+            self.db = client['entertainment']
             
             # Accéder à la collection 'films'
             self.films = self.db['films']
             
+            # Documents rejetés à l'import (valeurs invalides), conservés pour correction
+            self.quarantine = self.db['films_quarantine']
+            
+            # Le client n'est publié qu'une fois la connexion vérifiée
+            self.client = client
+            print("✅ Connexion à MongoDB réussie!")
+            
         except Exception as e:
             print(f"❌ Erreur de connexion à MongoDB: {e}")
+            # Libérer le pool du client qui n'a pas pu se connecter
+            if client is not None and client is not self._client_override:
+                client.close()
             self.client = None
     
-    def import_json_data(self, json_file):
+    @property
+    def connection_uri(self):
+        """URI de connexion (None si un client a été fourni tel quel)"""
+        if self._client_override is not None:
+            return None
+        return 'mongodb://localhost:27017/' if self._use_local else self._connection_string
+    
+    def is_alive(self):
+        """Vérifie que le serveur MongoDB répond"""
+        if not self.client:
+            return False
+        try:
+            self.client.admin.command('ping')
+            return True
+        except Exception:
+            return False
+    
+    def ensure_connected(self, max_age=30):
+        """
+        Vérifie la connexion et se reconnecte si elle est perdue
+        
+        Args:
+            max_age (float): Délai minimum (secondes) entre deux vérifications
+            
+        Returns:
+            bool: True si la connexion est disponible
+        """
+        with self._connect_lock:
+            now = time.monotonic()
+            if now - self._last_check < max_age:
+                return self.client is not None
+            self._last_check = now
+            
+            if self.is_alive():
+                return True
+            
+            previous = self.client
+            print("🔄 Reconnexion à MongoDB...")
+            self._connect()
+            # L'ancien client n'est fermé qu'après son remplacement
+            if previous is not None and previous is not self.client and previous is not self._client_override:
+                previous.close()
+            return self.client is not None
+    
+    def data_version(self):
+        """
+        Compteur d'écritures de la collection 'films', partagé par tous les processus
+        
+        Seules les écritures faites par ce connecteur (import, normalisation, statistiques)
+        l'incrémentent : une modification faite directement dans la base n'est vue par le
+        cache qu'à l'expiration de son TTL.
+        
+        Returns:
+            int: Nombre d'écritures, ou None si aucune n'a été enregistrée
+        """
+        if not self.client:
+            return None
+        state = self.db["sync_state"].find_one({"_id": self.DATA_VERSION_ID})
+        return state.get("writes") if state else None
+    
+    def mark_data_changed(self):
+        """Signale une écriture de la collection 'films' : version locale et compteur sur le serveur"""
+        if in_dry_run():
+            return
+        try:
+            if self.client:
+                self.db["sync_state"].update_one({"_id": self.DATA_VERSION_ID},
+                                                 {"$inc": {"writes": 1}}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Mise à jour du compteur d'écritures impossible: {e}")
+        finally:
+            bump_dataset_version("mongodb")
+            self.server_version.invalidate()
+    
+    def server_time(self):
+        """
+        Heure du serveur MongoDB (UTC)
+        
+        Toutes les dates updated_at sont prises sur l'horloge du serveur (comme "$$NOW"
+        dans les mises à jour) : sync_daemon compare des dates écrites par plusieurs
+        processus, dont les horloges peuvent être décalées.
+        
+        Returns:
+            datetime: Heure du serveur, ou heure locale si elle ne peut pas être lue
+        """
+        try:
+            server_time = self.client.admin.command("hello")["localTime"]
+            return server_time if server_time.tzinfo else server_time.replace(tzinfo=timezone.utc)
+        except Exception as e:
+            if not getattr(self, "_server_time_warned", False):
+                print(f"⚠️ Heure du serveur MongoDB illisible, heure locale utilisée: {e}")
+                self._server_time_warned = True
+            return datetime.now(timezone.utc)
+    
+    def mark_import(self, running):
+        """
+        Signale le début, l'avancement ou la fin d'un import dans 'sync_state'
+        
+        Args:
+            running (bool): True pendant l'import (appel répété à chaque lot), False à la fin
+        """
+        update = {"running": running, "heartbeat_at": datetime.now(timezone.utc)}
+        try:
+            self.db["sync_state"].update_one({"_id": self.IMPORT_STATE_ID}, {"$set": update}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Mise à jour de l'état de l'import impossible: {e}")
+    
+    def import_running(self, timeout=600):
+        """
+        Indique si un import est en cours (dans ce processus ou un autre)
+        
+        Args:
+            timeout (float): Délai (secondes) sans nouvelle d'un import au-delà duquel
+                il est considéré comme interrompu
+            
+        Returns:
+            bool: True si un import a signalé son avancement depuis moins de timeout secondes
+        """
+        state = self.db["sync_state"].find_one({"_id": self.IMPORT_STATE_ID})
+        if not state or not state.get("running"):
+            return False
+        heartbeat = state["heartbeat_at"]
+        if heartbeat.tzinfo is None:
+            heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - heartbeat).total_seconds() < timeout
+    
+    @staticmethod
+    def _split_list(value):
+        """Découpe une chaîne de valeurs séparées par des virgules en liste"""
+        if not value or not isinstance(value, str):
+            return []
+        return [item.strip() for item in value.split(",") if item.strip()]
+    
+    @classmethod
+    def normalize_movie(cls, movie):
+        """
+        Ajoute à un document les champs normalisés utilisés par les requêtes
+        
+        - genres / actors : tableaux issus des chaînes 'genre' et 'Actors'
+        - revenue / runtime / metascore : valeurs numériques (ou None)
+        - updated_at : date d'écriture (UTC), remplacée à l'import par l'heure du serveur
+        
+        Les champs numériques d'origine doivent déjà avoir été convertis par
+        film_schema.validate_movie ; les valeurs invalides restantes deviennent None.
+        
+        Args:
+            movie (dict): Document de film tel que lu dans le fichier JSON
+            
+        Returns:
+            dict: Le même document complété
+        """
+        movie["genres"] = cls._split_list(movie.get("genre"))
+        movie["actors"] = cls._split_list(movie.get("Actors"))
+        for source, target in cls.NUMERIC_FIELDS.items():
+            movie[target] = to_number(movie.get(source), NUMERIC_SCHEMA[source][0])
+        movie[cls.UPDATED_AT_FIELD] = datetime.now(timezone.utc)
+        return movie
+    
+    def ensure_indexes(self, background=False):
+        """
+        Crée les index déclarés dans FILMS_INDEXES s'ils n'existent pas encore
+        
+        Args:
+            background (bool): Si True, la création est lancée dans un thread et la méthode
+                retourne immédiatement (les insertions continuent pendant la construction)
+                
+        Returns:
+            threading.Thread: Thread de création si background=True, sinon None
+        """
+        if background:
+            thread = threading.Thread(target=self.ensure_indexes, name="films-index-build", daemon=True)
+            thread.start()
+            return thread
+        
+        try:
+            self.films.create_indexes(self.FILMS_INDEXES)
+            print("✅ Index de la collection 'films' créés")
+        except Exception as e:
+            print(f"❌ Erreur lors de la création des index: {e}")
+        return None
+    
+    def missing_indexes(self):
+        """
+        Liste les index déclarés qui n'existent pas dans la collection
+        
+        Returns:
+            list: Noms des index manquants
+        """
+        existing = self.films.index_information()
+        return [index.document["name"] for index in self.FILMS_INDEXES
+                if index.document["name"] not in existing]
+    
+    def normalize_existing_documents(self, refresh_stats=True):
+        """
+        Ajoute les champs normalisés aux documents importés avant leur introduction
+        
+        La mise à jour est faite côté serveur par un pipeline d'agrégation. Les valeurs
+        converties changeant les agrégats, les statistiques matérialisées sont ensuite
+        recalculées en totalité si des documents ont été modifiés.
+        
+        Args:
+            refresh_stats (bool): Recalculer les statistiques matérialisées après la normalisation
+            
+        Returns:
+            int: Nombre de documents modifiés
+        """
+        def split_expr(field):
+            return {"$filter": {
+                "input": {"$map": {
+                    "input": {"$split": [{"$ifNull": [f"${field}", ""]}, ","]},
+                    "in": {"$trim": {"input": "$$this"}}
+                }},
+                "cond": {"$ne": ["$$this", ""]}
+            }}
+        
+        def number_expr(field):
+            kind = "long" if NUMERIC_SCHEMA[field][0] is int else "double"
+            return {"$convert": {"input": f"${field}", "to": kind, "onError": None, "onNull": None}}
+        
+        update = {"genres": split_expr("genre"), "actors": split_expr("Actors")}
+        for source, target in self.NUMERIC_FIELDS.items():
+            update[target] = number_expr(source)
+        # Les champs d'origine sont eux aussi convertis (une chaîne vide devient null)
+        for field in NUMERIC_SCHEMA:
+            update[field] = number_expr(field)
+        update[self.UPDATED_AT_FIELD] = "$$NOW"
+        
+        try:
+            result = self.films.update_many({"genres": {"$exists": False}}, [{"$set": update}])
+            self.mark_data_changed()
+            print(f"✅ {result.modified_count} documents normalisés")
+            self.ensure_indexes()
+            if refresh_stats and result.modified_count:
+                FilmStatsMaterializer(self).refresh()
+            return result.modified_count
+        except Exception as e:
+            print(f"❌ Erreur lors de la normalisation des documents: {e}")
+            return 0
+    
+    @staticmethod
+    def _iter_json_documents(json_file, start_offset=0):
+        """
+        Lit le fichier JSON (un document par ligne) de façon paresseuse
+        
+        Args:
+            json_file (str): Chemin vers le fichier JSON
+            start_offset (int): Position (en octets) à partir de laquelle reprendre la lecture
+            
+        Yields:
+            tuple: (document, position en octets de la fin de la ligne)
+        """
+        with open(json_file, 'rb') as file:
+            file.seek(start_offset)
+            offset = start_offset
+            for raw_line in file:
+                offset += len(raw_line)
+                line = raw_line.decode('utf-8').strip()
+                if line and not line.startswith('{"_id":"_design'):  # Ignorer les documents de design
+                    try:
+                        yield json.loads(line), offset
+                    except json.JSONDecodeError:
+                        print(f"⚠️ Ligne ignorée (format JSON incorrect): {line[:50]}...")
+    
+    def _insert_batch(self, batch, collection=None):
+        """
+        Insère un lot de documents sans ordre imposé
+        
+        Les doublons (documents déjà insérés avant une reprise) sont ignorés.
+        
+        Args:
+            batch (list): Documents à insérer
+            collection: Collection cible ('films' par défaut)
+        
+        Returns:
+            int: Nombre de documents réellement insérés
+        """
+        collection = self.films if collection is None else collection
+        with INSTRUMENTATION.ingest_batch(f"mongodb.{collection.name}") as measured:
+            try:
+                result = collection.insert_many(batch, ordered=False)
+                measured["rows"] = len(result.inserted_ids)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                measured["rows"] = e.details.get("nInserted", 0)
+        return measured["rows"]
+    
+    def import_json_data(self, json_file, batch_size=1000, resume_offset=0, progress_every=10,
+                         refresh_stats=True):
         """
         Importe des données depuis un fichier JSON dans la collection 'films'
         
+        Le fichier est lu en flux et envoyé par lots, la mémoire utilisée ne dépend
+        donc que de la taille d'un lot. Chaque document reçoit les champs normalisés
+        de normalize_movie. Les index sont construits en arrière-plan pendant l'import
+        (constructions hybrides de MongoDB 4.2+, qui ne bloquent pas les insertions).
+        
+        Les champs numériques sont validés et convertis par film_schema.validate_movie :
+        les documents invalides ne sont pas importés mais copiés, avec leurs erreurs,
+        dans la collection 'films_quarantine'.
+        En cas d'échec, l'import peut être repris avec la position retournée dans stats["offset"].
+        Les statistiques matérialisées ('films_stats') sont ensuite recalculées, même si
+        l'import a échoué : en totalité pour un nouvel import (la collection a pu être vidée),
+        seulement pour les années, genres et réalisateurs des films ajoutés pour une reprise.
+        
         Args:
             json_file (str): Chemin vers le fichier JSON
+            batch_size (int): Nombre de documents par appel à insert_many
+            resume_offset (int): Position (en octets) à partir de laquelle reprendre l'import
+            progress_every (int): Afficher la progression tous les N lots
+            refresh_stats (bool): Recalculer les statistiques matérialisées après l'import
+            
+        Returns:
+            dict: Compteurs de l'import (documents, mis en quarantaine, octets, offset, débits, terminé)
         """
+        stats = {
+            "documents": 0,
+            "quarantined": 0,
+            "bytes": 0,
+            "offset": resume_offset,
+            "elapsed": 0.0,
+            "docs_per_s": 0.0,
+            "bytes_per_s": 0.0,
+            "completed": False
+        }
+        self.last_import_stats = stats
+        index_build = None
+        import_marked = False
+        # Compartiments de statistiques touchés par les films importés
+        changed = {"years": set(), "genres": set(), "directors": set()}
+        
         try:
-            # Vérifier si la collection existe et est vide
-            if self.films.count_documents({}) > 0:
+            # Vérifier si la collection existe et est vide (sauf en cas de reprise)
+            if resume_offset == 0 and self.films.count_documents({}) > 0:
                 print("⚠️ La collection 'films' n'est pas vide. Voulez-vous remplacer les données? (o/n)")
                 response = input().lower()
                 if response != 'o':
                     print("❌ Importation annulée")
-                    return
-                # Supprimer les données existantes
+                    return stats
+                # Supprimer les données existantes (sync_daemon ne reporte pas ces suppressions pendant l'import)
+                self.mark_import(True)
+                import_marked = True
                 self.films.delete_many({})
+            if resume_offset == 0:
+                self.quarantine.delete_many({})
+            
+            if not import_marked:
+                self.mark_import(True)
+                import_marked = True
+            index_build = self.ensure_indexes(background=True)
+            start = time.perf_counter()
+            batch = []
+            rejected = []
+            batch_count = 0
+            
+            def flush(end_offset):
+                if rejected:
+                    stats["quarantined"] += self._insert_batch(rejected, self.quarantine)
+                    rejected.clear()
+                if batch:
+                    # Même horloge que les mises à jour "$$NOW" (voir server_time)
+                    written_at = self.server_time()
+                    for movie in batch:
+                        movie[self.UPDATED_AT_FIELD] = written_at
+                    stats["documents"] += self._insert_batch(batch)
+                    for movie in batch:
+                        changed["years"].add(movie.get("year"))
+                        changed["genres"].update(movie["genres"])
+                        changed["directors"].add(movie.get("Director"))
+                self.mark_import(True)
+                stats["offset"] = end_offset
+                stats["bytes"] = end_offset - resume_offset
+                stats["elapsed"] = time.perf_counter() - start
+                if stats["elapsed"] > 0:
+                    stats["docs_per_s"] = stats["documents"] / stats["elapsed"]
+                    stats["bytes_per_s"] = stats["bytes"] / stats["elapsed"]
+                batch.clear()
             
-            # Lire et importer les données
-            movies = []
-            with open(json_file, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if line and not line.startswith('{"_id":"_design'):  # Ignorer les documents de design
-                        try:
-                            movie_data = json.loads(line)
-                            movies.append(movie_data)
-                        except json.JSONDecodeError:
-                            print(f"⚠️ Ligne ignorée (format JSON incorrect): {line[:50]}...")
-            
-            if movies:
-                result = self.films.insert_many(movies)
-                print(f"✅ {len(result.inserted_ids)} films importés avec succès!")
+            # Lire et importer les données par lots
+            for movie_data, end_offset in self._iter_json_documents(json_file, resume_offset):
+                movie, errors = validate_movie(movie_data)
+                if errors:
+                    # La position dans le fichier identifie le document (reprise sans doublon)
+                    rejected.append({"_id": f"{json_file}:{end_offset}", "document": movie_data, "errors": errors})
+                else:
+                    batch.append(self.normalize_movie(movie))
+                if len(batch) >= batch_size or len(rejected) >= batch_size:
+                    flush(end_offset)
+                    batch_count += 1
+                    if batch_count % progress_every == 0:
+                        print(f"🔄 {stats['documents']} films importés "
+                              f"({stats['docs_per_s']:.0f} docs/s, {stats['bytes_per_s'] / 1e6:.2f} Mo/s)")
+            
+            if batch or rejected:
+                flush(end_offset)
+            
+            stats["completed"] = True
+            if stats["quarantined"]:
+                print(f"⚠️ {stats['quarantined']} films invalides copiés dans 'films_quarantine'")
+            if stats["documents"]:
+                print(f"✅ {stats['documents']} films importés avec succès! "
+                      f"({stats['docs_per_s']:.0f} docs/s, {stats['bytes_per_s'] / 1e6:.2f} Mo/s)")
             else:
                 print("❌ Aucun film à importer")
                 
         except Exception as e:
             print(f"❌ Erreur lors de l'importation: {e}")
+            print(f"ℹ️ Reprise possible avec resume_offset={stats['offset']}")
+        finally:
+            if index_build is not None:
+                index_build.join()
+            if import_marked:
+                self.mark_import(False)
+                # Collection vidée ou documents ajoutés : les statistiques ne correspondent plus
+                if refresh_stats and (resume_offset == 0 or stats["documents"] or stats["quarantined"]):
+                    materializer = FilmStatsMaterializer(self)
+                    if resume_offset == 0:
+                        materializer.refresh()
+                    else:
+                        materializer.refresh(**changed)
+            # Les résultats de requêtes en cache ne correspondent plus aux données
+            self.mark_data_changed()
+        
+        return stats
     
     def query_year_with_most_films(self):
         """Affiche l'année où le plus grand nombre de films ont été sortis."""
@@ -1,7 +1,158 @@
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from py2neo import Graph, Node, Relationship
+from py2neo.errors import Neo4jError, TransientError
+
+from film_schema import to_number
+from queries.cache import ServerVersion, bump_dataset_version, in_dry_run
+from queries.instrumentation import INSTRUMENTATION
 import pandas as pd
 
 class Neo4jConnector:
+    # Projection MongoDB nécessaire pour construire le graphe
+    MOVIE_PROJECTION = {
+        "_id": 1,
+        "title": 1,
+        "year": 1,
+        "Votes": 1,
+        "Revenue (Millions)": 1,
+        "rating": 1,
+        "genre": 1,
+        "Director": 1,
+        "Actors": 1
+    }
+    
+    # Clé de MERGE utilisée pour répartir les lignes entre les workers
+    PARTITION_KEYS = {
+        "films": "id",
+        "actors": "actor",
+        "directors": "director",
+        "genres": "genre"
+    }
+    
+    # Requêtes d'écriture par lots (une ligne par élément de $rows)
+    # Chaque écriture d'un film ou de ses relations pose f.updated_at : les projections en
+    # mémoire (queries.graph_projection, queries.derived_relationships) relisent ces films
+    FILM_ROWS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (f:Film {id: row.id})
+    SET f.title = row.title,
+        f.year = row.year,
+        f.votes = row.votes,
+        f.revenue = row.revenue,
+        f.rating = row.rating,
+        f.genre = row.genre,
+        f.updated_at = timestamp()
+    """
+    
+    ACTOR_ROWS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Film {id: row.film_id})
+    MERGE (a:Actor {name: row.actor})
+    MERGE (a)-[:A_JOUE_DANS]->(f)
+    SET f.updated_at = timestamp()
+    """
+    
+    DIRECTOR_ROWS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Film {id: row.film_id})
+    MERGE (d:Director {name: row.director})
+    MERGE (d)-[:A_REALISE]->(f)
+    SET f.updated_at = timestamp()
+    """
+    
+    GENRE_ROWS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Film {id: row.film_id})
+    MERGE (g:Genre {name: row.genre})
+    MERGE (f)-[:APPARTIENT_AU]->(g)
+    SET f.updated_at = timestamp()
+    """
+    
+    # Synchronisation d'un film modifié : suppression des relations qui ne sont plus dans le document
+    FILM_STALE_LINKS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Film {id: row.id})
+    OPTIONAL MATCH (a:Actor)-[ra:A_JOUE_DANS]->(f) WHERE NOT a.name IN row.actors
+    DELETE ra
+    WITH f, row, collect(a) AS removed
+    OPTIONAL MATCH (d:Director)-[rd:A_REALISE]->(f) WHERE NOT d.name IN row.directors
+    DELETE rd
+    WITH f, row, removed + collect(d) AS removed
+    OPTIONAL MATCH (f)-[rg:APPARTIENT_AU]->(g:Genre) WHERE NOT g.name IN row.genres
+    DELETE rg
+    WITH DISTINCT f, removed
+    SET f.updated_at = timestamp()
+    WITH removed
+    UNWIND removed AS p
+    WITH DISTINCT p
+    WHERE NOT (p)-[:A_JOUE_DANS|A_REALISE]->(:Film) AND NOT coalesce(p.is_team_member, false)
+    DETACH DELETE p
+    """
+    
+    # Synchronisation d'un film supprimé de MongoDB (ses acteurs et réalisateurs
+    # sans autre film sont supprimés avec lui)
+    FILM_DELETE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Film {id: row.id})
+    OPTIONAL MATCH (p)-[:A_JOUE_DANS|A_REALISE]->(f)
+    WITH f, collect(DISTINCT p) AS people
+    DETACH DELETE f
+    WITH people
+    UNWIND people AS p
+    WITH DISTINCT p
+    WHERE NOT (p)-[:A_JOUE_DANS|A_REALISE]->(:Film) AND NOT coalesce(p.is_team_member, false)
+    DETACH DELETE p
+    """
+    
+    # Écrit l'identifiant de communauté calculé en mémoire sur les nœuds Actor
+    ACTOR_COMMUNITY_QUERY = """
+    UNWIND $rows AS row
+    MATCH (a:Actor {name: row.name})
+    SET a.communityId = row.community
+    """
+    
+    # Index sur les propriétés de Film : nom de l'index -> propriété
+    FILM_INDEXES = {
+        "film_year": "year",        # jointures sur l'année (requête 29)
+        "film_title": "title",      # recherche d'un film par titre
+        "film_revenue": "revenue",  # filtre sur le revenu (requête 16)
+        "film_votes": "votes",      # moyenne des votes (requête 17)
+        "film_updated_at": "updated_at"  # films relus par les projections en mémoire
+    }
+    
+    # Crée les nœuds Genre d'un lot de films (par identifiant croissant) à partir de leur propriété genre
+    GENRE_FROM_FILMS_QUERY = """
+    MATCH (f:Film)
+    WHERE $after IS NULL OR f.id > $after
+    WITH f ORDER BY f.id LIMIT $limit
+    OPTIONAL MATCH (f)-[linked:APPARTIENT_AU]->(:Genre)
+    WITH f, count(linked) AS links
+    WITH f, CASE WHEN links > 0 OR f.genre IS NULL THEN []
+                 ELSE [name IN [raw IN split(f.genre, ",") | trim(raw)] WHERE name <> ""] END AS names
+    FOREACH (name IN names |
+        MERGE (g:Genre {name: name})
+        MERGE (f)-[:APPARTIENT_AU]->(g)
+        SET f.updated_at = timestamp())
+    RETURN count(f) AS films, max(f.id) AS last, sum(CASE WHEN size(names) > 0 THEN 1 ELSE 0 END) AS linked
+    """
+    
+    # Marqueur des écritures du graphe, partagé par tous les processus (cache, projections)
+    GRAPH_STATE_WRITE_QUERY = """
+    MERGE (s:GraphState {name: "films"})
+    SET s.writes = coalesce(s.writes, 0) + 1,
+        s.deletes = coalesce(s.deletes, 0) + $deleted,
+        s.updated_at = timestamp()
+    """
+    
+    GRAPH_STATE_QUERY = """
+    MATCH (s:GraphState {name: "films"})
+    RETURN s.writes AS writes, s.deletes AS deletes
+    """
+    
     def __init__(self, uri=None, user=None, password=None, local=True):
         """
         Initialise la connexion à Neo4j
@@ -12,14 +163,34 @@ class Neo4jConnector:
             password (str): Mot de passe Neo4j (obligatoire si local=False)
             local (bool): Si True, utilise les paramètres de connexion par défaut pour Neo4j local
         """
+        # Graphes propres à chaque thread pour l'ingestion parallèle (fermés en fin de construction)
+        self._thread_local = threading.local()
+        self._worker_graphs = []
+        self._worker_graphs_lock = threading.Lock()
+        self._uri = None
+        self._auth = None
+        self.graph = None
+        self._last_check = time.monotonic()
+        # Version des données lue sur le serveur (clé de queries.cache)
+        self.server_version = ServerVersion(self.graph_state)
+        
+        if local:
+            # Paramètres par défaut pour Neo4j local
+            self._uri = "bolt://localhost:7687"
+            self._auth = ("neo4j", "Neo4j123")
+        elif not uri or not user or not password:
+            print("❌ Erreur de connexion à Neo4j: uri, user et password doivent être fournis pour une connexion Neo4j cloud")
+            return
+        else:
+            self._uri = uri
+            self._auth = (user, password)
+        
+        self._connect()
+    
+    def _connect(self):
+        """Ouvre la connexion (et son pool) vers Neo4j"""
         try:
-            if local:
-                # Paramètres par défaut pour Neo4j local
-                    self.graph = Graph("bolt://localhost:7687", auth=("neo4j", "Neo4j123"))
-            else:
-                if not uri or not user or not password:
-                    raise ValueError("uri, user et password doivent être fournis pour une connexion Neo4j cloud")
-                self.graph = Graph(uri, auth=(user, password))
+            self.graph = Graph(self._uri, auth=self._auth)
             
             # Test de connexion
             self.graph.run("MATCH (n) RETURN count(n) LIMIT 1")
@@ -29,6 +200,74 @@ class Neo4jConnector:
             print(f"❌ Erreur de connexion à Neo4j: {e}")
             self.graph = None
     
+    @property
+    def connection_params(self):
+        """URI et identifiants (uri, (user, password)) de la connexion, ou (None, None)"""
+        return self._uri, self._auth
+    
+    def is_alive(self):
+        """Vérifie que le serveur Neo4j répond"""
+        if not self.graph:
+            return False
+        try:
+            self.graph.run("RETURN 1")
+            return True
+        except Exception:
+            return False
+    
+    def ensure_connected(self, max_age=30):
+        """
+        Vérifie la connexion et se reconnecte si elle est perdue
+        
+        Args:
+            max_age (float): Délai minimum (secondes) entre deux vérifications
+            
+        Returns:
+            bool: True si la connexion est disponible
+        """
+        now = time.monotonic()
+        if now - self._last_check < max_age:
+            return self.graph is not None
+        self._last_check = now
+        
+        if self.is_alive() or not self._uri:
+            return self.graph is not None
+        
+        print("🔄 Reconnexion à Neo4j...")
+        self._close_worker_graphs()
+        self._connect()
+        return self.graph is not None
+    
+    def graph_state(self):
+        """
+        Marqueur des écritures du graphe (GraphState), mis à jour par tous les processus
+        
+        Returns:
+            tuple: (nombre d'écritures, nombre de films supprimés), ou None si le marqueur n'existe pas
+        """
+        if not self.graph:
+            return None
+        result = self.graph.run(self.GRAPH_STATE_QUERY).data()
+        return (result[0]["writes"], result[0]["deletes"]) if result else None
+    
+    def mark_data_changed(self, deleted=0):
+        """
+        Signale une écriture du graphe : version locale et marqueur GraphState sur le serveur
+        
+        Args:
+            deleted (int): Nombre de films supprimés par l'écriture
+        """
+        if in_dry_run():
+            return
+        try:
+            if self.graph:
+                self.graph.run(self.GRAPH_STATE_WRITE_QUERY, deleted=deleted)
+        except Exception as e:
+            print(f"⚠️ Mise à jour du marqueur GraphState impossible: {e}")
+        finally:
+            bump_dataset_version("neo4j")
+            self.server_version.invalidate()
+    
     def create_constraints_and_indexes(self):
         """Crée les contraintes et index nécessaires pour le projet"""
         if not self.graph:
@@ -39,126 +278,504 @@ class Neo4jConnector:
             self.graph.run("CREATE CONSTRAINT film_id IF NOT EXISTS FOR (f:Film) REQUIRE f.id IS UNIQUE")
             self.graph.run("CREATE CONSTRAINT actor_name IF NOT EXISTS FOR (a:Actor) REQUIRE a.name IS UNIQUE")
             self.graph.run("CREATE CONSTRAINT director_name IF NOT EXISTS FOR (d:Director) REQUIRE d.name IS UNIQUE")
+            self.graph.run("CREATE CONSTRAINT genre_name IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE")
+            self.graph.run("CREATE CONSTRAINT graph_state_name IF NOT EXISTS FOR (s:GraphState) REQUIRE s.name IS UNIQUE")
+            
+            # Index sur les propriétés des films utilisées dans les filtres et les jointures
+            for name, prop in self.FILM_INDEXES.items():
+                self.graph.run(f"CREATE INDEX {name} IF NOT EXISTS FOR (f:Film) ON (f.{prop})")
             print("✅ Contraintes et index créés avec succès")
             
         except Exception as e:
             print(f"❌ Erreur lors de la création des contraintes: {e}")
     
-    def create_film_nodes(self, mongo_connector):
+    def create_film_nodes(self, mongo_connector, batch_size=5000):
         """
         Crée des nœuds Film à partir des données MongoDB
         
         Args:
             mongo_connector: Instance de MongoDBConnector
+            batch_size (int): Nombre de films par requête
         """
         if not self.graph or not mongo_connector.client:
             return
         
         try:
-            # Récupérer les films depuis MongoDB
-            movies = list(mongo_connector.films.find({}, {
-                "_id": 1, 
-                "title": 1, 
-                "year": 1, 
-                "Votes": 1, 
-                "Revenue (Millions)": 1, 
-                "rating": 1, 
-                "Director": 1
-            }))
-            
-            # Créer un batch de requêtes Cypher
-            batch_size = 100
-            count = 0
-            
-            for i in range(0, len(movies), batch_size):
-                batch = movies[i:i+batch_size]
-                query = """
-                UNWIND $movies AS movie
-                MERGE (f:Film {id: movie._id})
-                SET f.title = movie.title,
-                    f.year = movie.year,
-                    f.votes = movie.Votes,
-                    f.revenue = movie.`Revenue (Millions)`,
-                    f.rating = movie.rating
-                """
-                self.graph.run(query, movies=batch)
-                count += len(batch)
-                print(f"✅ {count}/{len(movies)} nœuds Film créés")
+            # Parcourir les films depuis MongoDB avec un curseur
+            movies = mongo_connector.films.find({}, self.MOVIE_PROJECTION)
+            rows = (self._split_movie(movie)[0] for movie in movies)
+            
+            count, rate = self._run_unwind_batches(self.FILM_ROWS_QUERY, rows, batch_size, "nœuds Film")
             
-            print("✅ Création des nœuds Film terminée")
+            print(f"✅ Création des nœuds Film terminée ({count} films, {rate:.0f} films/s)")
             
         except Exception as e:
             print(f"❌ Erreur lors de la création des nœuds Film: {e}")
     
-    def create_actor_nodes_and_relationships(self, mongo_connector):
+    def normalize_film_properties(self):
+        """
+        Convertit en nombres les propriétés des films chargés avant la conversion à l'import
+        
+        Les valeurs vides ou invalides ("") deviennent null, c'est-à-dire que la propriété est supprimée.
+        
+        Returns:
+            int: Nombre de films mis à jour
+        """
+        if not self.graph:
+            return 0
+        
+        query = """
+        MATCH (f:Film)
+        SET f.year = toInteger(f.year),
+            f.votes = toInteger(f.votes),
+            f.revenue = toFloat(f.revenue),
+            f.updated_at = timestamp()
+        RETURN count(f) AS films
+        """
+        try:
+            result = self.graph.run(query).data()
+            count = result[0]["films"] if result else 0
+            print(f"✅ Propriétés numériques de {count} films converties")
+            return count
+        except Exception as e:
+            print(f"❌ Erreur lors de la conversion des propriétés des films: {e}")
+            return 0
+        finally:
+            self.mark_data_changed()
+    
+    def create_genre_nodes(self, batch_size=5000):
+        """
+        Crée les nœuds Genre et les relations 'APPARTIENT_AU' à partir de la propriété genre des films
+        
+        Seuls les films sans relation APPARTIENT_AU sont traités : la méthode peut être
+        relancée après l'ajout de films sans recréer les relations existantes.
+        
+        Args:
+            batch_size (int): Nombre de films par transaction
+            
+        Returns:
+            int: Nombre de films rattachés à leurs genres
+        """
+        if not self.graph:
+            return 0
+        
+        total = 0
+        after = None
+        try:
+            # Parcours de tous les films par identifiant : un lot sans genre à créer
+            # (genre vide, films déjà rattachés) n'arrête pas le parcours
+            while True:
+                result = self.graph.run(self.GENRE_FROM_FILMS_QUERY, limit=batch_size, after=after).data()
+                if not result or not result[0]["films"]:
+                    break
+                after = result[0]["last"]
+                total += result[0]["linked"]
+                print(f"🔄 {total} films rattachés à leurs genres")
+            print(f"✅ Création des nœuds Genre terminée ({total} films)")
+        except Exception as e:
+            print(f"❌ Erreur lors de la création des nœuds Genre: {e}")
+        finally:
+            self.mark_data_changed()
+        return total
+    
+    def write_actor_communities(self, communities, batch_size=5000):
+        """
+        Enregistre la propriété communityId des acteurs par lots
+        
+        Args:
+            communities (iterable): Couples (nom de l'acteur, identifiant de communauté)
+            batch_size (int): Nombre d'acteurs par requête
+            
+        Returns:
+            int: Nombre d'acteurs mis à jour
+        """
+        if not self.graph:
+            return 0
+        
+        try:
+            rows = ({"name": name, "community": int(community)} for name, community in communities)
+            count, rate = self._run_unwind_batches(self.ACTOR_COMMUNITY_QUERY, rows, batch_size, "acteurs")
+            print(f"✅ Communautés enregistrées ({count} acteurs, {rate:.0f} acteurs/s)")
+            return count
+        except Exception as e:
+            print(f"❌ Erreur lors de l'enregistrement des communautés: {e}")
+            return 0
+    
+    def _run_unwind_batches(self, query, rows, batch_size, label):
+        """
+        Envoie des lignes à Neo4j par lots via une requête UNWIND $rows
+        
+        Args:
+            query (str): Requête Cypher commençant par UNWIND $rows AS row
+            rows (iterable): Lignes (dictionnaires) à envoyer
+            batch_size (int): Nombre de lignes par requête
+            label (str): Nom des lignes pour l'affichage de la progression
+            
+        Returns:
+            tuple: (nombre de lignes envoyées, lignes par seconde)
+        """
+        start = time.perf_counter()
+        count = 0
+        batch = []
+        
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self._run_batch(self.graph, query, batch)
+                    count += len(batch)
+                    batch = []
+                    print(f"🔄 {count} {label} traités")
+            
+            if batch:
+                self._run_batch(self.graph, query, batch)
+                count += len(batch)
+        finally:
+            # Les résultats de requêtes en cache ne correspondent plus au graphe
+            self.mark_data_changed()
+        
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        return count, rate
+    
+    def _ingest_name(self, query):
+        """Nom de mesure d'un lot d'import (ex. "neo4j.actor_rows" pour ACTOR_ROWS_QUERY)"""
+        for name, value in vars(type(self)).items():
+            if value is query:
+                return "neo4j." + name.lower().removesuffix("_query")
+        return "neo4j.cypher"
+    
+    def _run_batch(self, graph, query, rows):
+        """Exécute un lot UNWIND en le mesurant (queries.instrumentation)"""
+        with INSTRUMENTATION.ingest_batch(self._ingest_name(query)) as measured:
+            result = graph.run(query, rows=rows)
+            measured["rows"] = len(rows)
+        return result
+    
+    def _worker_graph(self):
+        """Retourne le Graph propre au thread courant (une session par worker)"""
+        if not getattr(self, "_uri", None):
+            return self.graph
+        
+        graph = getattr(self._thread_local, "graph", None)
+        if graph is None:
+            graph = Graph(self._uri, auth=self._auth)
+            self._thread_local.graph = graph
+            with self._worker_graphs_lock:
+                self._worker_graphs.append(graph)
+        return graph
+    
+    def _close_worker_graphs(self):
+        """Ferme les connexions des Graph créés pour les workers (à l'arrêt de leur executor)"""
+        with self._worker_graphs_lock:
+            graphs, self._worker_graphs = self._worker_graphs, []
+            self._thread_local = threading.local()
+        for graph in graphs:
+            try:
+                graph.service.connector.close()
+            except Exception as e:
+                print(f"⚠️ Fermeture d'une connexion de worker impossible: {e}")
+    
+    @staticmethod
+    def _is_transient(error):
+        """Indique si une erreur Neo4j peut être rejouée (deadlock, verrou, etc.)"""
+        if isinstance(error, TransientError):
+            return True
+        return isinstance(error, Neo4jError) and "Deadlock" in (error.code or "")
+    
+    def _run_with_retry(self, graph, query, rows, max_retries=5):
+        """
+        Exécute un lot UNWIND en le rejouant en cas d'erreur transitoire
+        
+        Args:
+            graph: Instance py2neo Graph à utiliser
+            query (str): Requête Cypher commençant par UNWIND $rows AS row
+            rows (list): Lignes du lot
+            max_retries (int): Nombre maximum de nouvelles tentatives
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                return self._run_batch(graph, query, rows)
+            except Exception as e:
+                if attempt == max_retries or not self._is_transient(e):
+                    raise
+                # Attente exponentielle avec un peu d'aléa pour désynchroniser les workers
+                time.sleep((2 ** attempt) * 0.05 * (1 + random.random()))
+    
+    def _write_partitioned(self, executor, query, rows, key, workers, batch_size):
+        """
+        Écrit des lignes en parallèle, réparties par hachage de la clé de MERGE
+        
+        Toutes les lignes qui partagent la même clé (nom d'acteur, de réalisateur...)
+        sont envoyées par le même worker : deux workers ne créent jamais le même nœud
+        Actor, Director ou Genre. Les MERGE de relations verrouillent en revanche aussi
+        le nœud Film, partagé entre les partitions : des workers peuvent donc encore
+        se disputer un film (attente de verrou, voire deadlock), d'où la reprise des
+        lots en erreur transitoire par _run_with_retry.
+        
+        Args:
+            executor: ThreadPoolExecutor utilisé pour l'écriture
+            query (str): Requête Cypher commençant par UNWIND $rows AS row
+            rows (list): Lignes à écrire
+            key (str): Nom du champ de la ligne utilisé comme clé de MERGE
+            workers (int): Nombre de partitions
+            batch_size (int): Nombre de lignes par requête
+        """
+        partitions = [[] for _ in range(workers)]
+        for row in rows:
+            partitions[zlib.crc32(str(row[key]).encode("utf-8")) % workers].append(row)
+        
+        def write_partition(partition):
+            graph = self._worker_graph()
+            for i in range(0, len(partition), batch_size):
+                self._run_with_retry(graph, query, partition[i:i+batch_size])
+        
+        futures = [executor.submit(write_partition, partition) for partition in partitions if partition]
+        for future in futures:
+            future.result()
+    
+    @staticmethod
+    def _split_names(value):
+        """Découpe une chaîne de noms séparés par des virgules"""
+        if not value:
+            return []
+        return [name.strip() for name in value.split(",") if name.strip()]
+    
+    @classmethod
+    def _split_movie(cls, movie):
+        """
+        Découpe un document MongoDB en lignes Film, Actor, Director et Genre
+        
+        Args:
+            movie (dict): Document de la collection 'films'
+            
+        Returns:
+            tuple: (ligne Film, lignes Actor, lignes Director, lignes Genre)
+        """
+        film_id = movie["_id"]
+        film_row = {
+            "id": film_id,
+            "title": movie.get("title"),
+            # Nombres ou None (propriété absente) : les requêtes n'ont pas à convertir les valeurs
+            "year": to_number(movie.get("year"), int),
+            "votes": to_number(movie.get("Votes"), int),
+            "revenue": to_number(movie.get("Revenue (Millions)")),
+            "rating": movie.get("rating"),
+            "genre": movie.get("genre")
+        }
+        actor_rows = [{"film_id": film_id, "actor": actor} for actor in cls._split_names(movie.get("Actors"))]
+        director_rows = [{"film_id": film_id, "director": movie["Director"]}] if movie.get("Director") else []
+        genre_rows = [{"film_id": film_id, "genre": genre} for genre in cls._split_names(movie.get("genre"))]
+        return film_row, actor_rows, director_rows, genre_rows
+    
+    def create_actor_nodes_and_relationships(self, mongo_connector, batch_size=5000):
         """
         Crée des nœuds Actor et les relations 'A_JOUE_DANS' avec les films
         
+        Les paires (film, acteur) sont envoyées par lots via UNWIND au lieu
+        d'une requête par acteur.
+        
         Args:
             mongo_connector: Instance de MongoDBConnector
+            batch_size (int): Nombre de paires (film, acteur) par requête
+            
+        Returns:
+            tuple: (nombre de paires traitées, paires par seconde)
         """
         if not self.graph or not mongo_connector.client:
-            return
+            return 0, 0.0
             
         try:
-            # Récupérer les films et leurs acteurs depuis MongoDB
-            movies = list(mongo_connector.films.find({}, {
-                "_id": 1, 
-                "Actors": 1
-            }))
+            # Parcourir les films et leurs acteurs depuis MongoDB avec un curseur
+            movies = mongo_connector.films.find({}, {"_id": 1, "Actors": 1})
             
-            # Traiter chaque film
-            for movie in movies:
-                if "Actors" in movie and movie["Actors"]:
-                    # Diviser la chaîne d'acteurs
-                    actors = [actor.strip() for actor in movie["Actors"].split(",")]
-                    
-                    # Créer des nœuds Actor et des relations avec le film
-                    for actor in actors:
-                        query = """
-                        MATCH (f:Film {id: $film_id})
-                        MERGE (a:Actor {name: $actor_name})
-                        MERGE (a)-[:A_JOUE_DANS]->(f)
-                        """
-                        self.graph.run(query, film_id=movie["_id"], actor_name=actor)
-            
-            print("✅ Création des nœuds Actor et des relations terminée")
+            pairs = (row for movie in movies for row in self._split_movie(movie)[1])
+            
+            count, rate = self._run_unwind_batches(self.ACTOR_ROWS_QUERY, pairs, batch_size, "paires film/acteur")
+            
+            print(f"✅ Création des nœuds Actor et des relations terminée ({count} paires, {rate:.0f} paires/s)")
+            return count, rate
             
         except Exception as e:
             print(f"❌ Erreur lors de la création des nœuds Actor: {e}")
+            return 0, 0.0
     
-    def create_director_nodes_and_relationships(self, mongo_connector):
+    def create_director_nodes_and_relationships(self, mongo_connector, batch_size=5000):
         """
         Crée des nœuds Director et les relations 'A_REALISE' avec les films
         
         Args:
             mongo_connector: Instance de MongoDBConnector
+            batch_size (int): Nombre de paires (film, réalisateur) par requête
         """
         if not self.graph or not mongo_connector.client:
             return
             
         try:
-            # Récupérer les films et leurs réalisateurs depuis MongoDB
-            movies = list(mongo_connector.films.find({}, {
-                "_id": 1, 
-                "Director": 1
-            }))
+            # Parcourir les films et leurs réalisateurs depuis MongoDB avec un curseur
+            movies = mongo_connector.films.find({}, {"_id": 1, "Director": 1})
+            rows = (row for movie in movies for row in self._split_movie(movie)[2])
             
-            # Traiter chaque film
-            for movie in movies:
-                if "Director" in movie and movie["Director"]:
-                    query = """
-                    MATCH (f:Film {id: $film_id})
-                    MERGE (d:Director {name: $director_name})
-                    MERGE (d)-[:A_REALISE]->(f)
-                    """
-                    self.graph.run(query, film_id=movie["_id"], director_name=movie["Director"])
+            count, rate = self._run_unwind_batches(self.DIRECTOR_ROWS_QUERY, rows, batch_size, "paires film/réalisateur")
             
-            print("✅ Création des nœuds Director et des relations terminée")
+            print(f"✅ Création des nœuds Director et des relations terminée ({count} paires, {rate:.0f} paires/s)")
             
         except Exception as e:
             print(f"❌ Erreur lors de la création des nœuds Director: {e}")
     
+    def build_graph(self, mongo_connector, batch_size=5000, workers=1):
+        """
+        Construit tout le graphe (Film, Actor, Director, Genre) en une seule lecture de MongoDB
+        
+        Chaque document est découpé en lignes Film, Actor, Director et Genre qui
+        sont envoyées par lots via UNWIND. Les films d'un lot sont toujours écrits
+        avant les relations qui les référencent.
+        
+        Avec workers > 1, chaque type de lignes est réparti entre plusieurs workers
+        (un Graph par thread) selon le hachage de sa clé de MERGE, et les lots en
+        deadlock sont rejoués automatiquement.
+        
+        Args:
+            mongo_connector: Instance de MongoDBConnector
+            batch_size (int): Nombre de films lus avant chaque envoi à Neo4j
+            workers (int): Nombre de workers d'écriture en parallèle
+            
+        Returns:
+            dict: Nombre de lignes écrites par type, durée totale, completed (False si la
+                construction a échoué, les compteurs donnant alors ce qui a été écrit) et error
+        """
+        if not self.graph or not mongo_connector.client:
+            return {"completed": False, "error": "MongoDB et Neo4j doivent être connectés"}
+        
+        queries = {
+            "films": self.FILM_ROWS_QUERY,
+            "actors": self.ACTOR_ROWS_QUERY,
+            "directors": self.DIRECTOR_ROWS_QUERY,
+            "genres": self.GENRE_ROWS_QUERY
+        }
+        buffers = {key: [] for key in queries}
+        counts = {key: 0 for key in queries}
+        counts.update(completed=False, error=None)
+        start = time.perf_counter()
+        
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        
+        def flush():
+            # Les films d'abord : les autres requêtes font un MATCH sur Film
+            for key, query in queries.items():
+                rows = buffers[key]
+                if executor:
+                    self._write_partitioned(executor, query, rows, self.PARTITION_KEYS[key], workers, batch_size)
+                else:
+                    for i in range(0, len(rows), batch_size):
+                        self._run_with_retry(self.graph, query, rows[i:i+batch_size])
+                counts[key] += len(rows)
+                buffers[key] = []
+        
+        try:
+            # Une seule lecture de la collection avec un curseur
+            movies = mongo_connector.films.find({}, self.MOVIE_PROJECTION)
+            
+            for movie in movies:
+                film_row, actor_rows, director_rows, genre_rows = self._split_movie(movie)
+                buffers["films"].append(film_row)
+                buffers["actors"].extend(actor_rows)
+                buffers["directors"].extend(director_rows)
+                buffers["genres"].extend(genre_rows)
+                
+                if len(buffers["films"]) >= batch_size:
+                    flush()
+                    print(f"🔄 {counts['films']} films ajoutés au graphe")
+            
+            flush()
+            
+            counts["elapsed"] = time.perf_counter() - start
+            counts["completed"] = True
+            print(f"✅ Graphe construit : {counts['films']} films, {counts['actors']} relations acteur, "
+                  f"{counts['directors']} relations réalisateur, {counts['genres']} relations genre "
+                  f"en {counts['elapsed']:.1f} s")
+            
+        except Exception as e:
+            counts["error"] = str(e)
+            print(f"❌ Erreur lors de la construction du graphe: {e}")
+        finally:
+            if executor:
+                executor.shutdown()
+                self._close_worker_graphs()
+            # Les résultats de requêtes en cache ne correspondent plus au graphe
+            self.mark_data_changed()
+        
+        return counts
+    
+    def apply_film_changes(self, movies=(), deleted_ids=(), batch_size=500):
+        """
+        Reporte dans le graphe des films ajoutés, modifiés ou supprimés dans MongoDB
+        
+        Les films sont écrits par MERGE (une modification déjà appliquée peut être
+        rejouée sans effet) ; les relations Actor, Director et Genre absentes du
+        nouveau document sont supprimées, les autres sont conservées. Les nœuds Actor
+        et Director qui n'ont plus aucun film sont supprimés (sauf membres de l'équipe).
+        Un document qui ne peut pas être découpé (champ manquant, type inattendu) est
+        ignoré et retourné dans "skipped" avec son erreur.
+        
+        Args:
+            movies (iterable): Documents complets des films ajoutés ou modifiés
+            deleted_ids (iterable): Identifiants (_id) des films supprimés
+            batch_size (int): Nombre de lignes par requête
+            
+        Returns:
+            dict: Nombre de films écrits et supprimés, et leurs identifiants (film_ids, deleted_ids)
+                pour la mise à jour des relations dérivées (DirectorRelationships.update_films),
+                et documents ignorés (skipped : tuples (document, erreur))
+        """
+        if not self.graph:
+            return {"upserted": 0, "deleted": 0, "film_ids": [], "deleted_ids": [], "skipped": []}
+        
+        rows = {"films": [], "stale": [], "actors": [], "directors": [], "genres": []}
+        skipped = []
+        for movie in movies:
+            try:
+                film_row, actor_rows, director_rows, genre_rows = self._split_movie(movie)
+            except Exception as e:
+                print(f"⚠️ Document ignoré ({type(e).__name__}: {e}): {str(movie)[:80]}")
+                skipped.append((movie, f"{type(e).__name__}: {e}"))
+                continue
+            rows["films"].append(film_row)
+            rows["stale"].append({
+                "id": film_row["id"],
+                "actors": [row["actor"] for row in actor_rows],
+                "directors": [row["director"] for row in director_rows],
+                "genres": [row["genre"] for row in genre_rows]
+            })
+            rows["actors"].extend(actor_rows)
+            rows["directors"].extend(director_rows)
+            rows["genres"].extend(genre_rows)
+        deleted_ids = list(deleted_ids)
+        deleted = [{"id": film_id} for film_id in deleted_ids]
+        
+        # Les films d'abord : les autres requêtes font un MATCH sur Film
+        queries = [
+            (self.FILM_DELETE_QUERY, deleted),
+            (self.FILM_ROWS_QUERY, rows["films"]),
+            (self.FILM_STALE_LINKS_QUERY, rows["stale"]),
+            (self.ACTOR_ROWS_QUERY, rows["actors"]),
+            (self.DIRECTOR_ROWS_QUERY, rows["directors"]),
+            (self.GENRE_ROWS_QUERY, rows["genres"])
+        ]
+        try:
+            for query, query_rows in queries:
+                for i in range(0, len(query_rows), batch_size):
+                    self._run_with_retry(self.graph, query, query_rows[i:i+batch_size])
+        finally:
+            self.mark_data_changed(deleted=len(deleted))
+        return {
+            "upserted": len(rows["films"]),
+            "deleted": len(deleted),
+            "film_ids": [row["id"] for row in rows["films"]],
+            "deleted_ids": deleted_ids,
+            "skipped": skipped
+        }
+    
     def create_team_nodes(self, team_members):
         """
         Crée des nœuds Actor pour les membres de l'équipe du projet
@@ -182,9 +799,11 @@ class Neo4jConnector:
                     MATCH (f:Film {id: $film_id})
                     MERGE (a:Actor {name: $member_name, is_team_member: true})
                     MERGE (a)-[:A_JOUE_DANS]->(f)
+                    SET f.updated_at = timestamp()
                     """
                     self.graph.run(query, film_id=film_id, member_name=member)
                 
+                self.mark_data_changed()
                 print(f"✅ Nœuds d'équipe créés et liés au film avec ID {film_id}")
             else:
                 print("❌ Aucun film trouvé dans la base de données")
@@ -0,0 +1,18 @@
+# Expressions d'agrégation lisant les champs normalisés à l'import (genres, revenue, runtime),
+# avec repli sur les champs d'origine pour les documents importés avant leur introduction
+GENRES_FIELD = {"$ifNull": ["$genres", {"$map": {
+    "input": {"$split": [{"$ifNull": ["$genre", ""]}, ","]},
+    "in": {"$trim": {"input": "$$this"}}
+}}]}
+
+def _numeric_field(normalized, source):
+    return {"$ifNull": [f"${normalized}", {"$convert": {
+        "input": f"${source}", "to": "double", "onError": None, "onNull": None
+    }}]}
+
+REVENUE_FIELD = _numeric_field("revenue", "Revenue (Millions)")
+RUNTIME_FIELD = _numeric_field("runtime", "Runtime (Minutes)")
+METASCORE_FIELD = _numeric_field("metascore", "Metascore")
+
+# Décennie d'une année (1994 -> 1990)
+DECADE_EXPR = {"$multiply": [{"$floor": {"$divide": ["$year", 10]}}, 10]}
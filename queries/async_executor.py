@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Pilotes asynchrones optionnels : sans eux, les requêtes sont exécutées dans des threads
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+try:
+    from neo4j import AsyncGraphDatabase
+except ImportError:
+    AsyncGraphDatabase = None
+
+
+class AsyncQueryExecutor:
+    """
+    Exécute des requêtes MongoDB et Neo4j indépendantes en parallèle
+
+    L'exécuteur possède sa propre boucle asyncio, dans un thread dédié : il peut être
+    utilisé depuis du code synchrone (Streamlit) avec run(), qui attend toutes les
+    requêtes ensemble. La durée totale est celle de la requête la plus lente.
+
+    MongoDB passe par Motor et Neo4j par le pilote asynchrone officiel lorsqu'ils sont
+    installés ; sinon les connecteurs synchrones sont appelés via asyncio.to_thread.
+    """
+
+    def __init__(self, mongo_connector=None, neo4j_connector=None, max_workers=8):
+        """
+        Args:
+            mongo_connector: Instance de MongoDBConnector (optionnelle)
+            neo4j_connector: Instance de Neo4jConnector (optionnelle)
+            max_workers (int): Nombre de threads pour les appels synchrones
+        """
+        self.mongo = mongo_connector
+        self.neo4j = neo4j_connector
+        self._motor = None
+        self._driver = None
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=max_workers))
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-queries", daemon=True)
+        self._thread.start()
+
+        mongo_uri = mongo_connector.connection_uri if mongo_connector else None
+        neo4j_uri = neo4j_connector.connection_params[0] if neo4j_connector else None
+        self.backends = {
+            "mongodb": "motor" if AsyncIOMotorClient and mongo_uri else "threads",
+            "neo4j": "neo4j-async" if AsyncGraphDatabase and neo4j_uri else "threads"
+        }
+
+    # Clients asynchrones, créés dans la boucle de l'exécuteur
+
+    def _motor_films(self):
+        if self._motor is None:
+            self._motor = AsyncIOMotorClient(self.mongo.connection_uri)
+        return self._motor[self.mongo.db.name][self.mongo.films.name]
+
+    def _neo4j_driver(self):
+        if self._driver is None:
+            uri, auth = self.neo4j.connection_params
+            self._driver = AsyncGraphDatabase.driver(uri, auth=auth)
+        return self._driver
+
+    # Requêtes
+
+    async def aggregate(self, pipeline):
+        """
+        Pipeline d'agrégation sur la collection 'films'
+
+        Returns:
+            list: Documents résultats
+        """
+        if self.backends["mongodb"] == "motor":
+            return await self._motor_films().aggregate(pipeline).to_list(length=None)
+        return await asyncio.to_thread(lambda: list(self.mongo.films.aggregate(pipeline)))
+
+    async def find(self, filter=None, projection=None, sort=None, limit=0):
+        """
+        Recherche dans la collection 'films'
+
+        Returns:
+            list: Documents trouvés
+        """
+        def options(cursor):
+            if sort:
+                cursor = cursor.sort(sort)
+            return cursor.limit(limit) if limit else cursor
+
+        if self.backends["mongodb"] == "motor":
+            cursor = options(self._motor_films().find(filter or {}, projection))
+            return await cursor.to_list(length=None)
+        return await asyncio.to_thread(lambda: list(options(self.mongo.films.find(filter or {}, projection))))
+
+    async def cypher(self, query, **params):
+        """
+        Requête Cypher
+
+        Returns:
+            list: Lignes résultats (dictionnaires)
+        """
+        if self.backends["neo4j"] == "neo4j-async":
+            async with self._neo4j_driver().session() as session:
+                result = await session.run(query, params)
+                return await result.data()
+        return await asyncio.to_thread(lambda: self.neo4j.graph.run(query, **params).data())
+
+    async def call(self, function, *args, **kwargs):
+        """
+        Appelle une fonction synchrone (ex. une méthode query_N) dans un thread
+
+        Returns:
+            Le résultat de la fonction
+        """
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    # Exécution groupée
+
+    @staticmethod
+    async def _timed(name, awaitable, timings):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    async def gather(self, tasks, timings=None):
+        """
+        Attend un ensemble de requêtes lancées en même temps
+
+        Args:
+            tasks (dict): Nom -> coroutine (ex. executor.cypher(...))
+            timings (dict): Dictionnaire propre à l'appel recevant la durée (secondes)
+                de chaque requête
+
+        Returns:
+            dict: Nom -> résultat, ou exception levée par la requête
+        """
+        timings = {} if timings is None else timings
+        results = await asyncio.gather(*(self._timed(name, task, timings) for name, task in tasks.items()),
+                                       return_exceptions=True)
+        return dict(zip(tasks, results))
+
+    def run(self, tasks, timeout=None):
+        """
+        Version synchrone de gather, utilisable hors d'une boucle asyncio
+
+        Une requête en erreur n'interrompt pas les autres : son exception est
+        retournée à la place du résultat. Les durées sont propres à l'appel :
+        l'exécuteur peut être partagé par plusieurs sessions.
+
+        Args:
+            tasks (dict): Nom -> coroutine
+            timeout (float): Attente maximale en secondes (None pour illimitée)
+
+        Returns:
+            tuple: (Nom -> résultat ou exception, Nom -> durée en secondes avec la
+                durée totale sous "total")
+        """
+        timings = {}
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(self.gather(tasks, timings), self._loop)
+        results = future.result(timeout)
+        return results, dict(timings, total=time.perf_counter() - start)
+
+    def close(self):
+        """Ferme les clients asynchrones et arrête la boucle"""
+        async def shutdown():
+            if self._driver is not None:
+                await self._driver.close()
+            if self._motor is not None:
+                self._motor.close()
+
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
@@ -0,0 +1,295 @@
+import contextlib
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+# Version des données de chaque base ("mongodb", "neo4j"), incrémentée à chaque écriture
+_dataset_versions = {}
+_versions_lock = threading.Lock()
+
+# Identifiants uniques attribués aux connecteurs (plus sûrs que id(), qui peut être réutilisé)
+_scope_ids = itertools.count(1)
+
+# Appel en cours dont le résultat ne doit pas être mis en cache (voir skip_cache)
+_call_state = threading.local()
+
+
+def dataset_version(backend):
+    """
+    Retourne la version courante des données d'une base
+
+    Cette version n'est incrémentée que par les écritures faites dans ce processus
+    (bump_dataset_version) : les écritures d'un autre processus (sync_daemon, import
+    en ligne de commande) sont vues grâce au marqueur serveur du connecteur (ServerVersion).
+    """
+    return _dataset_versions.get(backend, 0)
+
+
+def bump_dataset_version(backend):
+    """
+    Signale que les données d'une base ont changé
+
+    Les résultats mis en cache pour l'ancienne version ne seront plus jamais servis.
+
+    Args:
+        backend (str): "mongodb" ou "neo4j"
+
+    Returns:
+        int: Nouvelle version
+    """
+    if in_dry_run():
+        # Analyse (EXPLAIN, plans) : aucune donnée n'a réellement changé
+        return dataset_version(backend)
+    with _versions_lock:
+        _dataset_versions[backend] = _dataset_versions.get(backend, 0) + 1
+        return _dataset_versions[backend]
+
+
+def skip_cache():
+    """
+    Empêche la mise en cache du résultat de l'appel en cours
+
+    À appeler dans une méthode décorée par cached_query lorsqu'elle retourne une
+    valeur de repli après une erreur : la valeur n'est pas servie aux appels suivants.
+    """
+    _call_state.skip = True
+
+
+@contextlib.contextmanager
+def dry_run():
+    """
+    Exécute des requêtes sans lire ni remplir le cache et sans signaler d'écriture
+
+    Utilisé par les analyses de plans (explain, EXPLAIN, PROFILE) : leurs résultats,
+    vides ou partiels, ne sont pas mis en cache, et les chemins d'écriture traversés
+    n'incrémentent ni la version locale ni les marqueurs serveur des connecteurs.
+    """
+    previous = getattr(_call_state, "dry_run", False)
+    _call_state.dry_run = True
+    try:
+        yield
+    finally:
+        _call_state.dry_run = previous
+
+
+def in_dry_run():
+    """Indique si le thread courant exécute des requêtes dans dry_run()"""
+    return getattr(_call_state, "dry_run", False)
+
+
+class ServerVersion:
+    """
+    Marqueur de version des données lu sur le serveur, au plus une fois par intervalle
+
+    Permet de voir les écritures faites par d'autres processus. En cas d'erreur de
+    lecture, la dernière valeur lue est conservée.
+    """
+
+    def __init__(self, source, interval=5.0):
+        """
+        Args:
+            source: Fonction sans argument retournant le marqueur (valeur hachable)
+            interval (float): Délai minimum (secondes) entre deux lectures du serveur
+        """
+        self.source = source
+        self.interval = interval
+        self._value = None
+        self._read_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force la lecture du marqueur au prochain appel"""
+        with self._lock:
+            self._read_at = None
+
+    def __call__(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._read_at is not None and now - self._read_at < self.interval:
+                return self._value
+            self._read_at = now
+            try:
+                self._value = self.source()
+            except Exception as e:
+                print(f"⚠️ Lecture de la version des données impossible: {e}")
+            return self._value
+
+
+class QueryCache:
+    """
+    Cache LRU borné avec durée de vie (TTL) pour les résultats de requêtes
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        """
+        Args:
+            maxsize (int): Nombre maximum de résultats conservés
+            ttl (float): Durée de vie d'un résultat en secondes
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Cherche un résultat dans le cache
+
+        Returns:
+            tuple: (trouvé, valeur)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        """Enregistre un résultat en évinçant le moins récemment utilisé si nécessaire"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache
+
+        Returns:
+            dict: hits, misses, hit_rate, evictions, size, maxsize, ttl
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl
+            }
+
+
+# Cache partagé par MongoDBQueries et Neo4jQueries
+QUERY_CACHE = QueryCache()
+
+# Attribut du connecteur qui vaut None tant que la base n'est pas connectée
+_HANDLES = {"mongodb": "client", "neo4j": "graph"}
+
+
+def _scope_of(connector):
+    """Identifiant stable du connecteur utilisé par une instance de requêtes"""
+    scope = getattr(connector, "_cache_scope", None)
+    if scope is None:
+        scope = next(_scope_ids)
+        try:
+            connector._cache_scope = scope
+        except AttributeError:
+            return id(connector)
+    return scope
+
+
+def _server_version_of(connector):
+    """Marqueur serveur des données du connecteur (None s'il n'en expose pas)"""
+    server_version = getattr(connector, "server_version", None)
+    return server_version() if callable(server_version) else None
+
+
+def data_marker(backend, connector):
+    """
+    Marqueur des données vues par un connecteur : version locale et marqueur serveur
+
+    Permet aux structures conservées par une instance (index, projections) d'être
+    reconstruites dans les mêmes conditions que les résultats de cached_query.
+
+    Args:
+        backend (str): "mongodb" ou "neo4j"
+        connector: Connecteur de la base
+
+    Returns:
+        tuple: (dataset_version, marqueur serveur)
+    """
+    return dataset_version(backend), _server_version_of(connector)
+
+
+def cached_query(backend, connector_attr, cache=QUERY_CACHE):
+    """
+    Décorateur mettant en cache le résultat d'une méthode de requête
+
+    La clé combine la classe, la méthode, les paramètres, le connecteur utilisé et
+    la version des données de la base : un import ou une construction de graphe
+    invalide donc automatiquement les résultats précédents.
+
+    La version locale (dataset_version) ne change qu'avec les écritures de ce processus.
+    Si le connecteur expose un marqueur serveur (attribut server_version, voir
+    ServerVersion), il entre aussi dans la clé : les écritures des autres processus
+    sont alors vues après au plus l'intervalle de lecture du marqueur. Sans marqueur,
+    elles ne sont vues qu'à l'expiration du TTL.
+
+    Les valeurs de repli retournées après une erreur (méthode ayant appelé skip_cache,
+    ou exception) ne sont pas mises en cache, pas plus que les résultats obtenus sans
+    connexion (connecteur absent ou déconnecté).
+
+    Les résultats retournés sont partagés entre les appels et ne doivent pas être modifiés.
+
+    Args:
+        backend (str): "mongodb" ou "neo4j"
+        connector_attr (str): Nom de l'attribut de l'instance contenant le connecteur
+        cache (QueryCache): Cache à utiliser
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            connector = getattr(self, connector_attr, None)
+            if connector is None or getattr(connector, _HANDLES[backend], None) is None or in_dry_run():
+                # Pas de connexion ou analyse de plans : le résultat n'est pas mis en cache
+                return method(self, *args, **kwargs)
+
+            key = (
+                type(self).__name__,
+                method.__name__,
+                _scope_of(connector),
+                data_marker(backend, connector),
+                args,
+                tuple(sorted(kwargs.items()))
+            )
+            try:
+                hit, value = cache.get(key)
+            except TypeError:
+                # Paramètres non hachables : pas de cache
+                return method(self, *args, **kwargs)
+            if hit:
+                return value
+
+            # L'indicateur est propre à l'appel (les appels imbriqués ont le leur)
+            outer_skip = getattr(_call_state, "skip", False)
+            _call_state.skip = False
+            try:
+                value = method(self, *args, **kwargs)
+                skipped = _call_state.skip
+            finally:
+                _call_state.skip = outer_skip
+            if not skipped:
+                cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
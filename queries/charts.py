@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+
+# Nombre maximum de points d'un nuage envoyé au navigateur (au-delà, échantillon)
+MAX_SCATTER_POINTS = 2000
+
+
+class ChartSpec:
+    """
+    Graphique déclaratif construit à partir d'un petit DataFrame déjà agrégé
+
+    Le graphique est décrit par une spécification Vega-Lite (to_vega_lite), rendue
+    par le navigateur : le serveur ne dessine rien. La spécification est construite
+    au premier affichage puis réutilisée tant que le ChartSpec reste en cache.
+
+    Types de graphiques :
+    - "bar" : barres dans l'ordre des lignes
+    - "line" : courbe avec points et valeurs annotées
+    - "scatter" : nuage de points avec droite de régression (trend=True)
+    """
+
+    def __init__(self, kind, data, x, y, title, x_title=None, y_title=None, trend=False):
+        """
+        Args:
+            kind (str): "bar", "line" ou "scatter"
+            data (pandas.DataFrame): Données agrégées
+            x (str): Colonne des abscisses
+            y (str): Colonne des ordonnées
+            title (str): Titre du graphique
+            x_title (str): Titre de l'axe des abscisses (par défaut le nom de la colonne)
+            y_title (str): Titre de l'axe des ordonnées (par défaut le nom de la colonne)
+            trend (bool): Ajouter la droite de régression ("scatter")
+        """
+        if kind == "scatter" and len(data) > MAX_SCATTER_POINTS:
+            data = data.sample(n=MAX_SCATTER_POINTS, random_state=0)
+        self.kind = kind
+        self.data = data.reset_index(drop=True)
+        self.x = x
+        self.y = y
+        self.title = title
+        self.x_title = x_title or x
+        self.y_title = y_title or y
+        self.trend = trend
+        self._spec = None
+
+    def to_vega_lite(self):
+        """
+        Spécification Vega-Lite, construite une seule fois et partagée entre les affichages
+
+        Returns:
+            dict: Spécification Vega-Lite (v5), données incluses (à ne pas modifier)
+        """
+        if self._spec is None:
+            self._spec = self._build_spec()
+        return self._spec
+
+    def _build_spec(self):
+        """Construit la spécification (NaN et valeurs manquantes -> null dans les données)"""
+        numeric_x = pd.api.types.is_numeric_dtype(self.data[self.x])
+        x = {"field": self.x, "title": self.x_title}
+        y = {"field": self.y, "type": "quantitative", "title": self.y_title}
+
+        if self.kind == "bar":
+            # Une barre par ligne, dans l'ordre des données
+            x.update({"type": "ordinal" if numeric_x else "nominal", "sort": None, "axis": {"labelAngle": -45}})
+            layers = [{"mark": {"type": "bar", "tooltip": True}}]
+        elif self.kind == "line":
+            x["type"] = "quantitative" if numeric_x else "ordinal"
+            x["axis"] = {"format": "d"} if numeric_x else {}
+            layers = [
+                {"mark": {"type": "line", "point": True, "tooltip": True}},
+                {"mark": {"type": "text", "dy": -10}, "encoding": {"text": {"field": self.y, "format": ".1f"}}}
+            ]
+        else:
+            x["type"] = "quantitative"
+            layers = [{"mark": {"type": "point", "tooltip": True}}]
+            if self.trend:
+                layers.append({"mark": {"type": "line", "color": "red"},
+                               "transform": [{"regression": self.y, "on": self.x}]})
+
+        return {
+            "$schema": VEGA_LITE_SCHEMA,
+            "title": self.title,
+            "data": {"values": json.loads(self.data[[self.x, self.y]].to_json(orient="records"))},
+            "encoding": {"x": x, "y": y},
+            "layer": layers
+        }
+
+    def __len__(self):
+        return len(self.data)
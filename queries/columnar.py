@@ -0,0 +1,637 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from film_schema import NUMERIC_SCHEMA, to_number, validate_movie
+from queries.genre_pairs import GenrePairIndex
+from queries.instrumentation import instrumented
+from queries.mongodb_queries import MongoDBQueries
+
+# Colonne numérique -> (champ normalisé, champ d'origine) ; le champ normalisé est lu en priorité
+NUMERIC_COLUMNS = {
+    "year": (None, "year"),
+    "votes": (None, "Votes"),
+    "revenue": ("revenue", "Revenue (Millions)"),
+    "runtime": ("runtime", "Runtime (Minutes)"),
+    "metascore": ("metascore", "Metascore")
+}
+
+# Champs lus dans MongoDB pour construire le stockage
+SNAPSHOT_PROJECTION = {
+    "_id": 1, "title": 1, "Description": 1, "Director": 1, "rating": 1,
+    "genre": 1, "genres": 1, "Actors": 1, "actors": 1,
+    "year": 1, "Votes": 1, "Revenue (Millions)": 1, "Runtime (Minutes)": 1, "Metascore": 1,
+    "revenue": 1, "runtime": 1, "metascore": 1
+}
+
+FORMAT_VERSION = 1
+
+
+def _split(value):
+    """Liste issue d'une chaîne séparée par des virgules (éléments vides retirés)"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class StringColumn:
+    """
+    Chaînes stockées dans un seul tableau d'octets UTF-8 et un tableau de positions
+
+    Les deux tableaux peuvent être projetés en mémoire (np.load(mmap_mode="r")) :
+    une chaîne n'est décodée que lorsqu'elle est lue.
+    """
+
+    def __init__(self, data, offsets):
+        """
+        Args:
+            data (np.ndarray): Octets UTF-8 de toutes les chaînes, bout à bout (uint8)
+            offsets (np.ndarray): Position de début de chaque chaîne, plus la fin (int64, n + 1)
+        """
+        self.data = data
+        self.offsets = offsets
+        self._codes = None
+
+    @classmethod
+    def from_strings(cls, values):
+        """Encode une liste de chaînes (None devient une chaîne vide)"""
+        encoded = [("" if value is None else str(value)).encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.data[start:stop]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def code(self, value):
+        """Indice d'une chaîne du dictionnaire (-1 si absente)"""
+        if self._codes is None:
+            self._codes = {name: index for index, name in enumerate(self)}
+        return self._codes.get(value, -1)
+
+
+class ColumnarFilmStore:
+    """
+    Films stockés en colonnes NumPy, sans serveur de base de données
+
+    - colonnes numériques (année, votes, revenu, durée, metascore) : float64, NaN si absent
+    - réalisateur et classification : codes int32 d'un dictionnaire de noms (-1 si absent)
+    - genres : masque de bits uint64 par film (une colonne de 64 genres par mot) pour les
+      filtres, et liste ordonnée des codes au format CSR (genre_indptr, genre_codes)
+    - acteurs : liste de codes par film au format CSR (actor_indptr, actor_codes)
+    - identifiants, titres, descriptions et dictionnaires : StringColumn
+
+    save() écrit un fichier .npy par tableau ; load() les projette en mémoire, le
+    démarrage ne dépend donc pas du nombre de films.
+    """
+
+    def __init__(self, arrays, strings):
+        """
+        Args:
+            arrays (dict): Nom -> tableau NumPy
+            strings (dict): Nom -> StringColumn
+        """
+        self.arrays = arrays
+        self.strings = strings
+        self._genre_pairs = None
+
+    def __len__(self):
+        return len(self.arrays["year"])
+
+    # Construction
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Construit le stockage à partir de documents de films
+
+        Les documents peuvent être normalisés (genres, actors, revenue...) ou bruts :
+        les mêmes replis que les expressions de queries.aggregation_fields sont appliqués.
+
+        Args:
+            documents (iterable): Documents de films (dictionnaires)
+
+        Returns:
+            ColumnarFilmStore: Stockage en mémoire
+        """
+        numeric = {name: [] for name in NUMERIC_COLUMNS}
+        ids, titles, descriptions = [], [], []
+        directors, ratings = [], []
+        genre_indptr, genre_codes, actor_indptr, actor_codes = [0], [], [0], []
+        names = {"director": {}, "rating": {}, "genre": {}, "actor": {}}
+
+        def encode(kind, value):
+            if value is None:
+                return -1
+            return names[kind].setdefault(value, len(names[kind]))
+
+        for document in documents:
+            ids.append(str(document.get("_id")))
+            titles.append(document.get("title"))
+            descriptions.append(document.get("Description"))
+            for column, (normalized, source) in NUMERIC_COLUMNS.items():
+                value = document.get(normalized) if normalized else None
+                if value is None:
+                    value = to_number(document.get(source), NUMERIC_SCHEMA[source][0])
+                numeric[column].append(np.nan if value is None else value)
+
+            directors.append(encode("director", document.get("Director")))
+            ratings.append(encode("rating", document.get("rating")))
+            genres = document.get("genres")
+            if genres is None:
+                genres = _split(document.get("genre"))
+            genre_codes.extend(encode("genre", genre) for genre in genres if genre)
+            genre_indptr.append(len(genre_codes))
+            actors = document.get("actors")
+            if actors is None:
+                actors = _split(document.get("Actors"))
+            actor_codes.extend(encode("actor", actor) for actor in actors)
+            actor_indptr.append(len(actor_codes))
+
+        words = max(1, -(-len(names["genre"]) // 64))
+        genre_indptr = np.array(genre_indptr, dtype=np.int64)
+        genre_codes = np.array(genre_codes, dtype=np.int32)
+        genre_rows = np.repeat(np.arange(len(ids)), np.diff(genre_indptr))
+        genre_bits = np.zeros((len(ids), words), dtype=np.uint64)
+        np.bitwise_or.at(genre_bits, (genre_rows, genre_codes // 64),
+                         np.left_shift(np.uint64(1), (genre_codes % 64).astype(np.uint64)))
+
+        arrays = {name: np.array(values, dtype=np.float64) for name, values in numeric.items()}
+        arrays.update({
+            "director": np.array(directors, dtype=np.int32),
+            "rating": np.array(ratings, dtype=np.int32),
+            "genre_bits": genre_bits,
+            "genre_indptr": genre_indptr,
+            "genre_codes": genre_codes,
+            "actor_indptr": np.array(actor_indptr, dtype=np.int64),
+            "actor_codes": np.array(actor_codes, dtype=np.int32)
+        })
+        strings = {
+            "ids": StringColumn.from_strings(ids),
+            "titles": StringColumn.from_strings(titles),
+            "descriptions": StringColumn.from_strings(descriptions)
+        }
+        for kind, encoded in names.items():
+            strings[f"{kind}_names"] = StringColumn.from_strings(list(encoded))
+        return cls(arrays, strings)
+
+    @classmethod
+    def from_json(cls, json_file):
+        """
+        Charge un fichier JSON (un film par ligne) comme le ferait l'import MongoDB
+
+        Les documents invalides (film_schema.validate_movie) sont ignorés.
+
+        Returns:
+            ColumnarFilmStore: Stockage en mémoire
+        """
+        from mongodb_connect import MongoDBConnector
+
+        rejected = 0
+
+        def documents():
+            nonlocal rejected
+            for movie_data, _ in MongoDBConnector._iter_json_documents(json_file):
+                movie, errors = validate_movie(movie_data)
+                if errors:
+                    rejected += 1
+                    continue
+                yield MongoDBConnector.normalize_movie(movie)
+
+        store = cls.from_documents(documents())
+        if rejected:
+            print(f"⚠️ {rejected} films invalides ignorés")
+        print(f"✅ {len(store)} films chargés en colonnes")
+        return store
+
+    @classmethod
+    def from_mongo(cls, mongo_connector, batch_size=10000):
+        """
+        Construit le stockage à partir d'un instantané de la collection 'films'
+
+        Returns:
+            ColumnarFilmStore: Stockage en mémoire
+        """
+        cursor = mongo_connector.films.find({}, SNAPSHOT_PROJECTION).batch_size(batch_size)
+        store = cls.from_documents(cursor)
+        print(f"✅ {len(store)} films copiés de MongoDB en colonnes")
+        return store
+
+    # Persistance
+
+    def save(self, path):
+        """
+        Enregistre le stockage dans un répertoire (un fichier .npy par tableau)
+
+        Args:
+            path (str): Répertoire de destination (créé si nécessaire)
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        for name, column in self.strings.items():
+            np.save(os.path.join(path, f"{name}.data.npy"), column.data)
+            np.save(os.path.join(path, f"{name}.offsets.npy"), column.offsets)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({"format": FORMAT_VERSION, "films": len(self),
+                       "arrays": sorted(self.arrays), "strings": sorted(self.strings)}, file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Ouvre un stockage enregistré par save()
+
+        Args:
+            path (str): Répertoire du stockage
+            mmap (bool): Projeter les fichiers en mémoire au lieu de les lire
+
+        Returns:
+            ColumnarFilmStore: Stockage
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Format de stockage colonnaire non supporté: {meta.get('format')}")
+
+        def read(name):
+            file_name = os.path.join(path, f"{name}.npy")
+            try:
+                return np.load(file_name, mmap_mode="r" if mmap else None)
+            except ValueError:
+                # Un tableau vide ne peut pas être projeté en mémoire
+                return np.load(file_name)
+
+        arrays = {name: read(name) for name in meta["arrays"]}
+        strings = {name: StringColumn(read(f"{name}.data"), read(f"{name}.offsets")) for name in meta["strings"]}
+        return cls(arrays, strings)
+
+    # Accès
+
+    def value(self, column, row):
+        """Valeur d'une colonne numérique pour un film (None si absente, int pour les champs entiers)"""
+        value = self.arrays[column][row]
+        if np.isnan(value):
+            return None
+        source = NUMERIC_COLUMNS[column][1]
+        return int(value) if NUMERIC_SCHEMA[source][0] is int else float(value)
+
+    def name(self, kind, code):
+        """Nom associé à un code de dictionnaire (None pour -1)"""
+        return None if code < 0 else self.strings[f"{kind}_names"][code]
+
+    def genre_mask(self, genre):
+        """Masque booléen des films d'un genre"""
+        code = self.strings["genre_names"].code(genre)
+        if code < 0:
+            return np.zeros(len(self), dtype=bool)
+        word = self.arrays["genre_bits"][:, code // 64]
+        return ((word >> np.uint64(code % 64)) & np.uint64(1)).astype(bool)
+
+    def genres_of(self, row):
+        """Genres d'un film, dans l'ordre d'origine"""
+        start, stop = self.arrays["genre_indptr"][row], self.arrays["genre_indptr"][row + 1]
+        return [self.name("genre", code) for code in self.arrays["genre_codes"][start:stop]]
+
+    def actors_of(self, row):
+        """Acteurs d'un film"""
+        start, stop = self.arrays["actor_indptr"][row], self.arrays["actor_indptr"][row + 1]
+        return [self.name("actor", code) for code in self.arrays["actor_codes"][start:stop]]
+
+    def genre_pairs(self):
+        """
+        Couples (film, genre), équivalent de l'$unwind des genres
+
+        Returns:
+            tuple: (indices des films, codes des genres), dans l'ordre des films
+        """
+        if self._genre_pairs is None:
+            indptr = self.arrays["genre_indptr"]
+            self._genre_pairs = (np.repeat(np.arange(len(self)), np.diff(indptr)),
+                                 np.asarray(self.arrays["genre_codes"], dtype=np.int64))
+        return self._genre_pairs
+
+    def document(self, row):
+        """
+        Document d'un film reconstruit à partir des colonnes
+
+        Returns:
+            dict: Champs d'origine du film (genre et Actors reconstruits à partir des listes)
+        """
+        return {
+            "_id": self.strings["ids"][row],
+            "title": self.strings["titles"][row],
+            "genre": ",".join(self.genres_of(row)),
+            "Description": self.strings["descriptions"][row],
+            "Director": self.name("director", self.arrays["director"][row]),
+            "Actors": ", ".join(self.actors_of(row)),
+            "year": self.value("year", row),
+            "Runtime (Minutes)": self.value("runtime", row),
+            "rating": self.name("rating", self.arrays["rating"][row]),
+            "Votes": self.value("votes", row),
+            "Revenue (Millions)": self.value("revenue", row),
+            "Metascore": self.value("metascore", row)
+        }
+
+
+def _top_per_group(groups, values, k):
+    """
+    Indices des k plus grandes valeurs de chaque groupe
+
+    Returns:
+        np.ndarray: Indices triés par groupe puis valeur décroissante (à valeur égale,
+            l'ordre d'origine est conservé)
+    """
+    order = np.lexsort((-values, groups))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(order) else order
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[rank < k]
+
+
+class ColumnarFilmQueries:
+    """
+    Requêtes de MongoDBQueries calculées sur un ColumnarFilmStore
+
+    Les méthodes ont les mêmes noms, paramètres et résultats que celles de
+    MongoDBQueries ; les regroupements sont vectorisés (bincount, lexsort) sur les
+    colonnes. Les paramètres server_side et fast sont acceptés pour la compatibilité
+    mais sans effet : toutes les données sont déjà en mémoire.
+    """
+
+    def __init__(self, store, seed=None):
+        """
+        Args:
+            store (ColumnarFilmStore): Films en colonnes
+            seed (int): Graine du tirage de l'échantillon de la requête 12
+        """
+        self.store = store
+        self._rng = np.random.default_rng(seed)
+        self._pair_index = None
+
+    def _decades(self, mask):
+        return (np.floor(self.store.arrays["year"][mask] / 10) * 10).astype(np.int64)
+
+    @instrumented("columnar", "store")
+    def query_1_year_with_most_films(self, fast=False):
+        """
+        1. Année où le plus grand nombre de films ont été sortis
+
+        Returns:
+            tuple: (année, nombre de films)
+        """
+        years = self.store.arrays["year"]
+        if len(years) == 0:
+            return None, None
+        known = ~np.isnan(years)
+        values, counts = np.unique(years[known], return_counts=True)
+        missing = int((~known).sum())
+        if len(counts) and counts.max() >= missing:
+            best = int(np.argmax(counts))
+            return int(values[best]), int(counts[best])
+        return None, missing
+
+    @instrumented("columnar", "store")
+    def query_2_films_after_1999(self):
+        """
+        2. Nombre de films sortis après 1999
+
+        Returns:
+            int: Nombre de films
+        """
+        return int((self.store.arrays["year"] > 1999).sum())
+
+    @instrumented("columnar", "store")
+    def query_3_average_votes_2007(self, fast=False):
+        """
+        3. Moyenne des votes des films sortis en 2007
+
+        Returns:
+            float: Moyenne des votes (0 sans film en 2007, None si aucun n'a de votes)
+        """
+        in_2007 = self.store.arrays["year"] == 2007
+        if not in_2007.any():
+            return 0
+        votes = self.store.arrays["votes"][in_2007]
+        votes = votes[~np.isnan(votes)]
+        return float(votes.mean()) if len(votes) else None
+
+    @instrumented("columnar", "store")
+    def query_4_films_per_year_histogram(self, fast=False):
+        """
+        4. Histogramme du nombre de films par année
+
+        Returns:
+            ChartSpec: L'histogramme (une barre par année)
+        """
+        years = self.store.arrays["year"]
+        values, counts = np.unique(years[~np.isnan(years)], return_counts=True)
+        if len(values) == 0:
+            return None
+        return MongoDBQueries._chart_films_per_year(pd.Series(counts, index=values.astype(np.int64)))
+
+    def _genre_counts(self):
+        _, genres = self.store.genre_pairs()
+        return np.bincount(genres, minlength=len(self.store.strings["genre_names"]))
+
+    @instrumented("columnar", "store")
+    def query_5_available_genres(self):
+        """
+        5. Genres de films disponibles
+
+        Returns:
+            list: Genres uniques triés
+        """
+        counts = self._genre_counts()
+        return sorted(self.store.name("genre", code) for code in np.flatnonzero(counts))
+
+    def genre_distribution(self, fast=False):
+        """
+        Nombre de films par genre
+
+        Returns:
+            pandas.DataFrame: Colonnes Genre et Count, triées par nombre décroissant
+        """
+        counts = self._genre_counts()
+        rows = sorted(((self.store.name("genre", code), int(counts[code])) for code in np.flatnonzero(counts)),
+                      key=lambda row: (-row[1], row[0]))
+        return pd.DataFrame([{"Genre": genre, "Count": count} for genre, count in rows], columns=["Genre", "Count"])
+
+    @instrumented("columnar", "store")
+    def query_6_highest_revenue_film(self):
+        """
+        6. Film qui a généré le plus de revenu
+
+        Returns:
+            dict: Document du film
+        """
+        revenue = self.store.arrays["revenue"]
+        if np.isnan(revenue).all():
+            return None
+        return self.store.document(int(np.nanargmax(revenue)))
+
+    @instrumented("columnar", "store")
+    def query_7_directors_with_more_than_5_films(self, fast=False):
+        """
+        7. Réalisateurs ayant réalisé plus de 5 films
+
+        Returns:
+            list: Dictionnaires {"_id": réalisateur, "count": nombre de films}
+        """
+        # Décalage d'un cran : le code -1 (sans réalisateur) devient le groupe 0
+        counts = np.bincount(self.store.arrays["director"] + 1)
+        directors = [{"_id": self.store.name("director", code - 1), "count": int(counts[code])}
+                     for code in np.flatnonzero(counts > 5)]
+        return sorted(directors, key=lambda director: (-director["count"], director["_id"] or ""))
+
+    @instrumented("columnar", "store")
+    def query_8_highest_average_revenue_genre(self, server_side=True):
+        """
+        8. Genre qui rapporte en moyenne le plus de revenus
+
+        Returns:
+            tuple: (genre, revenu moyen)
+        """
+        films, genres = self.store.genre_pairs()
+        revenue = self.store.arrays["revenue"][films]
+        known = ~np.isnan(revenue)
+        size = len(self.store.strings["genre_names"])
+        counts = np.bincount(genres[known], minlength=size)
+        if not counts.any():
+            return None, 0
+        sums = np.bincount(genres[known], weights=revenue[known], minlength=size)
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), -np.inf)
+        best = int(np.argmax(means))
+        return self.store.name("genre", best), float(means[best])
+
+    @instrumented("columnar", "store")
+    def query_9_top_3_films_by_decade(self, server_side=True):
+        """
+        9. Les 3 films les mieux notés (Metascore) de chaque décennie
+
+        Returns:
+            dict: "1990-1999" -> liste de {"title", "year", "Metascore"}
+        """
+        metascore = self.store.arrays["metascore"]
+        rows = np.flatnonzero(~np.isnan(metascore) & ~np.isnan(self.store.arrays["year"]))
+        decades = self._decades(rows)
+        result = {}
+        for index in _top_per_group(decades, metascore[rows], 3):
+            row, decade = int(rows[index]), int(decades[index])
+            result.setdefault(f"{decade}-{decade+9}", []).append({
+                "title": self.store.strings["titles"][row],
+                "year": self.store.value("year", row),
+                "Metascore": self.store.value("metascore", row)
+            })
+        return result
+
+    @instrumented("columnar", "store")
+    def query_10_longest_film_by_genre(self, server_side=True):
+        """
+        10. Film le plus long de chaque genre
+
+        Returns:
+            list: Dictionnaires {"title", "genre", "Runtime (Minutes)"} triés par genre
+        """
+        films, genres = self.store.genre_pairs()
+        runtime = self.store.arrays["runtime"][films]
+        known = ~np.isnan(runtime)
+        films, genres, runtime = films[known], genres[known], runtime[known]
+        longest = [{
+            "title": self.store.strings["titles"][int(films[index])],
+            "genre": self.store.name("genre", int(genres[index])),
+            "Runtime (Minutes)": self.store.value("runtime", int(films[index]))
+        } for index in _top_per_group(genres, runtime, 1)]
+        return sorted(longest, key=lambda film: film["genre"])
+
+    @instrumented("columnar", "store")
+    def query_11_create_high_rated_high_revenue_view(self):
+        """
+        11. Films à note > 80 et revenus > 50M (équivalent de la vue MongoDB)
+
+        Returns:
+            int: Nombre de films de la vue
+        """
+        return int(((self.store.arrays["metascore"] > 80) & (self.store.arrays["revenue"] > 50)).sum())
+
+    @instrumented("columnar", "store")
+    def query_12_runtime_revenue_correlation(self, server_side=True, sample_size=2000):
+        """
+        12. Corrélation entre durée et revenus des films
+
+        Returns:
+            tuple: (coefficient de corrélation, p-value, DataFrame d'au plus sample_size points)
+        """
+        runtime, revenue = self.store.arrays["runtime"], self.store.arrays["revenue"]
+        rows = np.flatnonzero(~np.isnan(runtime) & ~np.isnan(revenue))
+        if len(rows) < 2:
+            return 0, 0, None
+
+        x, y = runtime[rows], revenue[rows]
+        corr, p_value = MongoDBQueries._pearson_from_sums(
+            n=len(rows), sx=x.sum(), sy=y.sum(), sxx=(x * x).sum(), syy=(y * y).sum(), sxy=(x * y).sum())
+
+        sample = np.sort(self._rng.choice(rows, size=min(sample_size, len(rows)), replace=False))
+        return corr, p_value, pd.DataFrame({
+            "title": [self.store.strings["titles"][int(row)] for row in sample],
+            "Runtime (Minutes)": runtime[sample],
+            "Revenue (Millions)": revenue[sample]
+        }, columns=["title", "Runtime (Minutes)", "Revenue (Millions)"])
+
+    @instrumented("columnar", "store")
+    def query_13_average_runtime_by_decade(self, server_side=True, fast=False):
+        """
+        13. Durée moyenne des films par décennie
+
+        Returns:
+            tuple: (DataFrame des durées moyennes, ChartSpec de la courbe)
+        """
+        runtime = self.store.arrays["runtime"]
+        rows = np.flatnonzero(~np.isnan(runtime) & ~np.isnan(self.store.arrays["year"]))
+        if len(rows) == 0:
+            return None, None
+        decades, groups = np.unique(self._decades(rows), return_inverse=True)
+        means = np.bincount(groups, weights=runtime[rows]) / np.bincount(groups)
+        avg_runtime_by_decade = pd.DataFrame({"decade": decades, "Runtime (Minutes)": means})
+        return avg_runtime_by_decade, MongoDBQueries._chart_runtime_by_decade(avg_runtime_by_decade)
+
+    def genre_pair_index(self):
+        """
+        Index inversé genre -> films de la requête 27, construit au premier appel
+
+        Returns:
+            GenrePairIndex: Index des films du stockage
+        """
+        if self._pair_index is None:
+            store = self.store
+            self._pair_index = GenrePairIndex({
+                "title": store.strings["titles"][row],
+                "genres": store.genres_of(row),
+                "Director": store.name("director", store.arrays["director"][row])
+            } for row in range(len(store)))
+        return self._pair_index
+
+    @instrumented("columnar", "store")
+    def query_27_films_with_common_genres_different_directors(self, limit=100, offset=0):
+        """
+        27. Films qui ont des genres en commun mais des réalisateurs différents
+
+        Returns:
+            list: Liste de tuples (film1, film2, genres_communs)
+        """
+        return self.genre_pair_index().pairs(offset=offset, limit=limit)
+
+    def count_films_with_common_genres_different_directors(self):
+        """
+        Nombre total de paires de la requête 27
+
+        Returns:
+            int: Nombre de paires
+        """
+        return self.genre_pair_index().count()
@@ -0,0 +1,288 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def costar_graph(projection):
+    """
+    Graphe pondéré des co-stars : W = B @ B.T sans la diagonale
+
+    Le poids d'une arête est le nombre de films partagés par les deux acteurs.
+
+    Args:
+        projection (CoStarProjection): Projection Actor-Film (queries.graph_projection)
+
+    Returns:
+        scipy.sparse.csr_matrix: Matrice d'adjacence symétrique (acteurs x acteurs)
+    """
+    incidence = projection.matrix.astype(np.float64)
+    weights = (incidence @ incidence.T).tocsr()
+    weights.setdiag(0)
+    weights.eliminate_zeros()
+    return weights
+
+
+def costar_degrees(projection):
+    """
+    Degré pondéré de chaque acteur dans le graphe des co-stars, sans construire W
+
+    La somme de la ligne a de B @ B.T vaut B[a] @ (B.T @ 1) ; la diagonale retirée
+    de W est le nombre de films de l'acteur.
+
+    Returns:
+        numpy.ndarray: Somme des poids des arêtes de chaque acteur
+    """
+    incidence = projection.matrix.astype(np.float64)
+    film_sizes = np.asarray(incidence.sum(axis=0)).ravel()
+    films_per_actor = np.asarray(incidence.sum(axis=1)).ravel()
+    return incidence @ film_sizes - films_per_actor
+
+
+def costar_subgraph(projection, actors):
+    """
+    Sous-graphe des co-stars restreint à quelques acteurs (lignes et colonnes de W)
+
+    Args:
+        projection: Projection Actor-Film
+        actors (numpy.ndarray): Numéros des acteurs retenus
+
+    Returns:
+        scipy.sparse.csr_matrix: W[actors][:, actors], sans la diagonale
+    """
+    incidence = projection.matrix[actors].astype(np.float64)
+    weights = (incidence @ incidence.T).tocsr()
+    weights.setdiag(0)
+    weights.eliminate_zeros()
+    return weights
+
+
+def _row_chunks(n_rows, workers):
+    """Découpe les lignes en intervalles contigus, un ou plusieurs par worker"""
+    bounds = np.linspace(0, n_rows, max(1, workers) * 2 + 1, dtype=np.int64)
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _map_rows(function, n_rows, workers):
+    """
+    Applique function(start, stop) à des blocs de lignes, en parallèle si workers > 1
+
+    Les opérations NumPy/SciPy sur de grands tableaux libèrent le GIL : des threads
+    suffisent à occuper plusieurs cœurs sans copier le graphe dans des processus.
+    """
+    chunks = _row_chunks(n_rows, workers)
+    if workers <= 1 or len(chunks) == 1:
+        return [function(start, stop) for start, stop in chunks]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda bounds: function(*bounds), chunks))
+
+
+def _best_per_row(rows, cols, scores, n_rows):
+    """
+    Colonne de meilleur score de chaque ligne (entrées COO triées par ligne)
+
+    Le maximum est calculé par segment de ligne (np.maximum.reduceat), en temps
+    linéaire ; à score égal, la première colonne du segment est retenue.
+
+    Returns:
+        tuple: (lignes ayant au moins une entrée, meilleure colonne, meilleur score)
+    """
+    if len(rows) == 0:
+        return rows, cols, scores
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    best = np.maximum.reduceat(scores, starts)
+    candidates = np.flatnonzero(scores == np.repeat(best, np.diff(np.r_[starts, len(rows)])))
+    first = np.r_[True, rows[candidates[1:]] != rows[candidates[:-1]]]
+    chosen = candidates[first]
+    return rows[chosen], cols[chosen], scores[chosen]
+
+
+def _neighbour_label_weights(weights, labels, start, stop):
+    """Poids des liens de chaque nœud [start, stop) vers chaque étiquette voisine (COO)"""
+    block = weights[start:stop].tocoo()
+    if block.nnz == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+    summed = sp.coo_matrix((block.data, (block.row, labels[block.col])),
+                           shape=(stop - start, labels.max() + 1)).tocsr()
+    summed.sum_duplicates()
+    summed = summed.tocoo()
+    return summed.row + start, summed.col, summed.data
+
+
+def label_propagation(weights, max_iter=30, tol=1e-3, seed=0, workers=None):
+    """
+    Détection de communautés par propagation d'étiquettes pondérée
+
+    À chaque itération, chaque nœud prend l'étiquette dont le poids total parmi ses
+    voisins est le plus élevé (les égalités sont départagées au hasard, en gardant
+    l'étiquette courante si elle fait partie des meilleures). Seule une moitié des
+    nœuds, tirée au hasard, est mise à jour à chaque itération pour éviter les
+    oscillations des mises à jour synchrones.
+
+    Args:
+        weights (csr_matrix): Graphe pondéré symétrique
+        max_iter (int): Nombre maximum d'itérations
+        tol (float): Arrêt lorsque moins de tol * n nœuds changent d'étiquette
+        seed (int): Graine du tirage des nœuds mis à jour
+        workers (int): Nombre de threads (par défaut : nombre de cœurs)
+
+    Returns:
+        np.ndarray: Étiquette de communauté de chaque nœud (0..k-1)
+    """
+    workers = workers or os.cpu_count() or 1
+    n = weights.shape[0]
+    labels = np.arange(n, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    for iteration in range(max_iter):
+        def best_labels(start, stop):
+            rows, cols, links = _neighbour_label_weights(weights, labels, start, stop)
+            # Départage des égalités : bruit inférieur à tout écart de poids réel
+            noise = np.random.default_rng((seed, iteration, start)).random(len(rows)) * 1e-9
+            keep = (labels[rows] == cols) * 2e-9
+            return _best_per_row(rows, cols, links + noise + keep, n)
+
+        parts = _map_rows(best_labels, n, workers)
+        rows = np.concatenate([part[0] for part in parts])
+        best = np.concatenate([part[1] for part in parts])
+
+        update = rng.random(len(rows)) < 0.5
+        rows, best = rows[update], best[update]
+        changed = labels[rows] != best
+        labels[rows[changed]] = best[changed]
+        if changed.sum() < tol * n:
+            break
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def modularity(weights, labels):
+    """
+    Modularité d'une partition d'un graphe pondéré
+
+    Returns:
+        float: Modularité (entre -0,5 et 1)
+    """
+    degrees = np.asarray(weights.sum(axis=1)).ravel()
+    total = degrees.sum()
+    if total == 0:
+        return 0.0
+    coo = weights.tocoo()
+    inside = np.bincount(labels[coo.row], weights=coo.data * (labels[coo.row] == labels[coo.col]),
+                         minlength=labels.max() + 1)
+    community_degrees = np.bincount(labels, weights=degrees, minlength=labels.max() + 1)
+    return float((inside / total - (community_degrees / total) ** 2).sum())
+
+
+def _local_moving(weights, rng, max_iter, tol, workers):
+    """
+    Phase de déplacement locale de Louvain, vectorisée
+
+    Chaque nœud évalue le gain de modularité de son passage dans chaque communauté
+    voisine ; une moitié des nœuds tirée au hasard applique son meilleur déplacement.
+
+    Returns:
+        np.ndarray: Communauté de chaque nœud
+    """
+    n = weights.shape[0]
+    degrees = np.asarray(weights.sum(axis=1)).ravel()
+    total = degrees.sum()
+    labels = np.arange(n, dtype=np.int64)
+    if total == 0:
+        return labels
+    # Les boucles (poids interne des communautés agrégées) ne changent pas les gains relatifs
+    off_diagonal = weights - sp.diags(weights.diagonal())
+    off_diagonal = off_diagonal.tocsr()
+
+    for _ in range(max_iter):
+        community_degrees = np.bincount(labels, weights=degrees, minlength=n)
+
+        def best_moves(start, stop):
+            rows, cols, links = _neighbour_label_weights(off_diagonal, labels, start, stop)
+            current = labels[rows] == cols
+            # Gain (à un facteur près) de l'insertion du nœud dans la communauté cols
+            gains = links - degrees[rows] * (community_degrees[cols] - current * degrees[rows]) / total
+            own_gain = np.zeros(stop - start)
+            own_gain[rows[current] - start] = gains[current]
+            nodes = np.arange(start, stop)
+            # Nœuds sans lien vers leur propre communauté : gain de rester seul
+            isolated = np.ones(stop - start, dtype=bool)
+            isolated[rows[current] - start] = False
+            own_gain[isolated] = -degrees[nodes[isolated]] * (
+                community_degrees[labels[nodes[isolated]]] - degrees[nodes[isolated]]) / total
+            best_rows, best_cols, best_gains = _best_per_row(rows, cols, gains, n)
+            improves = best_gains > own_gain[best_rows - start] + 1e-12
+            return best_rows[improves], best_cols[improves]
+
+        parts = _map_rows(best_moves, n, workers)
+        rows = np.concatenate([part[0] for part in parts])
+        targets = np.concatenate([part[1] for part in parts])
+        update = rng.random(len(rows)) < 0.5
+        labels[rows[update]] = targets[update]
+        if update.sum() < tol * n:
+            break
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def louvain(weights, max_levels=10, max_iter=30, tol=1e-3, seed=0, workers=None):
+    """
+    Détection de communautés par la méthode de Louvain
+
+    Chaque niveau alterne une phase de déplacement locale (vectorisée, parallèle sur
+    des blocs de nœuds) et l'agrégation des communautés en super-nœuds
+    (W' = P.T @ W @ P), jusqu'à ce que la partition ne change plus.
+
+    Args:
+        weights (csr_matrix): Graphe pondéré symétrique
+        max_levels (int): Nombre maximum de niveaux d'agrégation
+        max_iter (int): Itérations maximum de la phase locale
+        tol (float): Arrêt de la phase locale lorsque moins de tol * n nœuds bougent
+        seed (int): Graine du tirage des nœuds déplacés
+        workers (int): Nombre de threads (par défaut : nombre de cœurs)
+
+    Returns:
+        np.ndarray: Communauté de chaque nœud (0..k-1)
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    n = weights.shape[0]
+    membership = np.arange(n, dtype=np.int64)
+    level_graph = weights.tocsr()
+
+    for _ in range(max_levels):
+        labels = _local_moving(level_graph, rng, max_iter, tol, workers)
+        n_communities = labels.max() + 1 if len(labels) else 0
+        if n_communities == level_graph.shape[0]:
+            break
+        membership = labels[membership]
+        assignment = sp.csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), labels)),
+                                   shape=(len(labels), n_communities))
+        level_graph = (assignment.T @ level_graph @ assignment).tocsr()
+
+    return membership
+
+
+def detect_communities(projection, method="louvain", workers=None, **options):
+    """
+    Communautés d'acteurs de la projection Actor-Film
+
+    Args:
+        projection (CoStarProjection): Projection Actor-Film
+        method (str): "louvain" ou "label_propagation"
+        workers (int): Nombre de threads
+        **options: Paramètres de l'algorithme (max_iter, tol, seed...)
+
+    Returns:
+        tuple: (communauté de chaque acteur, graphe des co-stars, modularité)
+    """
+    weights = costar_graph(projection)
+    if method == "louvain":
+        labels = louvain(weights, workers=workers, **options)
+    elif method == "label_propagation":
+        labels = label_propagation(weights, workers=workers, **options)
+    else:
+        raise ValueError(f"Méthode de détection inconnue: {method}")
+    return labels, weights, modularity(weights, labels)
@@ -0,0 +1,401 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+
+from queries.cache import bump_dataset_version
+from queries.graph_projection import REFRESH_OVERLAP_MS, read_graph_state
+
+# Films réalisés, avec tous leurs réalisateurs (calcul complet)
+DIRECTED_QUERY = """
+MATCH (d:Director)-[:A_REALISE]->(f:Film)
+RETURN f.id AS film_id, f.title AS title, f.year AS year, f.genre AS genre, collect(d.name) AS directors
+"""
+
+# Films écrits depuis une date (propriété updated_at, posée par Neo4jConnector)
+CHANGED_FILMS_QUERY = """
+MATCH (f:Film)
+WHERE f.updated_at >= $since
+OPTIONAL MATCH (d:Director)-[:A_REALISE]->(f)
+RETURN f.id AS film_id, f.title AS title, f.year AS year, f.genre AS genre, collect(d.name) AS directors
+"""
+
+# Films désignés par leur identifiant (ceux qui n'existent plus ne sont pas retournés)
+FILMS_BY_ID_QUERY = """
+UNWIND $ids AS id
+MATCH (f:Film {id: id})
+OPTIONAL MATCH (d:Director)-[:A_REALISE]->(f)
+RETURN f.id AS film_id, f.title AS title, f.year AS year, f.genre AS genre, collect(d.name) AS directors
+"""
+
+DIRECTED_COUNT_QUERY = "MATCH ()-[r:A_REALISE]->() RETURN count(r) AS edges"
+
+INFLUENCE_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (d1:Director {name: row.source}), (d2:Director {name: row.target})
+MERGE (d1)-[r:INFLUENCE_PAR]->(d2)
+SET r.similarity = row.similarity,
+    r.common_genres = row.common_genres
+"""
+
+COMPETITION_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (d1:Director {name: row.source}), (d2:Director {name: row.target})
+MERGE (d1)-[r:EN_CONCURRENCE_AVEC]->(d2)
+SET r.count = row.count,
+    r.years = row.years,
+    r.film_pairs = row.film_pairs
+"""
+
+# Suppression des relations dérivées d'une liste de réalisateurs (dans les deux sens)
+DELETE_FOR_DIRECTORS_QUERY = """
+UNWIND $names AS name
+MATCH (:Director {name: name})-[r:INFLUENCE_PAR|EN_CONCURRENCE_AVEC]-(:Director)
+DELETE r
+"""
+
+# Suppression de toutes les relations dérivées, par lots
+DELETE_ALL_QUERY = """
+MATCH (:Director)-[r:INFLUENCE_PAR|EN_CONCURRENCE_AVEC]->(:Director)
+WITH r LIMIT $limit
+DELETE r
+RETURN count(r) AS deleted
+"""
+
+
+def split_genres(value):
+    """Genres d'un film à partir de sa propriété genre ("Action,Drama")"""
+    if not value:
+        return set()
+    return {name.strip() for name in str(value).split(",") if name.strip()}
+
+
+class DirectorRelationships:
+    """
+    Relations dérivées entre réalisateurs, maintenues de façon incrémentale
+
+    - INFLUENCE_PAR (requête 24) : indice de Jaccard des ensembles de genres des deux
+      réalisateurs supérieur à JACCARD_THRESHOLD. Les intersections sont calculées par
+      le produit creux M @ M.T de la matrice réalisateurs x genres : seules les paires
+      partageant un genre sont examinées.
+    - EN_CONCURRENCE_AVEC (requête 29) : films des deux réalisateurs sortis la même année
+      avec au moins un genre commun. Les films sont regroupés par (année, genre) et seules
+      les paires d'un même groupe sont comparées.
+
+    Les propriétés sont recalculées et écrites avec SET (jamais incrémentées) : relancer le
+    calcul ne modifie pas le résultat. Lorsque des films sont ajoutés ou modifiés (titre,
+    année, genre, réalisateurs), seules les paires impliquant leurs anciens et nouveaux
+    réalisateurs sont recalculées ; celles qui ne sont plus valides sont supprimées.
+    """
+
+    JACCARD_THRESHOLD = 0.3
+
+    def __init__(self, batch_size=5000, block_size=2048):
+        """
+        Args:
+            batch_size (int): Nombre de relations par requête d'écriture
+            block_size (int): Nombre de réalisateurs par bloc du produit M @ M.T
+        """
+        self.batch_size = batch_size
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Vide l'état en mémoire"""
+        self.director_films = defaultdict(set)
+        self.film_directors = defaultdict(set)
+        self.films = {}
+        self.buckets = defaultdict(set)  # (année, genre) -> films
+        self.genre_films = defaultdict(set)  # genre -> films (toutes années)
+        self.influence = {}              # (source, cible) -> propriétés
+        self.competition = {}
+        self.edge_count = 0
+        # Marqueur GraphState et heure du serveur lus au début du dernier calcul
+        self.marker = None
+        self.synced_at = None
+
+    def _remove_film(self, film):
+        """
+        Retire un film de l'état en mémoire (compartiments de son ancienne année et de ses anciens genres)
+
+        Returns:
+            set: Anciens réalisateurs du film
+        """
+        directors = self.film_directors.pop(film, set())
+        for director in directors:
+            self.director_films[director].discard(film)
+            if not self.director_films[director]:
+                del self.director_films[director]
+        self.edge_count -= len(directors)
+
+        if film in self.films:
+            _, year, genres = self.films.pop(film)
+            for genre in genres:
+                films = self.genre_films.get(genre)
+                if films is not None:
+                    films.discard(film)
+                    if not films:
+                        del self.genre_films[genre]
+                bucket = self.buckets.get((year, genre))
+                if bucket is not None:
+                    bucket.discard(film)
+                    if not bucket:
+                        del self.buckets[(year, genre)]
+        return directors
+
+    def _set_films(self, records):
+        """
+        Remplace l'état en mémoire des films lus (une ligne par film, avec tous ses réalisateurs)
+
+        Returns:
+            set: Réalisateurs concernés (anciens et nouveaux réalisateurs des films)
+        """
+        affected = set()
+        for record in records:
+            film = record["film_id"]
+            affected |= self._remove_film(film)
+            directors = set(record["directors"])
+            if not directors:
+                continue
+            affected |= directors
+            genres = split_genres(record["genre"])
+            self.films[film] = (record["title"], record["year"], genres)
+            for genre in genres:
+                self.genre_films[genre].add(film)
+            if record["year"] is not None:
+                for genre in genres:
+                    self.buckets[(record["year"], genre)].add(film)
+            self.film_directors[film] = directors
+            for director in directors:
+                self.director_films[director].add(film)
+            self.edge_count += len(directors)
+        return affected
+
+    def _genres_of(self, director):
+        genres = set()
+        for film in self.director_films.get(director, ()):
+            genres |= self.films[film][2]
+        return genres
+
+    def _influence_pairs(self, affected):
+        """
+        Paires INFLUENCE_PAR impliquant au moins un réalisateur de affected
+
+        La matrice réalisateurs x genres ne contient que les réalisateurs concernés et
+        ceux qui partagent au moins un genre avec eux (les seuls dont l'indice de
+        Jaccard peut être non nul).
+
+        Returns:
+            dict: (source, cible) -> propriétés, source < cible
+        """
+        affected = {director for director in affected if director in self.director_films}
+        if len(affected) == len(self.director_films):
+            candidates = set(self.director_films)
+        else:
+            genres = set()
+            for director in affected:
+                genres |= self._genres_of(director)
+            candidates = set(affected)
+            for genre in genres:
+                for film in self.genre_films.get(genre, ()):
+                    candidates |= self.film_directors.get(film, set())
+        directors = sorted(candidates)
+        genre_sets = [self._genres_of(director) for director in directors]
+        genre_index = {}
+        rows, cols = [], []
+        for row, genres in enumerate(genre_sets):
+            for genre in genres:
+                rows.append(row)
+                cols.append(genre_index.setdefault(genre, len(genre_index)))
+        if not rows:
+            return {}
+
+        membership = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                   shape=(len(directors), len(genre_index)))
+        sizes = np.diff(membership.indptr)
+        position = {director: row for row, director in enumerate(directors)}
+        positions = np.array(sorted(position[d] for d in affected if d in position), dtype=np.int64)
+        by_genre = membership.T.tocsr()
+
+        pairs = {}
+        # Genres communs des réalisateurs concernés avec tous les autres, par blocs de lignes
+        for start in range(0, len(positions), self.block_size):
+            block = positions[start:start + self.block_size]
+            common = (membership[block] @ by_genre).tocoo()
+            first = block[common.row]
+            union = sizes[first] + sizes[common.col] - common.data
+            keep = (first != common.col) & (common.data / union > self.JACCARD_THRESHOLD)
+
+            for i, j, shared, total in zip(first[keep].tolist(), common.col[keep].tolist(),
+                                           common.data[keep].tolist(), union[keep].tolist()):
+                source, target = sorted((directors[i], directors[j]))
+                pairs[(source, target)] = {
+                    "similarity": shared / total,
+                    "common_genres": sorted(genre_sets[i] & genre_sets[j])
+                }
+        return pairs
+
+    def _competition_pairs(self, affected):
+        """
+        Paires EN_CONCURRENCE_AVEC impliquant au moins un réalisateur de affected (deux sens)
+
+        Returns:
+            dict: (source, cible) -> propriétés
+        """
+        film_pairs = defaultdict(set)
+        for director in affected:
+            for film in self.director_films.get(director, ()):
+                _, year, genres = self.films[film]
+                if year is None:
+                    continue
+                rivals = set()
+                for genre in genres:
+                    rivals |= self.buckets.get((year, genre), set())
+                rivals.discard(film)
+                for rival in rivals:
+                    for other in self.film_directors.get(rival, ()):
+                        if other != director:
+                            film_pairs[(director, other)].add((film, rival))
+                            film_pairs[(other, director)].add((rival, film))
+
+        pairs = {}
+        for (source, target), films in film_pairs.items():
+            ordered = sorted(films)
+            pairs[(source, target)] = {
+                "count": len(ordered),
+                "years": sorted({self.films[film][1] for film, _ in ordered}),
+                "film_pairs": [[self.films[f1][0], self.films[f2][0]] for f1, f2 in ordered]
+            }
+        return pairs
+
+    def _write(self, graph, query, pairs):
+        """Écrit des relations par lots UNWIND"""
+        rows = [dict(source=source, target=target, **properties)
+                for (source, target), properties in pairs.items()]
+        for start in range(0, len(rows), self.batch_size):
+            graph.run(query, rows=rows[start:start + self.batch_size])
+
+    def _apply(self, graph, affected, full):
+        """Recalcule les paires des réalisateurs concernés et remplace leurs relations"""
+        influence = self._influence_pairs(affected)
+        competition = self._competition_pairs(affected)
+
+        if full:
+            while True:
+                result = graph.run(DELETE_ALL_QUERY, limit=self.batch_size).data()
+                if not result or result[0]["deleted"] == 0:
+                    break
+            self.influence, self.competition = {}, {}
+        else:
+            names = sorted(affected)
+            for start in range(0, len(names), self.batch_size):
+                graph.run(DELETE_FOR_DIRECTORS_QUERY, names=names[start:start + self.batch_size])
+            for derived in (self.influence, self.competition):
+                for pair in [pair for pair in derived if pair[0] in affected or pair[1] in affected]:
+                    del derived[pair]
+
+        self._write(graph, INFLUENCE_WRITE_QUERY, influence)
+        self._write(graph, COMPETITION_WRITE_QUERY, competition)
+        self.influence.update(influence)
+        self.competition.update(competition)
+
+    def _directed_total(self, graph):
+        result = graph.run(DIRECTED_COUNT_QUERY).data()
+        return result[0]["edges"] if result else 0
+
+    def rebuild(self, graph):
+        """
+        Recalcule toutes les relations dérivées depuis Neo4j
+
+        Args:
+            graph: Graphe py2neo
+
+        Returns:
+            DirectorRelationships: self
+        """
+        with self._lock:
+            self._reset()
+            # Marqueur lu avant les films : une écriture concurrente sera relue au rafraîchissement
+            marker, now = read_graph_state(graph)
+            self._set_films(graph.run(DIRECTED_QUERY))
+            try:
+                self._apply(graph, set(self.director_films), full=True)
+            finally:
+                bump_dataset_version("neo4j")
+            self.marker, self.synced_at = marker, now
+        return self
+
+    def update_films(self, graph, film_ids=(), deleted_ids=()):
+        """
+        Met à jour les relations dérivées après l'écriture de films connus
+
+        À appeler avec les identifiants retournés par Neo4jConnector.apply_film_changes
+        (film_ids, deleted_ids) : les films sont relus par identifiant, sans attendre
+        le rafraîchissement suivant.
+
+        Args:
+            graph: Graphe py2neo
+            film_ids (iterable): Identifiants des films ajoutés ou modifiés
+            deleted_ids (iterable): Identifiants des films supprimés
+
+        Returns:
+            set: Réalisateurs dont les relations ont été recalculées
+        """
+        film_ids = list(film_ids)
+        with self._lock:
+            affected = set()
+            for film in deleted_ids:
+                affected |= self._remove_film(film)
+            records = graph.run(FILMS_BY_ID_QUERY, ids=film_ids).data() if film_ids else []
+            affected |= self._set_films(records)
+            # Films introuvables : supprimés depuis l'écriture
+            for film in set(film_ids) - {record["film_id"] for record in records}:
+                affected |= self._remove_film(film)
+            if affected:
+                try:
+                    self._apply(graph, affected, full=False)
+                finally:
+                    bump_dataset_version("neo4j")
+        return affected
+
+    def refresh(self, graph):
+        """
+        Met à jour les relations dérivées si le graphe a changé
+
+        Le marqueur GraphState (voir queries.graph_projection) est lu à chaque appel.
+        S'il a changé, les films écrits depuis le dernier calcul (propriété updated_at,
+        avec une marge de REFRESH_OVERLAP_MS) sont relus avec tous leurs réalisateurs et
+        les paires de leurs anciens et nouveaux réalisateurs sont recalculées. Le premier
+        appel, la suppression de films, la remise à zéro du marqueur ou un nombre de
+        relations A_REALISE différent de celui de Neo4j déclenchent un recalcul complet.
+
+        Returns:
+            DirectorRelationships: self
+        """
+        marker, now = read_graph_state(graph)
+        if self.synced_at is None:
+            return self.rebuild(graph)
+        if marker is None:
+            # Graphe écrit sans marqueur : seul le nombre de relations peut être vérifié
+            if self.marker is None and self.edge_count == self._directed_total(graph):
+                return self
+            return self.rebuild(graph)
+        if marker == self.marker:
+            return self
+        if self.marker is None or marker[1] != self.marker[1] or marker[0] < self.marker[0]:
+            return self.rebuild(graph)
+
+        with self._lock:
+            since = self.synced_at - REFRESH_OVERLAP_MS
+            affected = self._set_films(graph.run(CHANGED_FILMS_QUERY, since=since))
+            consistent = self.edge_count == self._directed_total(graph)
+            if consistent:
+                if affected:
+                    try:
+                        self._apply(graph, affected, full=False)
+                    finally:
+                        bump_dataset_version("neo4j")
+                self.marker, self.synced_at = marker, now
+        return self if consistent else self.rebuild(graph)
@@ -0,0 +1,230 @@
+import threading
+from bson import ObjectId
+
+from queries.aggregation_fields import GENRES_FIELD, RUNTIME_FIELD
+
+STATS_COLLECTION = "films_stats"
+
+# Document de suivi des rafraîchissements dans la collection des statistiques
+META_ID = {"kind": "meta", "value": "refresh"}
+
+
+def _is_set(expression):
+    """1 si l'expression a une valeur numérique, 0 sinon (pour compter les valeurs d'un $avg)"""
+    return {"$cond": [{"$isNumber": expression}, 1, 0]}
+
+
+class FilmStatsMaterializer:
+    """
+    Statistiques agrégées de la collection 'films', matérialisées dans 'films_stats'
+
+    Chaque document de 'films_stats' est un compartiment identifié par
+    _id = {"kind": ..., "value": ...} :
+
+    - kind "year" : nombre de films, sommes et effectifs des votes et des durées
+      (les moyennes se recombinent par décennie ou sur plusieurs années)
+    - kind "genre" : nombre de films du genre
+    - kind "director" : nombre de films du réalisateur
+
+    Les compartiments sont écrits par $merge : un rafraîchissement limité à
+    quelques années, genres ou réalisateurs ne relit que les films concernés.
+    """
+
+    def __init__(self, mongo_connector):
+        """
+        Args:
+            mongo_connector: Instance de MongoDBConnector
+        """
+        self.mongo = mongo_connector
+
+    @property
+    def stats(self):
+        return self.mongo.db[STATS_COLLECTION]
+
+    def _pipelines(self):
+        """Pipeline de calcul de chaque type de compartiment, avant filtrage et $merge"""
+        return {
+            "year": ("year", [
+                {"$group": {
+                    "_id": {"kind": "year", "value": "$year"},
+                    "count": {"$sum": 1},
+                    "votes_sum": {"$sum": "$Votes"},
+                    "votes_count": {"$sum": _is_set("$Votes")},
+                    "runtime_sum": {"$sum": RUNTIME_FIELD},
+                    "runtime_count": {"$sum": _is_set(RUNTIME_FIELD)}
+                }}
+            ]),
+            "genre": ("genres", [
+                {"$project": {"_id": 0, "genre": GENRES_FIELD}},
+                {"$unwind": "$genre"},
+                {"$match": {"genre": {"$ne": ""}}},
+                {"$group": {"_id": {"kind": "genre", "value": "$genre"}, "count": {"$sum": 1}}}
+            ]),
+            "director": ("Director", [
+                {"$group": {"_id": {"kind": "director", "value": "$Director"}, "count": {"$sum": 1}}}
+            ])
+        }
+
+    def refresh(self, years=None, genres=None, directors=None):
+        """
+        Recalcule des compartiments de statistiques
+
+        Sans argument, tous les compartiments sont recalculés. Sinon seuls les
+        compartiments des valeurs données sont relus et remplacés ; ceux qui n'ont
+        plus aucun film sont supprimés.
+
+        Le cache des résultats n'est invalidé (mark_data_changed) que si des
+        compartiments ont changé, si les statistiques n'existaient pas encore, ou
+        si le calcul a échoué (compartiments peut-être écrits en partie).
+
+        Args:
+            years (iterable): Années à recalculer
+            genres (iterable): Genres à recalculer
+            directors (iterable): Réalisateurs à recalculer
+
+        Returns:
+            int: Nombre de compartiments écrits
+        """
+        full = years is None and genres is None and directors is None
+        keys = {"year": years, "genre": genres, "director": directors}
+        run = ObjectId()
+        # Horloge du serveur, comme les dates updated_at comparées par refresh_changed
+        started = self.mongo.server_time()
+        written = 0
+        changed = failed = False
+
+        try:
+            changed = not self.available()
+            for kind, (field, pipeline) in self._pipelines().items():
+                values = None if full else sorted(set(keys[kind] or ()), key=str)
+                if values is not None and not values:
+                    continue
+                before = self._contents(kind, values)
+                stages = ([{"$match": {field: {"$in": values}}}] if values is not None else []) + pipeline
+                if kind == "genre" and values is not None:
+                    # Un film des genres demandés compte aussi pour ses autres genres
+                    stages.append({"$match": {"_id.value": {"$in": values}}})
+                stages += [
+                    {"$set": {"run": run}},
+                    {"$merge": {"into": STATS_COLLECTION, "on": "_id",
+                                "whenMatched": "replace", "whenNotMatched": "insert"}}
+                ]
+                self.mongo.films.aggregate(stages)
+
+                # Compartiments non réécrits : plus aucun film
+                stale = {"_id.kind": kind, "run": {"$ne": run}}
+                if values is not None:
+                    stale["_id.value"] = {"$in": values}
+                self.stats.delete_many(stale)
+                written += self.stats.count_documents({"_id.kind": kind, "run": run})
+                changed = changed or self._contents(kind, values) != before
+
+            self.stats.update_one({"_id": META_ID}, {"$set": {"refreshed_at": started}}, upsert=True)
+            print(f"✅ Statistiques matérialisées ({written} compartiments)")
+        except Exception as e:
+            failed = True
+            print(f"❌ Erreur lors du calcul des statistiques: {e}")
+        finally:
+            if changed or failed:
+                # Les résultats en cache du mode rapide ne correspondent plus
+                self.mongo.mark_data_changed()
+        return written
+
+    def _contents(self, kind, values=None):
+        """
+        Contenu des compartiments d'un type (sans le numéro de rafraîchissement)
+
+        Returns:
+            dict: Valeur -> compteurs du compartiment
+        """
+        query = {"_id.kind": kind}
+        if values is not None:
+            query["_id.value"] = {"$in": values}
+        return {doc["_id"]["value"]: doc for doc in self.stats.find(query, {"run": 0})}
+
+    def refreshed_at(self):
+        """Date du dernier rafraîchissement, None si les statistiques n'ont jamais été calculées"""
+        meta = self.stats.find_one({"_id": META_ID})
+        return meta.get("refreshed_at") if meta else None
+
+    def refresh_changed(self):
+        """
+        Recalcule les compartiments des films écrits depuis le dernier rafraîchissement
+
+        Les films modifiés sont repérés par leur champ updated_at. Un film supprimé
+        ou changé d'année laisse son ancien compartiment inchangé jusqu'au prochain
+        rafraîchissement complet.
+
+        Returns:
+            int: Nombre de compartiments écrits
+        """
+        since = self.refreshed_at()
+        if since is None:
+            return self.refresh()
+
+        field = self.mongo.UPDATED_AT_FIELD
+        changed = list(self.mongo.films.find({field: {"$gt": since}},
+                                             {"year": 1, "genres": 1, "Director": 1, "_id": 0}))
+        if not changed:
+            return 0
+        return self.refresh(
+            years={film.get("year") for film in changed},
+            genres={genre for film in changed for genre in film.get("genres") or []},
+            directors={film.get("Director") for film in changed}
+        )
+
+    def schedule(self, interval=600, full_every=6):
+        """
+        Rafraîchit les statistiques périodiquement dans un thread
+
+        Chaque passage recalcule les compartiments des films modifiés (refresh_changed) ;
+        un passage sur full_every recalcule tout (refresh), ce qui corrige les
+        compartiments laissés par les films supprimés ou changés d'année.
+
+        Args:
+            interval (float): Intervalle en secondes entre deux rafraîchissements
+            full_every (int): Nombre de passages entre deux recalculs complets
+
+        Returns:
+            threading.Event: Événement à déclencher (set()) pour arrêter le rafraîchissement
+        """
+        stop = threading.Event()
+
+        def loop():
+            runs = 0
+            while not stop.wait(interval):
+                runs += 1
+                try:
+                    if runs % full_every == 0:
+                        self.refresh()
+                    else:
+                        self.refresh_changed()
+                except Exception as e:
+                    print(f"❌ Erreur lors du rafraîchissement planifié des statistiques: {e}")
+
+        threading.Thread(target=loop, name="films-stats", daemon=True).start()
+        return stop
+
+    # Lecture
+
+    def available(self):
+        """Indique si les statistiques ont déjà été matérialisées"""
+        return self.refreshed_at() is not None
+
+    def buckets(self, kind, query=None):
+        """
+        Compartiments d'un type
+
+        Args:
+            kind (str): "year", "genre" ou "director"
+            query (dict): Filtre supplémentaire évalué par MongoDB (ex. {"count": {"$gt": 5}})
+
+        Returns:
+            list: Documents {"value", "count", ...} du type demandé
+        """
+        return [dict(doc, value=doc["_id"]["value"])
+                for doc in self.stats.find({"_id.kind": kind, **(query or {})})]
+
+    def year_bucket(self, year):
+        """Compartiment d'une année (None s'il n'existe pas)"""
+        return self.stats.find_one({"_id": {"kind": "year", "value": year}})
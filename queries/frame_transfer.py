@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import bson
+from pymongo.collection import Collection
+
+# Transfert Arrow optionnel : sans pymongoarrow, les lots BSON bruts sont décodés ici
+try:
+    from pymongoarrow.api import Schema, aggregate_arrow_all
+except ImportError:
+    Schema = aggregate_arrow_all = None
+
+# Type déclaré d'une colonne -> type pandas du DataFrame retourné
+# (entiers nullables : un champ absent ne force pas la colonne en float)
+COLUMN_DTYPES = {
+    float: "float64",
+    int: "Int64",
+    str: "object",
+    bool: "boolean"
+}
+
+
+def _to_float(value):
+    """
+    Valeur numérique d'un champ, NaN si absente ou non numérique
+
+    Même conversion que _numeric_expression côté serveur ($convert) : les nombres
+    sont gardés, les chaînes numériques sans espaces converties, le reste (booléens,
+    chaînes vides ou non numériques) vaut NaN.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value == value.strip() and "_" not in value:
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def _numeric_expression(field):
+    """Expression d'agrégation convertissant un champ en nombre comme _to_float"""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$isNumber": f"${field}"}, "then": {"$toDouble": f"${field}"}},
+            {"case": {"$eq": [{"$type": f"${field}"}, "string"]},
+             "then": {"$convert": {"input": f"${field}", "to": "double", "onError": None, "onNull": None}}}
+        ],
+        "default": None
+    }}
+
+
+def _integers(numbers):
+    """Entiers nullables d'un tableau de flottants (NA si manquant, infini ou non entier)"""
+    whole = np.isfinite(numbers) & (numbers == np.floor(numbers))
+    return pd.arrays.IntegerArray(np.where(whole, numbers, 0).astype(np.int64), ~whole)
+
+
+def _column(values, kind):
+    """Tableau d'une colonne d'un lot, au type déclaré (valeurs d'un autre type manquantes)"""
+    if kind is float:
+        return np.fromiter((_to_float(value) for value in values), dtype=np.float64, count=len(values))
+    if kind is int:
+        return _integers(np.fromiter((_to_float(value) for value in values), dtype=np.float64, count=len(values)))
+    if kind is bool:
+        return pd.array([value if isinstance(value, bool) else pd.NA for value in values], dtype="boolean")
+    column = np.empty(len(values), dtype=object)
+    column[:] = [value if isinstance(value, str) else None for value in values]
+    return column
+
+
+def _raw_batches(cursor_factory, fallback_factory, batch_size):
+    """
+    Lots de documents décodés un lot à la fois
+
+    Les lots BSON bruts (find_raw_batches / aggregate_raw_batches) sont décodés
+    par le module C de bson ; seuls les documents du lot courant existent en
+    mémoire. Les clients sans lots bruts (ex. mongomock) sont lus par tranches.
+    """
+    try:
+        cursor = cursor_factory()
+    except (AttributeError, NotImplementedError):
+        cursor = None
+
+    if cursor is not None:
+        for raw in cursor:
+            yield bson.decode_all(raw)
+        return
+
+    batch = []
+    for document in fallback_factory():
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _frame_from_batches(batches, schema):
+    """Assemble les colonnes des lots en un DataFrame au schéma déclaré"""
+    chunks = {field: [] for field in schema}
+    for documents in batches:
+        for field, kind in schema.items():
+            chunks[field].append(_column([document.get(field) for document in documents], kind))
+
+    columns = {}
+    for field, kind in schema.items():
+        parts = chunks.pop(field)
+        if not parts:
+            columns[field] = pd.Series([], dtype=COLUMN_DTYPES[kind])
+        elif isinstance(parts[0], np.ndarray):
+            columns[field] = np.concatenate(parts)
+        else:
+            columns[field] = pd.concat([pd.Series(part) for part in parts], ignore_index=True).array
+    return pd.DataFrame(columns, columns=list(schema))
+
+
+def _arrow_query(schema):
+    """
+    Projection et schéma Arrow d'une lecture pymongoarrow
+
+    Les champs numériques sont convertis en double par le serveur (_numeric_expression) :
+    pymongoarrow laisserait vides les chaînes numériques que _to_float convertit.
+    """
+    projection = {"_id": 0}
+    arrow_schema = {}
+    for field, kind in schema.items():
+        numeric = kind in (int, float)
+        projection[field] = _numeric_expression(field) if numeric else 1
+        arrow_schema[field] = float if numeric else kind
+    return projection, Schema(arrow_schema)
+
+
+def _frame_from_arrow(table, schema):
+    """DataFrame d'une table Arrow lue avec _arrow_query, avec les types de _column"""
+    df = table.to_pandas()
+    columns = {}
+    for field, kind in schema.items():
+        if field not in df:
+            columns[field] = pd.Series([None] * len(df), dtype=COLUMN_DTYPES[kind])
+        elif kind is int:
+            columns[field] = _integers(df[field].to_numpy(dtype=np.float64, na_value=np.nan))
+        elif kind is str:
+            columns[field] = df[field].astype(object).where(df[field].notna(), None).to_numpy()
+        else:
+            columns[field] = df[field].astype(COLUMN_DTYPES[kind])
+    return pd.DataFrame(columns, columns=list(schema))
+
+
+def find_frame(collection, filter=None, schema=None, batch_size=10000):
+    """
+    Résultat d'un find sous forme de DataFrame, sans liste intermédiaire de documents
+
+    Seuls les champs du schéma sont demandés au serveur. Avec pymongoarrow, les
+    lots BSON sont convertis directement en colonnes Arrow ; sinon chaque lot
+    brut est décodé puis copié dans des tableaux NumPy avant le lot suivant.
+
+    Args:
+        collection: Collection pymongo
+        filter (dict): Filtre de la requête
+        schema (dict): Champ -> type Python (float, int, str ou bool)
+        batch_size (int): Nombre de documents par lot
+
+    Returns:
+        pandas.DataFrame: Une colonne typée par champ du schéma
+    """
+    filter = filter or {}
+    projection = dict.fromkeys(schema, 1)
+    projection.setdefault("_id", 0)
+
+    if aggregate_arrow_all is not None and isinstance(collection, Collection):
+        arrow_projection, arrow_schema = _arrow_query(schema)
+        pipeline = [{"$match": filter}, {"$project": arrow_projection}]
+        table = aggregate_arrow_all(collection, pipeline, schema=arrow_schema)
+        return _frame_from_arrow(table, schema)
+
+    batches = _raw_batches(
+        lambda: collection.find_raw_batches(filter, projection, batch_size=batch_size),
+        lambda: collection.find(filter, projection, batch_size=batch_size),
+        batch_size
+    )
+    return _frame_from_batches(batches, schema)
+
@@ -0,0 +1,140 @@
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from heapq import merge
+from itertools import islice
+
+
+class GenrePairIndex:
+    """
+    Index inversé genre -> films pour la requête 27
+
+    L'index est construit une seule fois : chaque genre pointe vers la liste triée
+    des numéros de films qui le possèdent. Les paires de films (genre commun,
+    réalisateurs différents) sont ensuite produites à la demande, sans jamais
+    comparer tous les films deux à deux.
+    """
+
+    def __init__(self, films):
+        """
+        Construit l'index
+
+        Args:
+            films (iterable): Dictionnaires avec 'title', 'Director' et 'genres' (liste)
+                ou 'genre' (chaîne séparée par des virgules)
+        """
+        self.titles = []
+        self.directors = array('l')
+        self.film_genres = []
+        self.genre_names = []
+
+        genre_ids = {}
+        director_ids = {}
+        postings = defaultdict(lambda: array('l'))
+
+        for film_id, film in enumerate(films):
+            genres = film.get('genres')
+            if genres is None:
+                genres = [g.strip() for g in (film.get('genre') or '').split(',')]
+
+            ids = []
+            for name in genres:
+                if not name:
+                    continue
+                if name not in genre_ids:
+                    genre_ids[name] = len(self.genre_names)
+                    self.genre_names.append(name)
+                gid = genre_ids[name]
+                if gid not in ids:
+                    ids.append(gid)
+                    postings[gid].append(film_id)
+
+            self.titles.append(film.get('title'))
+            self.film_genres.append(tuple(sorted(ids)))
+            self.directors.append(director_ids.setdefault(film.get('Director'), len(director_ids)))
+
+        # Les numéros de films sont ajoutés dans l'ordre : chaque liste est déjà triée
+        self.postings = [postings[gid] for gid in range(len(self.genre_names))]
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _candidates(self, film_id):
+        """Films d'indice supérieur partageant au moins un genre avec film_id (triés, sans doublon)"""
+        streams = []
+        for gid in self.film_genres[film_id]:
+            posting = self.postings[gid]
+            start = bisect_right(posting, film_id)
+            streams.append(islice(posting, start, None))
+
+        previous = None
+        for other in merge(*streams):
+            if other != previous:
+                previous = other
+                yield other
+
+    def iter_pairs(self):
+        """
+        Génère paresseusement les paires (film1, film2, genres_communs)
+
+        L'ordre est celui de l'algorithme d'origine : film1 dans l'ordre de la
+        collection, puis film2 parmi les films suivants.
+        """
+        for film_id in range(len(self.titles)):
+            genres = self.film_genres[film_id]
+            if not genres:
+                continue
+            director = self.directors[film_id]
+            genre_set = set(genres)
+
+            for other in self._candidates(film_id):
+                if self.directors[other] == director:
+                    continue
+                common = [self.genre_names[gid] for gid in self.film_genres[other] if gid in genre_set]
+                yield self.titles[film_id], self.titles[other], sorted(common)
+
+    def pairs(self, offset=0, limit=None):
+        """
+        Retourne une page de paires, en s'arrêtant dès que la limite est atteinte
+
+        Args:
+            offset (int): Nombre de paires à sauter
+            limit (int): Nombre maximum de paires à retourner (None pour toutes)
+
+        Returns:
+            list: Liste de tuples (film1, film2, genres_communs)
+        """
+        stop = None if limit is None else offset + limit
+        return list(islice(self.iter_pairs(), offset, stop))
+
+    @staticmethod
+    def _count_sharing_pairs(signature_counts):
+        """
+        Compte les paires de films partageant au moins un genre
+
+        Les films sont regroupés par ensemble de genres (signature) : le calcul ne
+        dépend que du nombre de signatures distinctes, pas du nombre de films.
+        """
+        signatures = [(frozenset(sig), count) for sig, count in signature_counts.items() if sig]
+        total = 0
+        for i, (sig1, count1) in enumerate(signatures):
+            total += count1 * (count1 - 1) // 2
+            for sig2, count2 in signatures[i+1:]:
+                if sig1 & sig2:
+                    total += count1 * count2
+        return total
+
+    def count(self):
+        """
+        Compte le nombre total de paires sans les générer
+
+        Returns:
+            int: Nombre de paires (genre commun, réalisateurs différents)
+        """
+        all_signatures = Counter(self.film_genres)
+        by_director = defaultdict(Counter)
+        for genres, director in zip(self.film_genres, self.directors):
+            by_director[director][genres] += 1
+
+        same_director = sum(self._count_sharing_pairs(signatures) for signatures in by_director.values())
+        return self._count_sharing_pairs(all_signatures) - same_director
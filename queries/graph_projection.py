@@ -0,0 +1,398 @@
+import heapq
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+# Relations acteur -> film de tout le graphe (chargement complet)
+EDGES_QUERY = """
+MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
+RETURN a.name AS actor, f.id AS film_id, f.title AS title, f.year AS year, f.votes AS votes
+"""
+
+# Films écrits depuis une date (propriété updated_at, posée par Neo4jConnector), avec tous leurs acteurs
+CHANGED_FILMS_QUERY = """
+MATCH (f:Film)
+WHERE f.updated_at >= $since
+OPTIONAL MATCH (a:Actor)-[:A_JOUE_DANS]->(f)
+RETURN f.id AS film_id, f.title AS title, f.year AS year, f.votes AS votes, collect(a.name) AS actors
+"""
+
+# Nombre de relations (lu dans le compteur de Neo4j, sans parcours)
+EDGE_COUNT_QUERY = "MATCH ()-[r:A_JOUE_DANS]->() RETURN count(r) AS edges"
+
+# Marqueur des écritures du graphe (voir Neo4jConnector.mark_data_changed) et heure du serveur
+GRAPH_STATE_QUERY = """
+OPTIONAL MATCH (s:GraphState {name: "films"})
+RETURN s.writes AS writes, s.deletes AS deletes, timestamp() AS now
+"""
+
+# Marge (millisecondes) relue avant la date du dernier rafraîchissement : une écriture
+# commencée avant cette date peut n'avoir été validée qu'après la lecture
+REFRESH_OVERLAP_MS = 30000
+
+
+def read_graph_state(graph):
+    """
+    Lit le marqueur GraphState et l'heure du serveur
+
+    Returns:
+        tuple: ((écritures, films supprimés) ou None si le marqueur n'existe pas,
+            heure du serveur en millisecondes)
+    """
+    result = graph.run(GRAPH_STATE_QUERY).data()
+    row = result[0] if result else {}
+    marker = (row["writes"], row["deletes"]) if row.get("writes") is not None else None
+    return marker, row.get("now") or 0
+
+
+def _cypher_desc_key(value):
+    """Clé de tri décroissant à la manière de Cypher (les valeurs nulles en premier)"""
+    return (0, 0) if value is None else (1, -value)
+
+
+class ProjectionSnapshot:
+    """
+    Contenu d'une projection Actor-Film à un instant donné
+
+    Un instantané publié par CoStarProjection n'est plus jamais modifié : les mises à
+    jour travaillent sur une copie (copy), publiée ensuite en une seule affectation.
+    Un lecteur qui garde une référence sur l'instantané voit donc toujours une
+    matrice et des tableaux de noms cohérents entre eux.
+    """
+
+    def __init__(self):
+        self.actor_names = []
+        self.actor_index = {}
+        self.film_ids = []
+        self.film_index = {}
+        self.film_titles = []
+        self.film_years = []
+        self.film_votes = []
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.int32)
+
+    def copy(self):
+        """Copie modifiable (la matrice est partagée : _set_matrix la remplace sans la modifier)"""
+        snapshot = ProjectionSnapshot()
+        snapshot.actor_names = list(self.actor_names)
+        snapshot.actor_index = dict(self.actor_index)
+        snapshot.film_ids = list(self.film_ids)
+        snapshot.film_index = dict(self.film_index)
+        snapshot.film_titles = list(self.film_titles)
+        snapshot.film_years = list(self.film_years)
+        snapshot.film_votes = list(self.film_votes)
+        snapshot.matrix = self.matrix
+        return snapshot
+
+    @property
+    def edge_count(self):
+        return self.matrix.nnz
+
+    def _film(self, record):
+        """Numéro du film d'une ligne (ajouté à la projection s'il est nouveau, propriétés mises à jour sinon)"""
+        film_id = record["film_id"]
+        index = self.film_index.get(film_id)
+        if index is None:
+            index = len(self.film_ids)
+            self.film_index[film_id] = index
+            self.film_ids.append(film_id)
+            self.film_titles.append(record["title"])
+            self.film_years.append(record["year"])
+            self.film_votes.append(record["votes"])
+        else:
+            self.film_titles[index] = record["title"]
+            self.film_years[index] = record["year"]
+            self.film_votes[index] = record["votes"]
+        return index
+
+    def _actor(self, name):
+        index = self.actor_index.get(name)
+        if index is None:
+            index = len(self.actor_names)
+            self.actor_index[name] = index
+            self.actor_names.append(name)
+        return index
+
+    def _set_matrix(self, rows, cols, replaced=()):
+        """
+        Ajoute des relations à la matrice, après avoir vidé les colonnes des films remplacés
+
+        La matrice est toujours remplacée par un nouvel objet (PathService et la
+        détection de communautés reconnaissent ainsi une projection modifiée).
+        """
+        shape = (len(self.actor_names), len(self.film_ids))
+        old = self.matrix.copy()
+        old.resize(shape)
+        if len(replaced):
+            keep = np.ones(shape[1], dtype=np.int32)
+            keep[list(replaced)] = 0
+            old = (old @ sp.diags(keep, dtype=np.int32)).tocsr()
+        delta = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+        # Une relation déjà projetée ne compte qu'une fois
+        matrix = (old + delta).minimum(1).tocsr()
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        self.matrix = matrix
+
+    def add_edges(self, records):
+        """
+        Ajoute des relations (acteur, film) à la matrice
+
+        Returns:
+            int: Nombre de relations lues
+        """
+        rows, cols = [], []
+        for record in records:
+            rows.append(self._actor(record["actor"]))
+            cols.append(self._film(record))
+        self._set_matrix(rows, cols)
+        return len(rows)
+
+    def replace_films(self, records):
+        """
+        Remplace les propriétés et les acteurs des films lus (une ligne par film)
+
+        Returns:
+            int: Nombre de films relus
+        """
+        rows, cols, replaced = [], [], []
+        for record in records:
+            film = self._film(record)
+            replaced.append(film)
+            for name in record["actors"]:
+                rows.append(self._actor(name))
+                cols.append(film)
+        self._set_matrix(rows, cols, replaced)
+        return len(replaced)
+
+
+def _from_snapshot(name):
+    """Attribut de la projection lu dans son instantané courant"""
+    return property(lambda self: getattr(self._snapshot, name))
+
+
+class CoStarProjection:
+    """
+    Projection en mémoire du graphe biparti Actor-Film au format CSR
+
+    La matrice d'incidence B (acteurs x films) est stockée sous forme de tableaux
+    NumPy indptr/indices. Les co-stars d'un acteur sont la ligne B[a] @ B.T, les
+    films partageant des acteurs sont les coefficients de B.T @ B : les requêtes
+    19, 21 et 28 sont calculées par des produits de matrices creuses, sans
+    interroger la base.
+
+    La projection suit le marqueur GraphState du serveur, mis à jour par toutes les
+    écritures de Neo4jConnector quel que soit le processus (import, sync_daemon) :
+    seuls les films écrits depuis le dernier rafraîchissement sont relus, sauf si
+    des films ont été supprimés (rechargement complet).
+
+    Les données sont portées par un ProjectionSnapshot remplacé en bloc à chaque
+    mise à jour : les lectures, concurrentes des rafraîchissements, partent d'un
+    instantané (snapshot) et ne prennent pas de verrou.
+    """
+
+    actor_names = _from_snapshot("actor_names")
+    actor_index = _from_snapshot("actor_index")
+    film_ids = _from_snapshot("film_ids")
+    film_index = _from_snapshot("film_index")
+    film_titles = _from_snapshot("film_titles")
+    film_years = _from_snapshot("film_years")
+    film_votes = _from_snapshot("film_votes")
+    matrix = _from_snapshot("matrix")
+    edge_count = _from_snapshot("edge_count")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = ProjectionSnapshot()
+        # Marqueur GraphState et heure du serveur lus au début du dernier chargement
+        self.marker = None
+        self.synced_at = None
+
+    def snapshot(self):
+        """
+        Instantané courant, à utiliser pour toute lecture faite de plusieurs attributs
+
+        Returns:
+            ProjectionSnapshot: Données de la projection (à ne pas modifier)
+        """
+        return self._snapshot
+
+    @property
+    def indptr(self):
+        return self.matrix.indptr
+
+    @property
+    def indices(self):
+        return self.matrix.indices
+
+    def _edge_total(self, graph):
+        result = graph.run(EDGE_COUNT_QUERY).data()
+        return result[0]["edges"] if result else 0
+
+    def load(self, graph):
+        """
+        Charge toute la projection depuis Neo4j
+
+        Args:
+            graph: Graphe py2neo
+
+        Returns:
+            CoStarProjection: self
+        """
+        with self._lock:
+            # Marqueur lu avant les relations : une écriture concurrente sera relue au rafraîchissement
+            marker, now = read_graph_state(graph)
+            snapshot = ProjectionSnapshot()
+            snapshot.add_edges(graph.run(EDGES_QUERY))
+            self._snapshot = snapshot
+            self.marker, self.synced_at = marker, now
+        return self
+
+    def refresh(self, graph):
+        """
+        Met à jour la projection si le graphe a changé depuis le dernier chargement
+
+        Le marqueur GraphState est lu à chaque appel. S'il n'a pas changé, rien n'est
+        relu. Sinon, les films écrits depuis le dernier rafraîchissement (propriété
+        updated_at, avec une marge de REFRESH_OVERLAP_MS) sont relus avec tous leurs
+        acteurs et remplacent leur colonne. La projection est rechargée entièrement
+        si des films ont été supprimés, si le marqueur a été remis à zéro, ou si le
+        nombre de relations ne correspond pas à celui de Neo4j (écriture faite sans
+        passer par Neo4jConnector). Sans marqueur (graphe construit par une ancienne
+        version), seul le nombre de relations est comparé.
+
+        Returns:
+            CoStarProjection: self
+        """
+        marker, now = read_graph_state(graph)
+        if marker is None:
+            # Graphe écrit sans marqueur : seul le nombre de relations peut être vérifié
+            if self.marker is None and self.synced_at is not None and self.edge_count == self._edge_total(graph):
+                return self
+            return self.load(graph)
+        if marker == self.marker:
+            return self
+        if self.marker is None or marker[1] != self.marker[1] or marker[0] < self.marker[0]:
+            return self.load(graph)
+
+        with self._lock:
+            since = self.synced_at - REFRESH_OVERLAP_MS
+            snapshot = self._snapshot.copy()
+            snapshot.replace_films(graph.run(CHANGED_FILMS_QUERY, since=since))
+            # Une copie incohérente avec Neo4j n'est pas publiée
+            consistent = snapshot.edge_count == self._edge_total(graph)
+            if consistent:
+                self._snapshot = snapshot
+                self.marker, self.synced_at = marker, now
+        return self if consistent else self.load(graph)
+
+    @staticmethod
+    def _costars(snapshot, actor_name):
+        """
+        Acteurs ayant partagé au moins un film avec actor_name
+
+        Returns:
+            tuple: (numéro de l'acteur, vecteur des films de l'acteur, numéros des co-stars,
+                nombre de films partagés avec chacun) ou None si l'acteur est inconnu
+        """
+        actor = snapshot.actor_index.get(actor_name)
+        if actor is None:
+            return None
+        own_films = snapshot.matrix[actor]
+        shared = np.asarray((own_films @ snapshot.matrix.T).todense()).ravel()
+        shared[actor] = 0
+        costars = np.flatnonzero(shared)
+        return actor, own_films, costars, shared[costars]
+
+    def films_with_costars(self, actor_name):
+        """
+        Films des acteurs ayant joué avec actor_name (requête 19)
+
+        Un film partagé avec un co-star n'est retenu que si ce co-star a partagé
+        un autre film avec l'acteur (même règle que f1 <> f2 en Cypher).
+
+        Returns:
+            list: Dictionnaires (film_title, year) triés par année décroissante puis titre
+        """
+        snapshot = self._snapshot
+        costars = self._costars(snapshot, actor_name)
+        if costars is None:
+            return []
+        _, own_films, costar_ids, shared = costars
+
+        rows = snapshot.matrix[costar_ids]
+        single = sp.diags((shared == 1).astype(np.int32), dtype=np.int32)
+        # Pour un co-star partageant un seul film, ce film ne peut pas être f2
+        reachable = rows - single @ rows.multiply(own_films)
+        film_ids = np.flatnonzero(np.asarray(reachable.sum(axis=0)).ravel())
+
+        films = {(snapshot.film_titles[f], snapshot.film_years[f]) for f in film_ids}
+        ordered = sorted(films, key=lambda film: (_cypher_desc_key(film[1]), film[0] or ""))
+        return [{"film_title": title, "year": year} for title, year in ordered]
+
+    def recommend_from_costars(self, actor_name, limit=5):
+        """
+        Films des co-stars où l'acteur n'a pas joué, classés par nombre de co-stars (requête 28)
+
+        Returns:
+            list: Dictionnaires (title, year, common_actor_count)
+        """
+        snapshot = self._snapshot
+        costars = self._costars(snapshot, actor_name)
+        if costars is None:
+            return []
+        _, own_films, costar_ids, _ = costars
+
+        indicator = np.zeros(snapshot.matrix.shape[0], dtype=np.int32)
+        indicator[costar_ids] = 1
+        scores = snapshot.matrix.T @ indicator
+        scores[own_films.indices] = 0
+
+        candidates = np.flatnonzero(scores)
+        ranked = sorted(candidates, key=lambda f: (-scores[f], _cypher_desc_key(snapshot.film_votes[f])))
+        return [{
+            "title": snapshot.film_titles[f],
+            "year": snapshot.film_years[f],
+            "common_actor_count": int(scores[f])
+        } for f in ranked[:limit]]
+
+    def most_connected_films(self, limit=10, block_size=2048):
+        """
+        Paires de films ayant le plus d'acteurs en commun (requête 21)
+
+        B.T @ B est calculé par blocs de films pour borner la mémoire ; seules les
+        paires (f1, f2) avec f1 < f2 sont considérées.
+
+        Returns:
+            list: Dictionnaires (film1, film2, common_actor_count, common_actors)
+        """
+        snapshot = self._snapshot
+        films_by_actor = snapshot.matrix.T.tocsr()
+        best = []  # tas des meilleures paires (nombre, -f1, -f2)
+
+        for start in range(0, films_by_actor.shape[0], block_size):
+            block = (films_by_actor[start:start + block_size] @ snapshot.matrix).tocoo()
+            rows = block.row + start
+            keep = block.col > rows
+            counts, firsts, seconds = block.data[keep], rows[keep], block.col[keep]
+            if len(counts) > limit:
+                top = np.argpartition(counts, -limit)[-limit:]
+                counts, firsts, seconds = counts[top], firsts[top], seconds[top]
+            for count, f1, f2 in zip(counts.tolist(), firsts.tolist(), seconds.tolist()):
+                item = (count, -f1, -f2)
+                if len(best) < limit:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        result = []
+        for count, f1, f2 in sorted(best, reverse=True):
+            f1, f2 = -f1, -f2
+            common = np.intersect1d(films_by_actor[f1].indices, films_by_actor[f2].indices)
+            result.append({
+                "film1": snapshot.film_titles[f1],
+                "film2": snapshot.film_titles[f2],
+                "common_actor_count": count,
+                "common_actors": sorted(snapshot.actor_names[a] for a in common)
+            })
+        return result
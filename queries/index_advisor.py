@@ -0,0 +1,385 @@
+import inspect
+import re
+
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from queries.cache import dry_run
+from queries.mongodb_queries import MongoDBQueries
+from queries.neo4j_queries import Neo4jQueries
+
+QUERY_NAME = re.compile(r"^query_(\d+)_")
+
+# Requêtes qui modifient la base (la vue de la requête 11 est expliquée à part)
+WRITE_QUERIES = {11}
+
+# Requêtes Neo4j qui modifient le graphe (jamais exécutées avec PROFILE)
+GRAPH_WRITE_QUERIES = {24, 29}
+
+# Paramètres utilisés pour les requêtes Neo4j qui en demandent
+GRAPH_QUERY_ARGUMENTS = {
+    19: ("Anne Hathaway",),
+    23: ("Anne Hathaway",),
+    25: ("Anne Hathaway", "Christian Bale"),
+    28: ("Anne Hathaway",)
+}
+
+# Opérateurs Cypher qui parcourent tous les nœuds (d'un label ou du graphe)
+GRAPH_SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan"}
+
+
+class _RecordingCollection:
+    """
+    Collection qui enregistre les commandes de lecture avant de les transmettre
+    à la vraie collection (les requêtes s'exécutent normalement)
+    """
+
+    def __init__(self, collection, log):
+        self._collection = collection
+        self._log = log
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        command = {"find": self._collection.name, "filter": filter or {}}
+        if projection:
+            command["projection"] = projection
+        self._log.append(command)
+        return self._collection.find(filter, projection, *args, **kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        self._log.append({"aggregate": self._collection.name, "pipeline": list(pipeline), "cursor": {}})
+        return self._collection.aggregate(pipeline, *args, **kwargs)
+
+    def count_documents(self, filter, *args, **kwargs):
+        # count_documents est exécuté par le serveur comme un pipeline $match + $group
+        self._log.append({"aggregate": self._collection.name, "pipeline": [
+            {"$match": filter},
+            {"$group": {"_id": 1, "n": {"$sum": 1}}}
+        ], "cursor": {}})
+        return self._collection.count_documents(filter, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class _RecordingConnector:
+    """Connecteur exposant une collection 'films' qui enregistre les commandes"""
+
+    def __init__(self, mongo_connector, log):
+        self.client = mongo_connector.client
+        self.db = mongo_connector.db
+        self.films = _RecordingCollection(mongo_connector.films, log)
+
+
+class IndexAdvisor:
+    """
+    Vérifie que les requêtes de MongoDBQueries utilisent les index de la collection 'films'
+
+    Chaque requête est exécutée une fois en enregistrant les commandes envoyées
+    au serveur, puis chaque commande est passée à explain() : les plans qui
+    parcourent toute la collection (COLLSCAN) sont signalés.
+    """
+
+    def __init__(self, mongo_connector):
+        """
+        Args:
+            mongo_connector: Instance de MongoDBConnector
+        """
+        self.mongo = mongo_connector
+
+    def record_commands(self):
+        """
+        Exécute les requêtes de lecture et enregistre leurs commandes
+
+        Returns:
+            list: Tuples (nom de la requête, commande)
+        """
+        numbered = sorted((int(match.group(1)), name) for name in dir(MongoDBQueries)
+                          for match in [QUERY_NAME.match(name)] if match)
+
+        recorded = []
+        for number, name in numbered:
+            if number in WRITE_QUERIES:
+                continue
+
+            log = []
+            queries = MongoDBQueries(_RecordingConnector(self.mongo, log))
+            method = getattr(MongoDBQueries, name)
+            # Méthode d'origine, sans passer par le cache des résultats ni par l'instrumentation
+            # (les exécutions de l'analyse ne sont pas comptées dans les métriques)
+            method = inspect.unwrap(method)
+            try:
+                # Ni cache, ni marqueur d'écriture pendant l'analyse
+                with dry_run():
+                    method(queries)
+            except Exception as e:
+                print(f"⚠️ {name}: exécution impossible ({e})")
+            finally:
+                plt.close("all")
+            recorded.extend((name, command) for command in log)
+
+        recorded.append(("query_11_create_high_rated_high_revenue_view", {
+            "aggregate": self.mongo.films.name,
+            "pipeline": MongoDBQueries.HIGH_RATED_VIEW_PIPELINE,
+            "cursor": {}
+        }))
+        return recorded
+
+    @staticmethod
+    def _plan_stages(plan):
+        """Liste les étapes d'un plan d'exécution (parcours en profondeur)"""
+        stages = []
+        pending = [plan]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                if "stage" in node:
+                    stages.append(node["stage"])
+                pending.extend(node.values())
+            elif isinstance(node, list):
+                pending.extend(node)
+        return stages
+
+    @classmethod
+    def _find_key(cls, document, key):
+        """Valeurs associées à une clé, à n'importe quelle profondeur du document"""
+        found = []
+        pending = [document]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                for name, value in node.items():
+                    if name == key:
+                        found.append(value)
+                    else:
+                        pending.append(value)
+            elif isinstance(node, list):
+                pending.extend(node)
+        return found
+
+    @staticmethod
+    def _filter_fields(command):
+        """Champs filtrés par la commande (pistes pour un nouvel index)"""
+        if "filter" in command:
+            return sorted(command["filter"])
+        pipeline = command.get("pipeline", [])
+        if pipeline and "$match" in pipeline[0]:
+            return sorted(field for field in pipeline[0]["$match"] if not field.startswith("$"))
+        return []
+
+    def explain(self, command):
+        """
+        Exécute explain() sur une commande find ou aggregate
+
+        Returns:
+            dict: Résultat de explain (verbosité executionStats)
+        """
+        return self.mongo.db.command("explain", command, verbosity="executionStats")
+
+    def analyze(self):
+        """
+        Explique chaque commande des requêtes et signale les parcours complets
+
+        Returns:
+            pd.DataFrame: Une ligne par commande (requête, étapes, documents examinés,
+                COLLSCAN, champs filtrés, diagnostic)
+        """
+        rows = []
+        for name, command in self.record_commands():
+            try:
+                explained = self.explain(command)
+            except Exception as e:
+                rows.append({"query": name, "stages": None, "docs_examined": None,
+                             "collscan": None, "filter_fields": None, "advice": f"explain impossible: {e}"})
+                continue
+
+            stages = []
+            for plan in self._find_key(explained, "winningPlan"):
+                stages.extend(self._plan_stages(plan))
+            fields = self._filter_fields(command)
+            collscan = "COLLSCAN" in stages
+
+            if not collscan:
+                advice = "ok"
+            elif fields:
+                advice = f"index manquant sur {', '.join(fields)}"
+            else:
+                advice = "parcours complet (agrégation sur toute la collection)"
+
+            rows.append({
+                "query": name,
+                "stages": " > ".join(dict.fromkeys(stages)),
+                "docs_examined": sum(self._find_key(explained, "totalDocsExamined")),
+                "collscan": collscan,
+                "filter_fields": fields,
+                "advice": advice
+            })
+        return pd.DataFrame(rows)
+
+    def report(self):
+        """
+        Affiche le diagnostic des index et les requêtes à surveiller
+
+        Returns:
+            pd.DataFrame: Résultat de analyze()
+        """
+        missing = self.mongo.missing_indexes()
+        if missing:
+            print(f"⚠️ Index déclarés absents de la collection: {', '.join(missing)} "
+                  f"(MongoDBConnector.ensure_indexes() pour les créer)")
+        else:
+            print("✅ Tous les index déclarés existent")
+
+        results = self.analyze()
+        for row in results.itertuples():
+            if row.collscan:
+                print(f"⚠️ {row.query}: COLLSCAN ({row.docs_examined} documents examinés) - {row.advice}")
+            elif row.collscan is None:
+                print(f"❌ {row.query}: {row.advice}")
+        if not results.empty and results["collscan"].eq(False).all():
+            print("✅ Aucune requête ne parcourt toute la collection")
+        return results
+
+
+class _PlanRecordingGraph:
+    """
+    Graphe qui préfixe chaque requête par EXPLAIN (ou PROFILE) et enregistre son plan
+
+    Avec EXPLAIN, les requêtes ne sont pas exécutées et ne retournent aucune ligne.
+    """
+
+    def __init__(self, graph, log, mode):
+        self._graph = graph
+        self._log = log
+        self._mode = mode
+
+    def run(self, query, parameters=None, **kwparameters):
+        cursor = self._graph.run(f"{self._mode} {query}", parameters, **kwparameters)
+        self._log.append((query, cursor.plan()))
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+
+class _PlanRecordingConnector:
+    """Connecteur exposant un graphe qui enregistre les plans d'exécution"""
+
+    def __init__(self, neo4j_connector, log, mode):
+        self.graph = _PlanRecordingGraph(neo4j_connector.graph, log, mode)
+
+
+class GraphIndexAdvisor:
+    """
+    Vérifie que les requêtes de Neo4jQueries partent d'un index plutôt que d'un parcours de label
+
+    Chaque méthode query_N est appelée avec un graphe qui demande le plan de ses
+    requêtes Cypher (EXPLAIN par défaut) ; les opérateurs d'accès aux nœuds du plan
+    (NodeIndexSeek, NodeByLabelScan...) sont ensuite relevés.
+    """
+
+    def __init__(self, neo4j_connector):
+        """
+        Args:
+            neo4j_connector: Instance de Neo4jConnector
+        """
+        self.neo4j = neo4j_connector
+
+    def record_plans(self, profile=False):
+        """
+        Récupère le plan de chaque requête Cypher des méthodes query_N
+
+        Args:
+            profile (bool): Utiliser PROFILE (exécution réelle, compteurs dbHits) au lieu
+                d'EXPLAIN ; les requêtes d'écriture 24 et 29 sont alors ignorées
+
+        Returns:
+            list: Tuples (nom de la requête, texte Cypher, plan)
+        """
+        numbered = sorted((int(match.group(1)), name) for name in dir(Neo4jQueries)
+                          for match in [QUERY_NAME.match(name)] if match)
+
+        recorded = []
+        for number, name in numbered:
+            if profile and number in GRAPH_WRITE_QUERIES:
+                continue
+
+            log = []
+            queries = Neo4jQueries(_PlanRecordingConnector(self.neo4j, log, "PROFILE" if profile else "EXPLAIN"))
+            method = getattr(Neo4jQueries, name)
+            # Méthode d'origine : les plans EXPLAIN/PROFILE ne sont ni mis en cache ni mesurés
+            method = inspect.unwrap(method)
+            # Les requêtes calculées sur la projection en mémoire sont vérifiées dans leur version Cypher
+            options = {"use_projection": False} if "use_projection" in inspect.signature(method).parameters else {}
+            try:
+                # Les chemins d'écriture traversés sous EXPLAIN ne signalent aucun changement
+                with dry_run():
+                    method(queries, *GRAPH_QUERY_ARGUMENTS.get(number, ()), **options)
+            except Exception as e:
+                print(f"⚠️ {name}: plan impossible ({e})")
+            finally:
+                plt.close("all")
+            recorded.extend((name, query, plan) for query, plan in log)
+        return recorded
+
+    @staticmethod
+    def _operators(plan):
+        """Liste les opérateurs d'un plan (sans le suffixe @neo4j) et le total de dbHits"""
+        operators = []
+        db_hits = 0
+        pending = [plan] if plan else []
+        while pending:
+            node = pending.pop()
+            operators.append(node.get("operatorType", "").split("@")[0])
+            db_hits += node.get("dbHits", 0) or 0
+            pending.extend(node.get("children", []))
+        return operators, db_hits
+
+    def analyze(self, profile=False):
+        """
+        Relève les opérateurs d'accès de chaque requête Cypher
+
+        Returns:
+            pd.DataFrame: Une ligne par requête Cypher (requête, opérateurs d'accès,
+                index utilisé, parcours de label, dbHits, diagnostic)
+        """
+        rows = []
+        for name, query, plan in self.record_plans(profile):
+            operators, db_hits = self._operators(plan)
+            access = [op for op in operators if "Index" in op or op in GRAPH_SCAN_OPERATORS]
+            index_used = any("Index" in op for op in access)
+            scan = any(op in GRAPH_SCAN_OPERATORS for op in access)
+
+            if plan is None:
+                advice = "plan indisponible"
+            elif index_used and not scan:
+                advice = "ok"
+            elif index_used:
+                advice = "index utilisé, mais un label est aussi parcouru entièrement"
+            else:
+                advice = "parcours complet (aucun index utilisé)"
+
+            rows.append({
+                "query": name,
+                "cypher": " ".join(query.split())[:120],
+                "access": " > ".join(dict.fromkeys(access)),
+                "index_used": index_used,
+                "label_scan": scan,
+                "db_hits": db_hits if profile else None,
+                "advice": advice
+            })
+        return pd.DataFrame(rows)
+
+    def report(self, profile=False):
+        """
+        Affiche les requêtes qui n'utilisent aucun index
+
+        Returns:
+            pd.DataFrame: Résultat de analyze()
+        """
+        results = self.analyze(profile)
+        for row in results.itertuples():
+            if not row.index_used:
+                print(f"⚠️ {row.query}: {row.advice} ({row.access or 'aucun accès aux nœuds'})")
+        if not results.empty and results["index_used"].all():
+            print("✅ Toutes les requêtes Cypher partent d'un index")
+        return results
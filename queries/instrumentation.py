@@ -0,0 +1,580 @@
+import bisect
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+from pymongo import monitoring
+
+from queries.cache import QUERY_CACHE, skip_cache
+
+# Bornes (secondes) des histogrammes de durée exportés au format Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Commandes MongoDB dont le travail serveur est mesuré par explain
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Champs de session ajoutés par le pilote, refusés par la commande explain
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+# Requête instrumentée en cours d'exécution dans le thread
+_active = threading.local()
+
+# Suivi tracemalloc partagé par les appels profilés simultanés (voir _start_tracing)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _start_tracing():
+    """
+    Démarre tracemalloc pour un appel profilé et remet son pic à zéro
+
+    tracemalloc est global au processus : il est démarré par le premier appel profilé
+    en cours et arrêté par le dernier, sauf s'il était déjà actif (démarré ailleurs).
+    """
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracing():
+    """
+    Termine le suivi d'un appel profilé
+
+    Returns:
+        int: Pic de mémoire Python du processus depuis le début de l'appel (ou depuis le
+            début d'un appel profilé simultané plus récent)
+    """
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+        return peak
+
+
+def query_failed():
+    """
+    Signale que la requête instrumentée en cours a échoué
+
+    À appeler dans une méthode qui intercepte ses propres erreurs et retourne une
+    valeur de repli : l'appel est compté en erreur et son résultat n'est pas mis en cache.
+    """
+    _active.failed = True
+    skip_cache()
+
+
+def propagate_context(function):
+    """
+    Fonction à exécuter dans un autre thread pour le compte de la requête en cours
+
+    Les commandes envoyées par les threads de travail (ex. ParallelScan) sont ainsi
+    rattachées à la requête instrumentée du thread appelant.
+
+    Args:
+        function: Fonction à exécuter
+
+    Returns:
+        La fonction, qui installe le contexte du thread appelant pendant son exécution
+    """
+    context = getattr(_active, "context", None)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_active, "context", None)
+        _active.context = context
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _active.context = previous
+    return wrapper
+
+
+def _find_values(document, key):
+    """Valeurs associées à une clé, à n'importe quelle profondeur d'un document ou d'un plan"""
+    found = []
+    pending = [document]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            for name, value in node.items():
+                if name == key:
+                    found.append(value)
+                else:
+                    pending.append(value)
+        elif isinstance(node, (list, tuple)):
+            pending.extend(node)
+    return found
+
+
+def _row_count(result):
+    """
+    Nombre de lignes d'un résultat de requête
+
+    Pour un tuple (ex. DataFrame et figure), la première valeur qui a une longueur est
+    comptée ; un résultat scalaire compte pour une ligne.
+    """
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        for value in result:
+            if hasattr(value, "__len__") and not isinstance(value, str):
+                return len(value)
+        return 1 if any(value is not None for value in result) else 0
+    if hasattr(result, "__len__") and not isinstance(result, str):
+        return len(result)
+    return 1
+
+
+class _Histogram:
+    """Histogramme cumulatif au format Prometheus, avec les dernières valeurs pour les quantiles"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS, recent=256):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        """Quantile des dernières valeurs observées (None si aucune)"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class _CommandRecorder(monitoring.CommandListener):
+    """
+    Enregistre les commandes envoyées par le pilote pendant une requête profilée
+
+    Le pilote publie les événements dans le thread qui envoie la commande : seules les
+    commandes du thread d'une requête profilée sont conservées.
+    """
+
+    def started(self, event):
+        context = getattr(_active, "context", None)
+        if context is None or not context["profile"] or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        command = {name: value for name, value in event.command.items()
+                   if not name.startswith("$") and name not in DRIVER_FIELDS}
+        context["commands"].append((event.database_name, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# À passer dans event_listeners à la création des clients MongoDB
+COMMAND_RECORDER = _CommandRecorder()
+
+
+class _ProfilingGraph:
+    """Graphe qui exécute les requêtes Cypher avec PROFILE et additionne leurs dbHits"""
+
+    def __init__(self, graph, context):
+        self._graph = graph
+        self._context = context
+
+    def run(self, query, parameters=None, **kwparameters):
+        if query.lstrip().upper().startswith(("EXPLAIN", "PROFILE")):
+            return self._graph.run(query, parameters, **kwparameters)
+        cursor = self._graph.run(f"PROFILE {query}", parameters, **kwparameters)
+        try:
+            plan = cursor.plan()
+        except Exception:
+            plan = None
+        if plan:
+            self._context["db_hits"] += sum(hits or 0 for hits in _find_values(plan, "dbHits"))
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+
+class Instrumentation:
+    """
+    Mesures des requêtes et des lots d'import
+
+    Chaque appel d'une méthode décorée par instrumented() est chronométré et ses
+    lignes sont comptées. Un appel sur sample_every est en plus profilé :
+
+    - MongoDB : les commandes find/aggregate envoyées sont rejouées avec explain
+      (executionStats) pour relever les documents et clés examinés
+    - Neo4j : les requêtes Cypher sont exécutées avec PROFILE (dbHits)
+    - pic de mémoire Python du processus pendant l'appel (tracemalloc) : la mesure est
+      globale, les allocations d'autres threads pendant l'appel y sont comptées
+
+    Le profilage coûte une exécution supplémentaire côté MongoDB et le suivi des
+    allocations côté Python : il n'est pas compté dans la durée mesurée.
+    """
+
+    def __init__(self, sample_every=10):
+        """
+        Args:
+            sample_every (int): Profiler un appel sur N de chaque requête (0 pour jamais)
+        """
+        self.sample_every = sample_every
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Remet toutes les mesures à zéro"""
+        with self._lock:
+            self._queries = {}
+            self._ingest = {}
+
+    # Requêtes
+
+    def _query_entry(self, backend, name):
+        key = (backend, name)
+        entry = self._queries.get(key)
+        if entry is None:
+            entry = self._queries[key] = {
+                "calls": 0, "errors": 0, "rows": 0, "last_rows": None,
+                "duration": _Histogram(),
+                "profiled": 0, "docs_examined": 0, "keys_examined": 0, "db_hits": 0,
+                "last_docs_examined": None, "last_keys_examined": None, "last_db_hits": None,
+                "peak_memory": None
+            }
+        return entry
+
+    def graph(self, graph):
+        """
+        Graphe à utiliser par les requêtes Neo4j
+
+        Returns:
+            Le graphe tel quel, ou un graphe qui exécute les requêtes avec PROFILE
+            pendant un appel profilé
+        """
+        context = getattr(_active, "context", None)
+        if graph is None or context is None or not context["profile"] or context["backend"] != "neo4j":
+            return graph
+        return _ProfilingGraph(graph, context)
+
+    def _explain(self, mongo, commands):
+        """Documents et clés examinés par les commandes enregistrées"""
+        docs = keys = 0
+        for database, command in commands:
+            pipeline = command.get("pipeline", [])
+            if any("$out" in stage or "$merge" in stage for stage in pipeline):
+                continue
+            explained = mongo.client[database].command("explain", command, verbosity="executionStats")
+            docs += sum(_find_values(explained, "totalDocsExamined"))
+            keys += sum(_find_values(explained, "totalKeysExamined"))
+        return docs, keys
+
+    def track_query(self, backend, name, connector, function, *args, **kwargs):
+        """
+        Exécute une requête en la mesurant
+
+        Args:
+            backend (str): "mongodb" ou "neo4j"
+            name (str): Nom de la requête
+            connector: Connecteur utilisé par la requête (pour explain)
+            function: Fonction à exécuter avec args et kwargs
+
+        Returns:
+            Le résultat de la fonction
+        """
+        with self._lock:
+            entry = self._query_entry(backend, name)
+            profile = (self.sample_every > 0 and entry["calls"] % self.sample_every == 0
+                       and getattr(_active, "context", None) is None)
+            entry["calls"] += 1
+
+        outer = getattr(_active, "context", None)
+        context = {"backend": backend, "profile": profile, "commands": [], "db_hits": 0}
+        if outer is None:
+            _active.context = context
+        # Échec signalé par query_failed, propre à l'appel (les appels imbriqués ont le leur)
+        outer_failed = getattr(_active, "failed", False)
+        _active.failed = False
+        if profile:
+            _start_tracing()
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = function(*args, **kwargs)
+            failed = _active.failed
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = _stop_tracing() if profile else None
+            _active.failed = outer_failed
+            if outer is None:
+                _active.context = None
+
+            docs = keys = None
+            if profile and context["commands"] and connector is not None and getattr(connector, "client", None):
+                try:
+                    docs, keys = self._explain(connector, context["commands"])
+                except Exception as e:
+                    print(f"⚠️ {name}: explain impossible ({e})")
+
+            with self._lock:
+                entry["duration"].observe(elapsed)
+                if failed:
+                    entry["errors"] += 1
+                else:
+                    rows = _row_count(result)
+                    entry["rows"] += rows
+                    entry["last_rows"] = rows
+                if profile:
+                    entry["profiled"] += 1
+                    if peak is not None:
+                        entry["peak_memory"] = max(entry["peak_memory"] or 0, peak)
+                    if docs is not None:
+                        entry["docs_examined"] += docs
+                        entry["keys_examined"] += keys
+                        entry["last_docs_examined"], entry["last_keys_examined"] = docs, keys
+                    if backend == "neo4j":
+                        entry["db_hits"] += context["db_hits"]
+                        entry["last_db_hits"] = context["db_hits"]
+
+    # Lots d'import
+
+    @contextmanager
+    def ingest_batch(self, pipeline):
+        """
+        Mesure l'envoi d'un lot d'import
+
+        Le bloc renseigne batch["rows"] avec le nombre de lignes écrites.
+
+        Args:
+            pipeline (str): Nom de l'import (ex. "mongodb.films", "neo4j.films")
+        """
+        batch = {"rows": 0}
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield batch
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self._ingest.setdefault(pipeline, {
+                    "batches": 0, "errors": 0, "rows": 0, "duration": _Histogram()
+                })
+                entry["batches"] += 1
+                entry["errors"] += failed
+                entry["rows"] += batch["rows"]
+                entry["duration"].observe(elapsed)
+
+    # Lecture des mesures
+
+    def query_table(self):
+        """
+        Mesures par requête
+
+        Returns:
+            pd.DataFrame: Une ligne par requête (appels, erreurs, latences en ms, lignes,
+                documents et clés examinés, dbHits et pic mémoire du dernier appel profilé)
+        """
+        with self._lock:
+            rows = []
+            for (backend, name), entry in sorted(self._queries.items()):
+                duration = entry["duration"]
+                calls = sum(duration.counts)
+                rows.append({
+                    "backend": backend,
+                    "query": name,
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "mean_ms": duration.total / calls * 1000 if calls else None,
+                    "p50_ms": duration.quantile(0.5) * 1000 if calls else None,
+                    "p95_ms": duration.quantile(0.95) * 1000 if calls else None,
+                    "last_rows": entry["last_rows"],
+                    "profiled": entry["profiled"],
+                    "docs_examined": entry["last_docs_examined"],
+                    "keys_examined": entry["last_keys_examined"],
+                    "db_hits": entry["last_db_hits"],
+                    "peak_memory_mb": entry["peak_memory"] / 1e6 if entry["peak_memory"] is not None else None
+                })
+        return pd.DataFrame(rows)
+
+    def ingest_table(self):
+        """
+        Mesures par import
+
+        Returns:
+            pd.DataFrame: Une ligne par import (lots, erreurs, lignes, durée moyenne et débit)
+        """
+        with self._lock:
+            rows = [{
+                "pipeline": pipeline,
+                "batches": entry["batches"],
+                "errors": entry["errors"],
+                "rows": entry["rows"],
+                "mean_batch_ms": entry["duration"].total / entry["batches"] * 1000,
+                "rows_per_s": entry["rows"] / entry["duration"].total if entry["duration"].total else None
+            } for pipeline, entry in sorted(self._ingest.items())]
+        return pd.DataFrame(rows)
+
+    # Export Prometheus
+
+    @staticmethod
+    def _labels(**labels):
+        """Étiquettes Prometheus ({nom="valeur",...}), avec échappement des valeurs"""
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+    def _histogram_lines(self, metric, labels, histogram):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            lines.append(f"{metric}_bucket{self._labels(**labels, le=bound)} {cumulative}")
+        cumulative += histogram.counts[-1]
+        lines.append(f"{metric}_bucket{self._labels(**labels, le='+Inf')} {cumulative}")
+        lines.append(f"{metric}_sum{self._labels(**labels)} {histogram.total}")
+        lines.append(f"{metric}_count{self._labels(**labels)} {cumulative}")
+        return lines
+
+    def to_prometheus(self, prefix="moviedb"):
+        """
+        Mesures au format texte d'exposition Prometheus
+
+        Returns:
+            str: Métriques des requêtes, des imports et du cache des résultats
+        """
+        counters = [
+            ("query_calls_total", "counter", "Nombre d'appels de la requête", "calls"),
+            ("query_errors_total", "counter", "Nombre d'appels en erreur", "errors"),
+            ("query_rows_total", "counter", "Lignes retournées", "rows"),
+            ("query_profiled_total", "counter", "Appels profilés (explain, PROFILE, tracemalloc)", "profiled"),
+            ("query_docs_examined_total", "counter", "Documents examinés par MongoDB (appels profilés)", "docs_examined"),
+            ("query_keys_examined_total", "counter", "Clés d'index examinées par MongoDB (appels profilés)", "keys_examined"),
+            ("query_db_hits_total", "counter", "dbHits Neo4j (appels profilés)", "db_hits"),
+            ("query_peak_memory_bytes", "gauge", "Pic de mémoire Python du processus pendant un appel profilé", "peak_memory")
+        ]
+        ingest_counters = [
+            ("ingest_batches_total", "counter", "Lots d'import envoyés", "batches"),
+            ("ingest_errors_total", "counter", "Lots d'import en erreur", "errors"),
+            ("ingest_rows_total", "counter", "Lignes écrites par les imports", "rows")
+        ]
+
+        lines = []
+        with self._lock:
+            for metric, kind, help_text, field in counters:
+                values = [(key, entry[field]) for key, entry in sorted(self._queries.items())
+                          if entry[field] is not None]
+                if field in ("docs_examined", "keys_examined"):
+                    values = [(key, value) for key, value in values if key[0] == "mongodb"]
+                elif field == "db_hits":
+                    values = [(key, value) for key, value in values if key[0] == "neo4j"]
+                lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} {kind}"]
+                lines += [f"{prefix}_{metric}{self._labels(backend=backend, query=name)} {value}"
+                          for (backend, name), value in values]
+
+            metric = f"{prefix}_query_duration_seconds"
+            lines += [f"# HELP {metric} Durée des requêtes", f"# TYPE {metric} histogram"]
+            for (backend, name), entry in sorted(self._queries.items()):
+                lines += self._histogram_lines(metric, {"backend": backend, "query": name}, entry["duration"])
+
+            for metric, kind, help_text, field in ingest_counters:
+                lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} {kind}"]
+                lines += [f"{prefix}_{metric}{self._labels(pipeline=pipeline)} {entry[field]}"
+                          for pipeline, entry in sorted(self._ingest.items())]
+
+            metric = f"{prefix}_ingest_batch_duration_seconds"
+            lines += [f"# HELP {metric} Durée d'envoi d'un lot d'import", f"# TYPE {metric} histogram"]
+            for pipeline, entry in sorted(self._ingest.items()):
+                lines += self._histogram_lines(metric, {"pipeline": pipeline}, entry["duration"])
+
+        cache = QUERY_CACHE.stats()
+        for name, kind, help_text in [("hits", "counter", "Résultats servis par le cache"),
+                                      ("misses", "counter", "Résultats absents du cache"),
+                                      ("evictions", "counter", "Résultats évincés du cache"),
+                                      ("size", "gauge", "Résultats en cache")]:
+            metric = f"{prefix}_cache_{name}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {cache[name]}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Écrit les mesures dans un fichier (collecteur textfile de node_exporter)
+
+        Le fichier est écrit à côté puis renommé, le collecteur ne lit jamais un fichier partiel.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def serve_prometheus(self, port=9108, host="127.0.0.1"):
+        """
+        Expose les mesures sur http://host:port/metrics dans un thread
+
+        Args:
+            port (int): Port d'écoute
+            host (str): Adresse d'écoute (locale par défaut, "0.0.0.0" pour toutes les interfaces)
+
+        Returns:
+            ThreadingHTTPServer: Serveur (shutdown() pour l'arrêter)
+        """
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = instrumentation.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"✅ Métriques Prometheus disponibles sur http://{host}:{port}/metrics")
+        return server
+
+
+# Mesures partagées par MongoDBQueries, Neo4jQueries et les connecteurs
+INSTRUMENTATION = Instrumentation()
+
+
+def instrumented(backend, connector_attr, instrumentation=INSTRUMENTATION):
+    """
+    Décorateur mesurant chaque appel d'une méthode de requête
+
+    Placé sous cached_query, il ne mesure que les appels réellement exécutés par
+    la base (les résultats servis par le cache ne sont pas comptés).
+
+    Args:
+        backend (str): "mongodb" ou "neo4j"
+        connector_attr (str): Nom de l'attribut de l'instance contenant le connecteur
+        instrumentation (Instrumentation): Mesures à alimenter
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return instrumentation.track_query(backend, method.__name__, getattr(self, connector_attr, None),
+                                               method, self, *args, **kwargs)
+        return wrapper
+    return decorator
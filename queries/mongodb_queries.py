@@ -1,33 +1,130 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.stats import pearsonr
 from pymongo import MongoClient
 import json
+import threading
+
+from queries.genre_pairs import GenrePairIndex
+from queries.charts import ChartSpec
+from queries.cache import ServerVersion, cached_query, data_marker
+from queries.instrumentation import instrumented, query_failed
+from queries.aggregation_fields import (GENRES_FIELD, REVENUE_FIELD, RUNTIME_FIELD,
+                                        METASCORE_FIELD, DECADE_EXPR)
+from queries.film_stats import FilmStatsMaterializer
+from queries.parallel_scan import ParallelScan, CoMoments, GroupSums, TopK, pearson_p_value
 
 class MongoDBQueries:
-    def __init__(self, mongo_connector):
+    # Pipeline de la vue de la requête 11 (servie par l'index Metascore_1_Revenue_1_high_rated)
+    HIGH_RATED_VIEW_PIPELINE = [
+        {"$match": {
+            "Metascore": {"$gt": 80},
+            "Revenue (Millions)": {"$gt": 50}
+        }}
+    ]
+    
+    def __init__(self, mongo_connector, scan_workers=4, scan_field="_id"):
         """
         Initialise la classe avec un connecteur MongoDB
         
         Args:
             mongo_connector: Instance de MongoDBConnector
+            scan_workers (int): Nombre de partitions lues en parallèle par les calculs
+                côté client (server_side=False), 1 pour une lecture unique
+            scan_field (str): Champ indexé servant au découpage en partitions ("_id" ou "year")
         """
         self.mongo = mongo_connector
-        self.films = self.mongo.films if self.mongo and self.mongo.client else None
+        self.stats = FilmStatsMaterializer(mongo_connector)
+        self.scan_workers = scan_workers
+        self.scan_field = scan_field
+        # Index de la requête 27 et marqueur des données pour lesquelles il a été construit
+        self._pair_index = None
+        self._pair_index_lock = threading.Lock()
+        # Premiers champs des index de 'films', relus au plus une fois par minute
+        self._index_prefixes = ServerVersion(self._leading_index_fields, interval=60)
+    
+    @property
+    def films(self):
+        """Collection 'films' du connecteur (None si la connexion n'est pas disponible)"""
+        return self.mongo.films if self.mongo and self.mongo.client else None
+    
+    def _scan(self):
+        """Lecture des films pour les calculs côté client, partitionnée si scan_workers > 1"""
+        return ParallelScan(self.films, field=self.scan_field, workers=self.scan_workers)
+    
+    def _leading_index_fields(self):
+        """
+        Premiers champs des index complets (ni partiels, ni sparse) de la collection 'films'
+        
+        Returns:
+            frozenset: Champs par lesquels un index permet de parcourir toute la collection
+        """
+        if self.films is None:
+            return frozenset()
+        return frozenset(
+            index["key"][0][0] for index in self.films.index_information().values()
+            if not index.get("partialFilterExpression") and not index.get("sparse")
+        )
     
-    def query_1_year_with_most_films(self):
+    def _index_sort(self, field):
+        """
+        Tri initial d'un pipeline sur un champ indexé
+        
+        Le tri permet à $group de lire l'index sans charger les documents ; sans index,
+        il deviendrait un tri bloquant en mémoire et n'est donc pas ajouté.
+        
+        Returns:
+            list: [{"$sort": {field: 1}}] si un index commence par ce champ, [] sinon
+        """
+        fields = self._index_prefixes() or frozenset()
+        return [{"$sort": {field: 1}}] if field in fields else []
+    
+    @staticmethod
+    def _explode_genres(df):
+        """Une ligne par genre (le champ 'genre' contient des genres séparés par des virgules)"""
+        df = df.assign(genre=df['genre'].str.split(',')).explode('genre')
+        df['genre'] = df['genre'].str.strip()
+        return df
+    
+    def _materialized(self, fast):
+        """
+        Statistiques précalculées à utiliser en mode rapide
+        
+        Returns:
+            FilmStatsMaterializer: Les statistiques si fast est demandé et qu'elles ont été
+                calculées, None sinon (calcul sur la collection 'films')
+        """
+        if not fast:
+            return None
+        if self.stats.available():
+            return self.stats
+        print("ℹ️ Statistiques matérialisées absentes, calcul sur la collection 'films'")
+        return None
+    
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_1_year_with_most_films(self, fast=False):
         """
         1. Affiche l'année où le plus grand nombre de films ont été sortis
         
+        Args:
+            fast (bool): Lire les compartiments par année de 'films_stats'
+        
         Returns:
             tuple: (année, nombre de films)
         """
         if self.films is None:
             return None, None
+        
+        stats = self._materialized(fast)
+        if stats:
+            years = stats.buckets("year")
+            if not years:
+                return None, None
+            best = max(years, key=lambda bucket: bucket["count"])
+            return best["value"], best["count"]
             
-        pipeline = [
+        # Le tri initial sur l'année permet de lire l'index year_1_Votes_1 sans charger les documents
+        pipeline = self._index_sort("year") + [
             {"$group": {"_id": "$year", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}},
             {"$limit": 1}
@@ -41,6 +138,8 @@ class MongoDBQueries:
         else:
             return None, None
     
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
     def query_2_films_after_1999(self):
         """
         2. Compte le nombre de films sortis après l'année 1999
@@ -54,15 +153,27 @@ class MongoDBQueries:
         count = self.films.count_documents({"year": {"$gt": 1999}})
         return count
     
-    def query_3_average_votes_2007(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_3_average_votes_2007(self, fast=False):
         """
         3. Calcule la moyenne des votes des films sortis en 2007
         
+        Args:
+            fast (bool): Lire le compartiment 2007 de 'films_stats'
+        
         Returns:
             float: Moyenne des votes
         """
         if self.films is None:
             return 0
+        
+        stats = self._materialized(fast)
+        if stats:
+            bucket = stats.year_bucket(2007)
+            if not bucket:
+                return 0
+            return bucket["votes_sum"] / bucket["votes_count"] if bucket["votes_count"] else None
             
         pipeline = [
             {"$match": {"year": 2007}},
@@ -76,35 +187,46 @@ class MongoDBQueries:
         else:
             return 0
     
-    def query_4_films_per_year_histogram(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_4_films_per_year_histogram(self, fast=False):
         """
         4. Crée un histogramme du nombre de films par année
         
+        Args:
+            fast (bool): Lire les compartiments par année de 'films_stats'
+        
         Returns:
-            matplotlib.figure.Figure: L'histogramme généré
+            ChartSpec: L'histogramme (une barre par année)
         """
         if self.films is None:
             return None
-            
-        # Récupérer les années de tous les films
-        years = list(self.films.find({}, {"year": 1, "_id": 0}))
-        years_df = pd.DataFrame(years)
-        
-        if years_df.empty:
-            return None
-            
-        # Créer l'histogramme
-        fig, ax = plt.subplots(figsize=(12, 6))
-        years_df['year'].value_counts().sort_index().plot(kind='bar', ax=ax)
         
-        ax.set_title('Nombre de films par année')
-        ax.set_xlabel('Année')
-        ax.set_ylabel('Nombre de films')
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        stats = self._materialized(fast)
+        if stats:
+            counts = pd.Series({bucket["value"]: bucket["count"] for bucket in stats.buckets("year")
+                                if bucket["value"] is not None}, dtype="int64").sort_index()
+        else:
+            # Compter les films par année côté serveur (lecture de l'index year_1_Votes_1)
+            pipeline = self._index_sort("year") + [
+                {"$group": {"_id": "$year", "count": {"$sum": 1}}},
+                {"$match": {"_id": {"$ne": None}}},
+                {"$sort": {"_id": 1}}
+            ]
+            counts = pd.Series({doc["_id"]: doc["count"] for doc in self.films.aggregate(pipeline)}, dtype="int64")
         
-        plt.tight_layout()
-        return fig
+        if counts.empty:
+            return None
+        return self._chart_films_per_year(counts)
     
+    @staticmethod
+    def _chart_films_per_year(counts):
+        """Histogramme du nombre de films par année (Series année -> nombre)"""
+        return ChartSpec("bar", counts.rename_axis("year").reset_index(name="count"), "year", "count",
+                         "Nombre de films par année", "Année", "Nombre de films")
+    
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
     def query_5_available_genres(self):
         """
         5. Liste les genres de films disponibles dans la base
@@ -115,20 +237,50 @@ class MongoDBQueries:
         if self.films is None:
             return []
             
-        # Récupérer tous les genres (qui sont stockés sous forme de chaîne séparée par des virgules)
-        genres_docs = list(self.films.find({}, {"genre": 1, "_id": 0}))
-        
-        # Extraire et aplatir la liste des genres
-        all_genres = []
-        for doc in genres_docs:
-            if 'genre' in doc and doc['genre']:
-                genres = [genre.strip() for genre in doc['genre'].split(',')]
-                all_genres.extend(genres)
+        pipeline = [
+            {"$project": {"_id": 0, "genre": GENRES_FIELD}},
+            {"$unwind": "$genre"},
+            {"$match": {"genre": {"$ne": ""}}},
+            {"$group": {"_id": "$genre"}},
+            {"$sort": {"_id": 1}}
+        ]
         
         # Retourner les genres uniques triés
-        unique_genres = sorted(list(set(all_genres)))
-        return unique_genres
+        return [doc["_id"] for doc in self.films.aggregate(pipeline)]
+    
+    @cached_query("mongodb", "mongo")
+    def genre_distribution(self, fast=False):
+        """
+        Compte le nombre de films par genre (calcul côté serveur)
+        
+        Args:
+            fast (bool): Lire les compartiments par genre de 'films_stats'
+        
+        Returns:
+            pandas.DataFrame: Colonnes Genre et Count, triées par nombre décroissant
+        """
+        if self.films is None:
+            return pd.DataFrame(columns=["Genre", "Count"])
+        
+        stats = self._materialized(fast)
+        if stats:
+            genres = sorted(stats.buckets("genre"), key=lambda bucket: (-bucket["count"], bucket["value"]))
+            return pd.DataFrame([{"Genre": bucket["value"], "Count": bucket["count"]} for bucket in genres],
+                                columns=["Genre", "Count"])
+        
+        pipeline = [
+            {"$project": {"_id": 0, "genre": GENRES_FIELD}},
+            {"$unwind": "$genre"},
+            {"$match": {"genre": {"$ne": ""}}},
+            {"$group": {"_id": "$genre", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}}
+        ]
+        
+        result = [{"Genre": doc["_id"], "Count": doc["count"]} for doc in self.films.aggregate(pipeline)]
+        return pd.DataFrame(result, columns=["Genre", "Count"])
     
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
     def query_6_highest_revenue_film(self):
         """
         6. Trouve le film qui a généré le plus de revenu
@@ -139,9 +291,9 @@ class MongoDBQueries:
         if self.films is None:
             return None
             
-        # Convertir le champ Revenue en nombre et trouver le maximum
+        # Seuls les revenus numériques sont retenus (index partiel Revenue_-1_numeric)
         pipeline = [
-            {"$match": {"Revenue (Millions)": {"$ne": "", "$exists": True}}},
+            {"$match": {"Revenue (Millions)": {"$type": "number"}}},
             {"$sort": {"Revenue (Millions)": -1}},
             {"$limit": 1}
         ]
@@ -152,17 +304,30 @@ class MongoDBQueries:
         else:
             return None
     
-    def query_7_directors_with_more_than_5_films(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_7_directors_with_more_than_5_films(self, fast=False):
         """
         7. Liste les réalisateurs ayant réalisé plus de 5 films
         
+        Args:
+            fast (bool): Lire les compartiments par réalisateur de 'films_stats'
+        
         Returns:
             list: Liste des réalisateurs avec le nombre de films
         """
         if self.films is None:
             return []
+        
+        stats = self._materialized(fast)
+        if stats:
+            # Filtre évalué par MongoDB : seuls les réalisateurs retenus sont lus
+            directors = [{"_id": bucket["value"], "count": bucket["count"]}
+                         for bucket in stats.buckets("director", {"count": {"$gt": 5}})]
+            return sorted(directors, key=lambda director: -director["count"])
             
-        pipeline = [
+        # Lecture de l'index Director_1 s'il existe
+        pipeline = self._index_sort("Director") + [
             {"$group": {"_id": "$Director", "count": {"$sum": 1}}},
             {"$match": {"count": {"$gt": 5}}},
             {"$sort": {"count": -1}}
@@ -171,114 +336,140 @@ class MongoDBQueries:
         result = list(self.films.aggregate(pipeline))
         return result
     
-    def query_8_highest_average_revenue_genre(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_8_highest_average_revenue_genre(self, server_side=True):
         """
         8. Détermine le genre de film qui rapporte en moyenne le plus de revenus
         
+        Args:
+            server_side (bool): Si True, calcule le résultat par agrégation côté serveur,
+                sinon rapatrie les films et calcule avec pandas
+        
         Returns:
             tuple: (genre, revenu moyen)
         """
         if self.films is None:
             return None, 0
-            
-        # Récupérer tous les films avec leur genre et revenu
-        films_data = list(self.films.find(
-            {"Revenue (Millions)": {"$ne": "", "$exists": True}}, 
-            {"genre": 1, "Revenue (Millions)": 1, "_id": 0}
-        ))
         
-        if not films_data:
+        if server_side:
+            pipeline = [
+                {"$project": {"_id": 0, "genre": GENRES_FIELD, "revenue": REVENUE_FIELD}},
+                {"$match": {"revenue": {"$ne": None}}},
+                {"$unwind": "$genre"},
+                {"$match": {"genre": {"$ne": ""}}},
+                {"$group": {"_id": "$genre", "avg_revenue": {"$avg": "$revenue"}}},
+                {"$sort": {"avg_revenue": -1}},
+                {"$limit": 1}
+            ]
+            result = list(self.films.aggregate(pipeline))
+            if result:
+                return result[0]["_id"], result[0]["avg_revenue"]
             return None, 0
-        
-        # Créer un DataFrame pour l'analyse
-        df = pd.DataFrame(films_data)
-        
-        # Exploser les genres (transformer une ligne avec plusieurs genres en plusieurs lignes)
-        df['genre'] = df['genre'].str.split(',')
-        df = df.explode('genre')
-        df['genre'] = df['genre'].str.strip()
-        
-        # Calculer le revenu moyen par genre
-        avg_revenue_by_genre = df.groupby('genre')['Revenue (Millions)'].mean().reset_index()
+            
+        # Sommes et effectifs des revenus par genre, calculés par partition puis fusionnés
+        revenue_by_genre = self._scan().reduce(
+            lambda df: GroupSums.from_frame(self._explode_genres(df), 'genre', 'Revenue (Millions)'),
+            {"Revenue (Millions)": {"$ne": "", "$exists": True}},
+            {"genre": str, "Revenue (Millions)": float}
+        )
         
         # Trouver le genre avec le revenu moyen le plus élevé
+        avg_revenue_by_genre = revenue_by_genre.means()
         if not avg_revenue_by_genre.empty:
-            top_genre = avg_revenue_by_genre.sort_values('Revenue (Millions)', ascending=False).iloc[0]
-            return top_genre['genre'], top_genre['Revenue (Millions)']
+            avg_revenue_by_genre = avg_revenue_by_genre.sort_values(ascending=False)
+            return avg_revenue_by_genre.index[0], avg_revenue_by_genre.iloc[0]
         
         return None, 0
     
-    def query_9_top_3_films_by_decade(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_9_top_3_films_by_decade(self, server_side=True):
         """
         9. Trouve les 3 films les mieux notés pour chaque décennie
         
+        Args:
+            server_side (bool): Si True, calcule le résultat par agrégation côté serveur,
+                sinon rapatrie les films et calcule avec pandas
+        
         Returns:
             dict: Dictionnaire avec décennies comme clés et listes de films comme valeurs
         """
         if self.films is None:
             return {}
-            
-        # Récupérer tous les films avec année et note
-        films_data = list(self.films.find(
-            {"Metascore": {"$ne": "", "$exists": True}}, 
-            {"title": 1, "year": 1, "Metascore": 1, "_id": 0}
-        ))
-        
-        if not films_data:
-            return {}
-        
-        # Créer un DataFrame pour l'analyse
-        df = pd.DataFrame(films_data)
-        
-        # Convertir Metascore en numérique
-        df['Metascore'] = pd.to_numeric(df['Metascore'], errors='coerce')
         
-        # Créer une colonne pour la décennie
-        df['decade'] = (df['year'] // 10) * 10
-        
-        # Trouver les 3 meilleurs films par décennie
-        result = {}
-        for decade, group in df.groupby('decade'):
-            top_3 = group.nlargest(3, 'Metascore')[['title', 'year', 'Metascore']].to_dict('records')
-            result[f"{decade}-{decade+9}"] = top_3
-        
-        return result
+        if server_side:
+            pipeline = [
+                {"$project": {"_id": 0, "title": 1, "year": 1, "Metascore": METASCORE_FIELD}},
+                {"$match": {"Metascore": {"$ne": None}, "year": {"$type": "number"}}},
+                {"$group": {
+                    "_id": DECADE_EXPR,
+                    "top_3": {"$topN": {
+                        "n": 3,
+                        "sortBy": {"Metascore": -1},
+                        "output": {"title": "$title", "year": "$year", "Metascore": "$Metascore"}
+                    }}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+            result = {}
+            for doc in self.films.aggregate(pipeline):
+                decade = int(doc["_id"])
+                result[f"{decade}-{decade+9}"] = doc["top_3"]
+            return result
+            
+        # Les 3 meilleurs films par décennie de chaque partition, puis fusionnés
+        # (Metascore non numérique -> valeur manquante)
+        top_3 = self._scan().reduce(
+            lambda df: TopK.from_frame(df.assign(decade=(df['year'] // 10) * 10), 3, 'Metascore', by='decade'),
+            {"Metascore": {"$ne": "", "$exists": True}},
+            {"title": str, "year": int, "Metascore": int}
+        )
+        
+        return {f"{decade}-{decade+9}": films
+                for decade, films in top_3.records(['title', 'year', 'Metascore']).items()}
     
-    def query_10_longest_film_by_genre(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_10_longest_film_by_genre(self, server_side=True):
         """
         10. Trouve le film le plus long par genre
         
+        Args:
+            server_side (bool): Si True, calcule le résultat par agrégation côté serveur,
+                sinon rapatrie les films et calcule avec pandas
+        
         Returns:
             list: Liste des films les plus longs par genre
         """
         if self.films is None:
             return []
-            
-        # Récupérer tous les films avec genre et durée
-        films_data = list(self.films.find(
-            {"Runtime (Minutes)": {"$ne": "", "$exists": True}}, 
-            {"title": 1, "genre": 1, "Runtime (Minutes)": 1, "_id": 0}
-        ))
-        
-        if not films_data:
-            return []
-        
-        # Créer un DataFrame pour l'analyse
-        df = pd.DataFrame(films_data)
-        
-        # Exploser les genres
-        df['genre'] = df['genre'].str.split(',')
-        df = df.explode('genre')
-        df['genre'] = df['genre'].str.strip()
         
-        # Trouver le film le plus long par genre
-        result = []
-        for genre, group in df.groupby('genre'):
-            longest_film = group.nlargest(1, 'Runtime (Minutes)')[['title', 'genre', 'Runtime (Minutes)']].to_dict('records')[0]
-            result.append(longest_film)
-        
-        return result
+        if server_side:
+            pipeline = [
+                {"$project": {"_id": 0, "title": 1, "genre": GENRES_FIELD, "runtime": RUNTIME_FIELD}},
+                {"$match": {"runtime": {"$ne": None}}},
+                {"$unwind": "$genre"},
+                {"$match": {"genre": {"$ne": ""}}},
+                {"$group": {"_id": "$genre", "longest": {"$top": {
+                    "sortBy": {"runtime": -1},
+                    "output": {"title": "$title", "runtime": "$runtime"}
+                }}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "title": "$longest.title", "genre": "$_id", "Runtime (Minutes)": "$longest.runtime"}}
+            ]
+            return list(self.films.aggregate(pipeline))
+            
+        # Le film le plus long par genre de chaque partition, puis fusionnés
+        longest = self._scan().reduce(
+            lambda df: TopK.from_frame(self._explode_genres(df), 1, 'Runtime (Minutes)', by='genre'),
+            {"Runtime (Minutes)": {"$ne": "", "$exists": True}},
+            {"title": str, "genre": str, "Runtime (Minutes)": int}
+        )
+        
+        return [films[0] for films in longest.records(['title', 'genre', 'Runtime (Minutes)']).values()]
     
+    @instrumented("mongodb", "mongo")
     def query_11_create_high_rated_high_revenue_view(self):
         """
         11. Crée une vue MongoDB avec les films à note > 80 et revenus > 50M
@@ -292,17 +483,11 @@ class MongoDBQueries:
         try:
             # Créer ou remplacer la vue
             view_name = "high_rated_high_revenue"
-            pipeline = [
-                {"$match": {
-                    "Metascore": {"$gt": 80},
-                    "Revenue (Millions)": {"$gt": 50}
-                }}
-            ]
             
             self.mongo.db.command({
                 "create": view_name,
                 "viewOn": "films",
-                "pipeline": pipeline
+                "pipeline": self.HIGH_RATED_VIEW_PIPELINE
             })
             
             # Compter les documents dans la vue
@@ -311,139 +496,217 @@ class MongoDBQueries:
             
         except Exception as e:
             print(f"Erreur lors de la création de la vue: {e}")
+            query_failed()
             return 0
     
-    def query_12_runtime_revenue_correlation(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_12_runtime_revenue_correlation(self, server_side=True, sample_size=2000):
         """
         12. Calcule la corrélation entre durée et revenus des films
         
+        En mode serveur, seules les sommes nécessaires au coefficient de Pearson
+        sont rapatriées, ainsi qu'un échantillon de points pour la visualisation.
+        
+        Args:
+            server_side (bool): Si True, calcule le résultat par agrégation côté serveur,
+                sinon rapatrie les films et calcule avec pandas
+            sample_size (int): Nombre maximum de points retournés pour la visualisation (mode serveur)
+        
         Returns:
             tuple: (coefficient de corrélation, p-value, DataFrame pour visualisation)
         """
         if self.films is None:
             return 0, 0, None
+        
+        if server_side:
+            numeric_stages = [
+                {"$project": {"_id": 0, "title": 1, "runtime": RUNTIME_FIELD, "revenue": REVENUE_FIELD}},
+                {"$match": {"runtime": {"$ne": None}, "revenue": {"$ne": None}}}
+            ]
+            sums = list(self.films.aggregate(numeric_stages + [
+                {"$group": {
+                    "_id": None,
+                    "n": {"$sum": 1},
+                    "sx": {"$sum": "$runtime"},
+                    "sy": {"$sum": "$revenue"},
+                    "sxx": {"$sum": {"$multiply": ["$runtime", "$runtime"]}},
+                    "syy": {"$sum": {"$multiply": ["$revenue", "$revenue"]}},
+                    "sxy": {"$sum": {"$multiply": ["$runtime", "$revenue"]}}
+                }}
+            ]))
+            if not sums or sums[0]["n"] < 2:
+                return 0, 0, None
             
-        # Récupérer les films avec durée et revenus
-        films_data = list(self.films.find(
+            corr, p_value = self._pearson_from_sums(**{k: v for k, v in sums[0].items() if k != "_id"})
+            
+            sample = list(self.films.aggregate(numeric_stages + [
+                {"$sample": {"size": sample_size}},
+                {"$project": {"title": 1, "Runtime (Minutes)": "$runtime", "Revenue (Millions)": "$revenue"}}
+            ]))
+            return corr, p_value, pd.DataFrame(sample, columns=["title", "Runtime (Minutes)", "Revenue (Millions)"])
+            
+        def partition_moments(df):
+            # Supprimer les valeurs manquantes (valeurs non numériques -> NaN)
+            df = df.dropna()
+            return CoMoments.from_arrays(df['Runtime (Minutes)'], df['Revenue (Millions)']), df
+        
+        # Co-moments durée/revenus de chaque partition, fusionnés pour le coefficient de Pearson
+        partials = self._scan().map(
+            partition_moments,
             {
                 "Runtime (Minutes)": {"$ne": "", "$exists": True},
                 "Revenue (Millions)": {"$ne": "", "$exists": True}
-            }, 
-            {"title": 1, "Runtime (Minutes)": 1, "Revenue (Millions)": 1, "_id": 0}
-        ))
-        
-        if not films_data:
+            },
+            {"title": str, "Runtime (Minutes)": float, "Revenue (Millions)": float}
+        )
+        moments = CoMoments()
+        for partition, _ in partials:
+            moments = moments.merge(partition)
+        
+        if moments.n < 2:
             return 0, 0, None
         
-        # Créer un DataFrame
-        df = pd.DataFrame(films_data)
-        
-        # Convertir en numérique
-        df['Runtime (Minutes)'] = pd.to_numeric(df['Runtime (Minutes)'], errors='coerce')
-        df['Revenue (Millions)'] = pd.to_numeric(df['Revenue (Millions)'], errors='coerce')
-        
-        # Supprimer les valeurs manquantes
-        df = df.dropna()
-        
-        if len(df) < 2:
-            return 0, 0, None
-        
-        # Calculer la corrélation
-        corr, p_value = pearsonr(df['Runtime (Minutes)'], df['Revenue (Millions)'])
+        corr, p_value = moments.pearson()
+        df = pd.concat([df for _, df in partials], ignore_index=True)
         
         return corr, p_value, df
     
-    def query_13_average_runtime_by_decade(self):
+    @staticmethod
+    def _pearson_from_sums(n, sx, sy, sxx, syy, sxy):
+        """
+        Calcule le coefficient de Pearson et sa p-value à partir des sommes agrégées
+        
+        Returns:
+            tuple: (coefficient de corrélation, p-value bilatérale)
+        """
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        if var_x <= 0 or var_y <= 0:
+            return 0, 0
+        
+        corr = max(-1.0, min(1.0, cov / np.sqrt(var_x * var_y)))
+        return corr, pearson_p_value(corr, n)
+    
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_13_average_runtime_by_decade(self, server_side=True, fast=False):
         """
         13. Analyse l'évolution de la durée moyenne des films par décennie
         
+        Args:
+            server_side (bool): Si True, calcule le résultat par agrégation côté serveur,
+                sinon rapatrie les films et calcule avec pandas
+            fast (bool): Recombiner les sommes et effectifs des durées des compartiments
+                par année de 'films_stats'
+        
         Returns:
-            tuple: (DataFrame des durées moyennes, Figure matplotlib)
+            tuple: (DataFrame des durées moyennes, ChartSpec de la courbe)
         """
         if self.films is None:
             return None, None
+        
+        stats = self._materialized(fast)
+        if stats:
+            years = pd.DataFrame([bucket for bucket in stats.buckets("year")
+                                  if isinstance(bucket["value"], (int, float)) and bucket["runtime_count"]])
+            if years.empty:
+                return None, None
+            years["decade"] = (years["value"] // 10 * 10).astype(int)
+            sums = years.groupby("decade")[["runtime_sum", "runtime_count"]].sum().sort_index()
+            avg_runtime_by_decade = pd.DataFrame({
+                "decade": sums.index,
+                "Runtime (Minutes)": sums["runtime_sum"] / sums["runtime_count"]
+            }).reset_index(drop=True)
+            return avg_runtime_by_decade, self._chart_runtime_by_decade(avg_runtime_by_decade)
+        
+        if server_side:
+            pipeline = [
+                {"$project": {"_id": 0, "year": 1, "runtime": RUNTIME_FIELD}},
+                {"$match": {"runtime": {"$ne": None}, "year": {"$type": "number"}}},
+                {"$group": {"_id": DECADE_EXPR, "avg_runtime": {"$avg": "$runtime"}}},
+                {"$sort": {"_id": 1}}
+            ]
+            result = [{"decade": int(doc["_id"]), "Runtime (Minutes)": doc["avg_runtime"]}
+                      for doc in self.films.aggregate(pipeline)]
+            if not result:
+                return None, None
+            avg_runtime_by_decade = pd.DataFrame(result)
+            return avg_runtime_by_decade, self._chart_runtime_by_decade(avg_runtime_by_decade)
             
-        # Récupérer les films avec année et durée
-        films_data = list(self.films.find(
-            {"Runtime (Minutes)": {"$ne": "", "$exists": True}}, 
-            {"year": 1, "Runtime (Minutes)": 1, "_id": 0}
-        ))
+        # Sommes et effectifs des durées par décennie de chaque partition (durée non numérique -> NaN)
+        runtime_by_decade = self._scan().reduce(
+            lambda df: GroupSums.from_frame(df.assign(decade=(df['year'] // 10) * 10), 'decade', 'Runtime (Minutes)'),
+            {"Runtime (Minutes)": {"$ne": "", "$exists": True}},
+            {"year": int, "Runtime (Minutes)": float}
+        )
         
-        if not films_data:
+        # Calculer la durée moyenne par décennie
+        avg_runtime_by_decade = runtime_by_decade.means()
+        if avg_runtime_by_decade.empty:
             return None, None
+        avg_runtime_by_decade = avg_runtime_by_decade.rename_axis('decade').reset_index(name='Runtime (Minutes)')
         
-        # Créer un DataFrame
-        df = pd.DataFrame(films_data)
-        
-        # Convertir en numérique
-        df['Runtime (Minutes)'] = pd.to_numeric(df['Runtime (Minutes)'], errors='coerce')
+        return avg_runtime_by_decade, self._chart_runtime_by_decade(avg_runtime_by_decade)
+    
+    @staticmethod
+    def _chart_runtime_by_decade(avg_runtime_by_decade):
+        """Courbe de la durée moyenne des films par décennie, avec les valeurs annotées"""
+        return ChartSpec("line", avg_runtime_by_decade, "decade", "Runtime (Minutes)",
+                         "Durée moyenne des films par décennie", "Décennie", "Durée moyenne (minutes)")
+    
+    # Questions transversales
+    def genre_pair_index(self):
+        """
+        Index inversé genre -> films utilisé par la requête 27
         
-        # Créer une colonne pour la décennie
-        df['decade'] = (df['year'] // 10) * 10
+        L'index est conservé par l'instance (et non dans le cache des résultats) et
+        reconstruit lorsque le marqueur des données du connecteur change.
         
-        # Calculer la durée moyenne par décennie
-        avg_runtime_by_decade = df.groupby('decade')['Runtime (Minutes)'].mean().reset_index()
-        avg_runtime_by_decade = avg_runtime_by_decade.sort_values('decade')
-        
-        # Créer un graphique
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.plot(avg_runtime_by_decade['decade'], avg_runtime_by_decade['Runtime (Minutes)'], 
-                marker='o', linestyle='-', linewidth=2)
-        
-        ax.set_title('Durée moyenne des films par décennie')
-        ax.set_xlabel('Décennie')
-        ax.set_ylabel('Durée moyenne (minutes)')
-        ax.grid(linestyle='--', alpha=0.7)
-        
-        # Ajouter les valeurs sur les points
-        for i, row in avg_runtime_by_decade.iterrows():
-            ax.annotate(f"{row['Runtime (Minutes)']:.1f}", 
-                       (row['decade'], row['Runtime (Minutes)']),
-                       textcoords="offset points", 
-                       xytext=(0,10), 
-                       ha='center')
-        
-        plt.tight_layout()
-        
-        return avg_runtime_by_decade, fig
+        Returns:
+            GenrePairIndex: Index construit à partir d'une seule lecture de la collection
+        """
+        marker = data_marker("mongodb", self.mongo)
+        with self._pair_index_lock:
+            if self._pair_index is None or self._pair_index[0] != marker:
+                films = self.films.find({}, {"title": 1, "genres": 1, "genre": 1, "Director": 1, "_id": 0})
+                self._pair_index = (marker, GenrePairIndex(films))
+            return self._pair_index[1]
     
-    # Questions transversales
-    def query_27_films_with_common_genres_different_directors(self):
+    @cached_query("mongodb", "mongo")
+    @instrumented("mongodb", "mongo")
+    def query_27_films_with_common_genres_different_directors(self, limit=100, offset=0):
         """
         27. Films qui ont des genres en commun mais des réalisateurs différents
         
+        Les paires sont générées à partir d'un index inversé genre -> films et la
+        génération s'arrête dès que la page demandée est complète.
+        
+        Args:
+            limit (int): Nombre maximum de paires à retourner
+            offset (int): Nombre de paires à sauter (pagination)
+        
         Returns:
             list: Liste de tuples (film1, film2, genres_communs)
         """
         if self.films is None:
             return []
-            
-        # Récupérer tous les films avec leur genre et réalisateur
-        films_data = list(self.films.find({}, {"title": 1, "genre": 1, "Director": 1, "_id": 0}))
         
-        if not films_data:
-            return []
+        return self.genre_pair_index().pairs(offset=offset, limit=limit)
+    
+    @cached_query("mongodb", "mongo")
+    def count_films_with_common_genres_different_directors(self):
+        """
+        Compte les paires de la requête 27 sans les générer
+        
+        Returns:
+            int: Nombre total de paires
+        """
+        if self.films is None:
+            return 0
         
-        # Préparer les données
-        result = []
-        for i, film1 in enumerate(films_data):
-            for film2 in films_data[i+1:]:
-                # Vérifier si les réalisateurs sont différents
-                if film1.get('Director') != film2.get('Director'):
-                    # Trouver les genres communs
-                    genres1 = set([g.strip() for g in film1.get('genre', '').split(',')])
-                    genres2 = set([g.strip() for g in film2.get('genre', '').split(',')])
-                    common_genres = genres1.intersection(genres2)
-                    
-                    if common_genres:
-                        result.append((
-                            film1.get('title'),
-                            film2.get('title'),
-                            list(common_genres)
-                        ))
-        
-        # Limiter les résultats pour ne pas surcharger
-        return result[:100]
+        return self.genre_pair_index().count()
 
 # Test du module
 if __name__ == "__main__":
@@ -1,8 +1,19 @@
+import weakref
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
 from py2neo import Graph, Node, Relationship
 
+from queries.cache import cached_query
+from queries.communities import costar_degrees, costar_subgraph, detect_communities
+from queries.derived_relationships import DirectorRelationships
+from queries.instrumentation import INSTRUMENTATION, instrumented, query_failed
+from queries.graph_projection import CoStarProjection
+from queries.path_service import PathService
+
 class Neo4jQueries:
     def __init__(self, neo4j_connector):
         """
@@ -12,8 +23,92 @@ class Neo4jQueries:
             neo4j_connector: Instance de Neo4jConnector
         """
         self.neo4j = neo4j_connector
-        self.graph = self.neo4j.graph if self.neo4j else None
+        self._projection = None
+        self._path_service = None
+        self._communities = {}
+        self._derived = None
+    
+    @property
+    def graph(self):
+        """
+        Graphe du connecteur (None si la connexion n'est pas disponible)
+        
+        Pendant un appel profilé par l'instrumentation, les requêtes Cypher passent par PROFILE.
+        """
+        return INSTRUMENTATION.graph(self.neo4j.graph) if self.neo4j else None
+    
+    def costar_projection(self):
+        """
+        Projection Actor-Film en mémoire, chargée au premier appel puis mise à jour
+        lorsque le marqueur GraphState du graphe change
+        
+        Returns:
+            CoStarProjection: Projection à jour
+        """
+        if self._projection is None:
+            self._projection = CoStarProjection().load(self.graph)
+        else:
+            self._projection.refresh(self.graph)
+        return self._projection
+    
+    def path_service(self):
+        """
+        Service de plus courts chemins sur la projection Actor-Film (mise à jour à chaque appel)
+        
+        Returns:
+            PathService: Service partagé par les appels de cette instance
+        """
+        projection = self.costar_projection()
+        if self._path_service is None:
+            self._path_service = PathService(projection)
+        return self._path_service
+    
+    def derived_relationships(self):
+        """
+        Relations INFLUENCE_PAR et EN_CONCURRENCE_AVEC à jour (requêtes 24 et 29)
+        
+        Le premier appel calcule toutes les relations ; les suivants ne traitent que les
+        films réalisés depuis le dernier appel.
+        
+        Returns:
+            DirectorRelationships: Moteur de relations dérivées de cette instance
+        """
+        if self._derived is None:
+            self._derived = DirectorRelationships()
+        return self._derived.refresh(self.graph)
+    
+    def shortest_paths_between_actors(self, pairs, max_depth=10, timeout=None):
+        """
+        Plus courts chemins pour plusieurs paires d'acteurs en un seul appel
+        
+        Args:
+            pairs (list): Tuples (acteur1, acteur2)
+            max_depth (int): Nombre maximum de relations par chemin
+            timeout (float): Durée maximale de chaque recherche en secondes
+            
+        Returns:
+            list: Un chemin (liste de nœuds, vide si aucun) par paire
+        """
+        if not self.graph:
+            return [[] for _ in pairs]
+        return self.path_service().shortest_paths(pairs, max_depth, timeout)
+    
+    def degrees_of_separation(self, actor1_name, actor2_name, approximate=False):
+        """
+        Nombre de films séparant deux acteurs (« degrés de Kevin Bacon »)
+        
+        Avec des repères précalculés (path_service().build_landmarks()), la réponse est
+        immédiate lorsque l'encadrement est exact, ou avec approximate=True.
+        
+        Returns:
+            int: Degrés de séparation, ou None si aucun chemin n'est trouvé
+        """
+        if not self.graph:
+            return None
+        return self.path_service().degrees_of_separation(actor1_name, actor2_name, approximate=approximate)
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_14_actor_with_most_films(self):
         """
         14. Trouve l'acteur ayant joué dans le plus grand nombre de films
@@ -38,6 +133,8 @@ class Neo4jQueries:
         else:
             return None, 0
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_15_actors_played_with_anne_hathaway(self):
         """
         15. Liste des acteurs ayant joué dans des films avec Anne Hathaway
@@ -59,6 +156,8 @@ class Neo4jQueries:
         result = self.graph.run(query).data()
         return result
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_16_actor_with_highest_revenue(self):
         """
         16. Trouve l'acteur ayant joué dans des films totalisant le plus de revenus
@@ -69,10 +168,13 @@ class Neo4jQueries:
         if not self.graph:
             return None, 0
             
+        # Les revenus sont des nombres (ou absents) depuis l'import : le filtre part
+        # de l'index film_revenue plutôt que de tous les acteurs
         query = """
-        MATCH (a:Actor)-[:A_JOUE_DANS]->(f:Film)
-        WHERE f.revenue IS NOT NULL AND f.revenue <> ""
-        WITH a, sum(toFloat(f.revenue)) AS total_revenue
+        MATCH (f:Film)
+        WHERE f.revenue >= 0
+        MATCH (a:Actor)-[:A_JOUE_DANS]->(f)
+        WITH a, sum(f.revenue) AS total_revenue
         RETURN a.name AS actor_name, total_revenue
         ORDER BY total_revenue DESC
         LIMIT 1
@@ -85,6 +187,8 @@ class Neo4jQueries:
         else:
             return None, 0
 
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_17_average_votes(self):
         """
         17. Calcule la moyenne des votes
@@ -107,6 +211,8 @@ class Neo4jQueries:
         else:
             return 0
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_18_most_represented_genre(self):
         """
         18. Détermine le genre le plus représenté
@@ -117,8 +223,7 @@ class Neo4jQueries:
         if not self.graph:
             return None, 0
             
-        # Note: Vous devrez d'abord créer des nœuds Genre et des relations APPARTIENT_AU
-        # Si cela n'a pas été fait, cette requête ne retournera rien
+        # Les nœuds Genre sont créés par build_graph ou Neo4jConnector.create_genre_nodes
         
         query = """
         MATCH (g:Genre)<-[:APPARTIENT_AU]-(f:Film)
@@ -147,18 +252,25 @@ class Neo4jQueries:
             
             return None, 0
     
-    def query_19_films_with_your_costars(self, team_member_name):
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
+    def query_19_films_with_your_costars(self, team_member_name, use_projection=True):
         """
         19. Trouve les films des acteurs ayant joué avec un membre de l'équipe
         
         Args:
             team_member_name (str): Nom du membre de l'équipe
+            use_projection (bool): Calculer le résultat sur la projection en mémoire
+                (sinon par une requête Cypher)
             
         Returns:
             list: Liste de films
         """
         if not self.graph:
             return []
+        
+        if use_projection:
+            return self.costar_projection().films_with_costars(team_member_name)
             
         query = """
         MATCH (you:Actor {name: $member_name})-[:A_JOUE_DANS]->(f1:Film)<-[:A_JOUE_DANS]-(costar:Actor),
@@ -171,6 +283,8 @@ class Neo4jQueries:
         result = self.graph.run(query, member_name=team_member_name).data()
         return result
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_20_director_with_most_actors(self):
         """
         20. Trouve le réalisateur ayant travaillé avec le plus d'acteurs
@@ -195,18 +309,25 @@ class Neo4jQueries:
         else:
             return None, 0
     
-    def query_21_most_connected_films(self, limit=10):
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
+    def query_21_most_connected_films(self, limit=10, use_projection=True):
         """
         21. Trouve les films les plus "connectés" (avec le plus d'acteurs en commun)
     
         Args:
             limit (int): Nombre de films à retourner
+            use_projection (bool): Calculer le résultat sur la projection en mémoire
+                (sinon par une requête Cypher)
         
         Returns:
             list: Liste de dictionnaires (film1, film2, acteurs_communs)
         """
         if not self.graph:
             return []
+        
+        if use_projection:
+            return self.costar_projection().most_connected_films(limit)
 
         query = """
         MATCH (f1:Film)<-[:A_JOUE_DANS]-(a:Actor)-[:A_JOUE_DANS]->(f2:Film)
@@ -223,6 +344,8 @@ class Neo4jQueries:
         return result
     
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_22_actors_with_most_directors(self, limit=5):
         """
         22. Trouve les 5 acteurs ayant joué avec le plus de réalisateurs
@@ -247,6 +370,8 @@ class Neo4jQueries:
         result = self.graph.run(query, limit=limit).data()
         return result
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_23_recommend_film_for_actor(self, actor_name):
         """
         23. Recommande un film à un acteur en fonction des genres où il a joué
@@ -281,184 +406,198 @@ class Neo4jQueries:
             return result
         except Exception as e:
             print(f"Erreur dans query_23: {e}")
+            query_failed()
             return []
     
+    @instrumented("neo4j", "neo4j")
     def query_24_create_influence_relationships(self):
         """
         24. Crée des relations INFLUENCE_PAR entre réalisateurs basées sur similarités de genres
         
+        Deux réalisateurs sont reliés si l'indice de Jaccard de leurs ensembles de genres
+        dépasse 0,3. Le calcul est délégué à DirectorRelationships : seuls les réalisateurs
+        de films ajoutés depuis le dernier appel sont recalculés, et relancer la requête ne
+        modifie pas les relations existantes.
+        
         Returns:
-            int: Nombre de relations créées
+            int: Nombre de relations INFLUENCE_PAR
         """
         if not self.graph:
             return 0
-            
-        # Cette requête crée des relations INFLUENCE_PAR si les réalisateurs ont travaillé sur
-        # des films de genres similaires
-        
-        query = """
-        // Trouver les genres par réalisateur
-        MATCH (d:Director)-[:A_REALISE]->(f:Film)
-        WITH d, collect(f.genre) AS genres
-        
-        // Comparer les réalisateurs
-        MATCH (d2:Director)-[:A_REALISE]->(f2:Film)
-        WHERE id(d) < id(d2)
-        WITH d, d2, genres, collect(f2.genre) AS genres2
-        
-        // Calculer similarité (simple : nombre de genres en commun)
-        WITH d, d2, 
-             [g IN genres WHERE g IN genres2] AS common_genres,
-             size(genres) AS d1_genres_count,
-             size(genres2) AS d2_genres_count
-        WHERE size(common_genres) > 0
-        
-        // Créer la relation si similarité > seuil
-        WITH d, d2, common_genres,
-             size(common_genres)*1.0 / (d1_genres_count + d2_genres_count - size(common_genres)) AS jaccard_index
-        WHERE jaccard_index > 0.3
-        
-        // Créer la relation
-        MERGE (d)-[r:INFLUENCE_PAR]->(d2)
-        SET r.similarity = jaccard_index,
-            r.common_genres = common_genres
         
-        RETURN count(r) AS relationship_count
-        """
-        
-        result = self.graph.run(query).data()
-        if result:
-            return result[0]["relationship_count"]
-        else:
+        try:
+            return len(self.derived_relationships().influence)
+        except Exception as e:
+            print(f"Erreur dans query_24: {e}")
+            query_failed()
             return 0
     
-    def query_25_shortest_path_between_actors(self, actor1_name, actor2_name):
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
+    def query_25_shortest_path_between_actors(self, actor1_name, actor2_name, use_projection=True,
+                                              max_depth=10, timeout=5.0):
         """
         25. Trouve le chemin le plus court entre deux acteurs
         
         Args:
             actor1_name (str): Nom du premier acteur
             actor2_name (str): Nom du deuxième acteur
+            use_projection (bool): Parcours bidirectionnel sur la projection en mémoire
+                (sinon une requête Cypher shortestPath)
+            max_depth (int): Nombre maximum de relations du chemin
+            timeout (float): Durée maximale de la recherche en mémoire en secondes
             
         Returns:
             list: Liste des nœuds du chemin
         """
         if not self.graph:
             return []
+        
+        if use_projection:
+            return self.path_service().shortest_path(actor1_name, actor2_name, max_depth, timeout)
             
-        query = """
+        # Un seul parcours : un échec ne déclenche plus de seconde recherche sans contrainte
+        query = f"""
         MATCH path = shortestPath(
-          (a1:Actor {name: $actor1})-[:A_JOUE_DANS|:A_REALISE*..10]-(a2:Actor {name: $actor2})
+          (a1:Actor {{name: $actor1}})-[:A_JOUE_DANS|:A_REALISE*..{int(max_depth)}]-(a2:Actor {{name: $actor2}})
         )
         RETURN [node IN nodes(path) | CASE
-            WHEN node:Actor THEN {type: 'Actor', name: node.name}
-            WHEN node:Film THEN {type: 'Film', title: node.title}
-            ELSE {type: 'Unknown', id: id(node)}
+            WHEN node:Actor THEN {{type: 'Actor', name: node.name}}
+            WHEN node:Film THEN {{type: 'Film', title: node.title}}
+            ELSE {{type: 'Unknown', id: id(node)}}
         END] AS path_nodes
         """
         
         try:
             result = self.graph.run(query, actor1=actor1_name, actor2=actor2_name).data()
-            if result:
-                return result[0]["path_nodes"]
-            else:
-                # Essayer une requête alternative avec moins de contraintes
-                query_alt = """
-                MATCH path = shortestPath(
-                  (a1:Actor {name: $actor1})-[*..6]-(a2:Actor {name: $actor2})
-                )
-                RETURN [node IN nodes(path) | CASE
-                    WHEN node:Actor THEN {type: 'Actor', name: node.name}
-                    WHEN node:Film THEN {type: 'Film', title: node.title}
-                    ELSE {type: 'Unknown', id: id(node)}
-                END] AS path_nodes
-                """
-                alt_result = self.graph.run(query_alt, actor1=actor1_name, actor2=actor2_name).data()
-                if alt_result:
-                    return alt_result[0]["path_nodes"]
-                return []
+            return result[0]["path_nodes"] if result else []
         except Exception as e:
             print(f"Erreur dans query_25: {e}")
+            query_failed()
             return []
     
-    def query_26_actor_communities(self, max_communities=5):
+    def _detect_communities(self, method="louvain"):
+        """
+        Communautés de la projection Actor-Film, recalculées seulement si la matrice a changé
+        
+        Seuls les numéros de communauté et la modularité sont conservés : le graphe des
+        co-stars (W = B @ B.T), bien plus gros que la projection, est libéré après le calcul.
+        
+        Returns:
+            tuple: (instantané de la projection, communauté de chaque acteur, modularité)
+        """
+        # Un seul instantané : la matrice et les noms restent cohérents pendant un rafraîchissement
+        projection = self.costar_projection().snapshot()
+        cached = self._communities.get(method)
+        # Référence faible : une ancienne matrice n'est pas gardée en mémoire par le mémo
+        if cached is None or cached[0]() is not projection.matrix:
+            labels, _, score = detect_communities(projection, method)
+            cached = (weakref.ref(projection.matrix), labels, score)
+            self._communities[method] = cached
+        return (projection,) + cached[1:]
+    
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
+    def query_26_actor_communities(self, max_communities=5, method="louvain", max_actors=20):
         """
         26. Analyse les communautés d'acteurs
         
+        Les communautés sont détectées en mémoire (Louvain ou propagation d'étiquettes)
+        sur le graphe pondéré des co-stars issu de la projection Actor-Film.
+        
         Args:
             max_communities (int): Nombre maximum de communautés à retourner
+            method (str): "louvain" ou "label_propagation"
+            max_actors (int): Nombre d'acteurs listés (les plus connectés) par communauté
             
         Returns:
             tuple: (DataFrame des communautés, graphe NetworkX pour visualisation)
         """
         if not self.graph:
             return None, None
-            
-        # Approche alternative sans GDS
-        return self._query_26_without_gds(max_communities)
-    
-    def _query_26_without_gds(self, max_communities=5):
-        """
-        Implémentation alternative de l'analyse des communautés sans GDS
-        """
-        if not self.graph:
-            return None, None
-            
-        # Requête simple pour trouver des groupes d'acteurs ayant joué ensemble
-        query = """
-        MATCH (f:Film)<-[:A_JOUE_DANS]-(a:Actor)
-        WITH f, collect(a) AS actors
-        WHERE size(actors) >= 3
-        WITH [a IN actors | a.name] AS actor_names, count(f) AS film_count
-        RETURN actor_names, film_count
-        ORDER BY film_count DESC, size(actor_names) DESC
-        LIMIT $max_communities
-        """
-        
-        communities = self.graph.run(query, max_communities=max_communities).data()
         
-        if not communities:
+        try:
+            projection, labels, score = self._detect_communities(method)
+        except Exception as e:
+            print(f"Erreur dans query_26: {e}")
+            query_failed()
             return None, None
         
-        # Convertir en DataFrame
-        df = pd.DataFrame([{
-            'communityId': i,
-            'actors': community['actor_names'],
-            'film_count': community['film_count'],
-            'community_size': len(community['actor_names'])
-        } for i, community in enumerate(communities)])
+        if len(labels) == 0:
+            return None, None
         
-        # Visualisation avec NetworkX
+        sizes = np.bincount(labels)
+        top = np.argsort(-sizes, kind="stable")[:max_communities]
+        degrees = costar_degrees(projection)
+        # Films ayant au moins un acteur de la communauté : lignes de P.T @ B
+        assignment = sp.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                                   shape=(sizes.size, len(labels)))
+        film_counts = (assignment @ projection.matrix).getnnz(axis=1)
+        
+        rows, shown = [], []
+        for community in top:
+            members = np.flatnonzero(labels == community)
+            members = members[np.argsort(-degrees[members], kind="stable")][:max_actors]
+            shown.append(members)
+            rows.append({
+                'communityId': int(community),
+                'actors': [projection.actor_names[a] for a in members],
+                'film_count': int(film_counts[community]),
+                'community_size': int(sizes[community])
+            })
+        df = pd.DataFrame(rows)
+        df.attrs["modularity"] = score
+        
+        # Visualisation : acteurs listés et leurs liens pondérés par le nombre de films partagés
+        selected = np.concatenate(shown)
+        edges = sp.triu(costar_subgraph(projection, selected), k=1).tocoo()
         G = nx.Graph()
-        
-        for i, community in enumerate(communities):
-            actor_names = community['actor_names']
-            
-            # Ajouter des nœuds pour chaque acteur
-            for actor in actor_names:
-                G.add_node(actor, community=i)
-            
-            # Ajouter des arêtes entre tous les acteurs d'une même communauté
-            for idx, actor1 in enumerate(actor_names):
-                for actor2 in actor_names[idx+1:]:
-                    G.add_edge(actor1, actor2, weight=1)
+        for actor in selected.tolist():
+            G.add_node(projection.actor_names[actor], community=int(labels[actor]))
+        G.add_weighted_edges_from(
+            (projection.actor_names[selected[i]], projection.actor_names[selected[j]], w)
+            for i, j, w in zip(edges.row.tolist(), edges.col.tolist(), edges.data.tolist()))
         
         return df, G
     
+    def store_actor_communities(self, method="louvain", batch_size=5000):
+        """
+        Détecte les communautés et enregistre la propriété communityId des nœuds Actor
+        
+        Args:
+            method (str): "louvain" ou "label_propagation"
+            batch_size (int): Nombre d'acteurs par requête d'écriture
+            
+        Returns:
+            int: Nombre d'acteurs mis à jour
+        """
+        if not self.graph:
+            return 0
+        projection, labels, score = self._detect_communities(method)
+        print(f"ℹ️ {labels.max() + 1 if len(labels) else 0} communautés détectées (modularité {score:.3f})")
+        return self.neo4j.write_actor_communities(zip(projection.actor_names, labels.tolist()), batch_size)
+    
     # Questions transversales
-    def query_28_recommend_films_based_on_actor_preferences(self, actor_name, limit=5):
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
+    def query_28_recommend_films_based_on_actor_preferences(self, actor_name, limit=5, use_projection=True):
         """
         28. Recommande des films aux utilisateurs en fonction des préférences d'un acteur
         
         Args:
             actor_name (str): Nom de l'acteur
             limit (int): Nombre de films à recommander
+            use_projection (bool): Calculer le résultat sur la projection en mémoire
+                (sinon par une requête Cypher)
             
         Returns:
             list: Liste de films recommandés
         """
         if not self.graph:
             return []
+        
+        if use_projection:
+            return self.costar_projection().recommend_from_costars(actor_name, limit)
             
         # Alternative si pas de nœuds Genre
         query_alt = """
@@ -485,59 +624,33 @@ class Neo4jQueries:
             return result
         except Exception as e:
             print(f"Erreur dans query_28: {e}")
+            query_failed()
             return []
     
+    @instrumented("neo4j", "neo4j")
     def query_29_create_competition_relationship(self):
         """
         29. Crée une relation "concurrence" entre réalisateurs de films similaires la même année
         
+        Les films sont regroupés par (année, genre) au lieu d'être comparés deux à deux.
+        La propriété count est le nombre de paires de films concurrents : elle est
+        recalculée, et non incrémentée, à chaque mise à jour.
+        
         Returns:
-            int: Nombre de relations créées
+            int: Nombre de relations EN_CONCURRENCE_AVEC
         """
         if not self.graph:
             return 0
-            
-        query = """
-        // Trouver les paires de réalisateurs avec des films sortis la même année
-        MATCH (d1:Director)-[:A_REALISE]->(f1:Film),
-              (d2:Director)-[:A_REALISE]->(f2:Film)
-        WHERE d1 <> d2
-        AND f1.year = f2.year
-        AND f1 <> f2
-        
-        // Vérifier si les films sont similaires (même genre)
-        WITH d1, d2, f1, f2
-        WHERE f1.genre IS NOT NULL AND f2.genre IS NOT NULL
-        AND any(g IN split(f1.genre, ",") WHERE g IN split(f2.genre, ","))
-        
-        // Créer la relation de concurrence
-        MERGE (d1)-[r:EN_CONCURRENCE_AVEC]->(d2)
-        ON CREATE SET r.count = 1,
-                      r.years = [f1.year],
-                      r.film_pairs = [[f1.title, f2.title]]
-        ON MATCH SET r.count = r.count + 1,
-                     r.years = CASE WHEN NOT f1.year IN r.years THEN r.years + f1.year ELSE r.years END,
-                     r.film_pairs = r.film_pairs + [[f1.title, f2.title]]
-        
-        RETURN count(r) AS new_relationships
-        """
         
         try:
-            result = self.graph.run(query).data()
-            if result:
-                # Compter toutes les relations EN_CONCURRENCE_AVEC
-                count_query = """
-                MATCH ()-[r:EN_CONCURRENCE_AVEC]->()
-                RETURN count(r) AS total_relationships
-                """
-                count_result = self.graph.run(count_query).data()
-                return count_result[0]["total_relationships"]
-            else:
-                return 0
+            return len(self.derived_relationships().competition)
         except Exception as e:
             print(f"Erreur dans query_29: {e}")
+            query_failed()
             return 0
     
+    @cached_query("neo4j", "neo4j")
+    @instrumented("neo4j", "neo4j")
     def query_30_analyze_director_actor_collaborations(self, min_collaborations=2):
         """
         30. Identifie et analyse les collaborations fréquentes entre réalisateurs et acteurs
@@ -565,20 +678,20 @@ class Neo4jQueries:
         """
         
         # Analyser le succès commercial de ces collaborations
+        # avg() ignore les films sans revenu ou sans votes (propriétés absentes)
         query_commercial = """
         MATCH (d:Director)-[:A_REALISE]->(f:Film)<-[:A_JOUE_DANS]-(a:Actor)
-        WITH d, a, collect(f) AS films
-        WHERE size(films) >= $min_collaborations
-        
-        WITH d, a, films,
-             [f IN films | f.revenue] AS revenues,
-             [f IN films | f.votes] AS votes
+        WITH d, a,
+             count(f) AS collaboration_count,
+             avg(f.revenue) AS avg_revenue,
+             avg(f.votes) AS avg_votes
+        WHERE collaboration_count >= $min_collaborations
         
         RETURN d.name AS director,
                a.name AS actor,
-               size(films) AS collaboration_count,
-               avg(revenues) AS avg_revenue,
-               avg(votes) AS avg_votes
+               collaboration_count,
+               avg_revenue,
+               avg_votes
         ORDER BY avg_revenue DESC
         """
         
@@ -589,4 +702,5 @@ class Neo4jQueries:
             return pd.DataFrame(collaborations), pd.DataFrame(commercial)
         except Exception as e:
             print(f"Erreur dans query_30: {e}")
+            query_failed()
             return None, None
\ No newline at end of file
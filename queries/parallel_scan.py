@@ -0,0 +1,255 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student_t
+
+from queries.frame_transfer import find_frame
+from queries.instrumentation import propagate_context
+
+
+def pearson_p_value(corr, n):
+    """
+    p-value bilatérale du coefficient de Pearson (test de Student à n - 2 degrés de liberté)
+
+    Args:
+        corr (float): Coefficient de corrélation
+        n (int): Nombre de points
+
+    Returns:
+        float: p-value
+    """
+    if n <= 2 or abs(corr) == 1.0:
+        return 0.0
+    t_stat = corr * np.sqrt((n - 2) / (1 - corr * corr))
+    return 2 * student_t.sf(abs(t_stat), n - 2)
+
+
+def _bracket(value):
+    """Famille de comparaison d'une valeur (MongoDB ne compare pas un nombre et une chaîne)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float
+    return type(value)
+
+
+# Agrégats partiels fusionnables : calculés par partition puis combinés par merge()
+
+class CoMoments:
+    """
+    Effectif, moyennes, sommes des carrés des écarts et co-moment de deux variables
+
+    La fusion suit les formules de Chan et al. : pas de sommes brutes de grands
+    carrés, donc pas de perte de précision quand les partitions sont nombreuses.
+    """
+
+    def __init__(self, n=0, mean_x=0.0, mean_y=0.0, m2_x=0.0, m2_y=0.0, c_xy=0.0):
+        self.n = n
+        self.mean_x = mean_x
+        self.mean_y = mean_y
+        self.m2_x = m2_x
+        self.m2_y = m2_y
+        self.c_xy = c_xy
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        """Moments de deux tableaux de même longueur, sans valeur manquante"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not len(x):
+            return cls()
+        dx = x - x.mean()
+        dy = y - y.mean()
+        return cls(len(x), x.mean(), y.mean(), dx @ dx, dy @ dy, dx @ dy)
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        if not self.n:
+            return other
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        return CoMoments(
+            n,
+            self.mean_x + dx * other.n / n,
+            self.mean_y + dy * other.n / n,
+            self.m2_x + other.m2_x + dx * dx * weight,
+            self.m2_y + other.m2_y + dy * dy * weight,
+            self.c_xy + other.c_xy + dx * dy * weight
+        )
+
+    def pearson(self):
+        """
+        Returns:
+            tuple: (coefficient de corrélation, p-value bilatérale), (0, 0) si une variable est constante
+        """
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return 0, 0
+        corr = max(-1.0, min(1.0, self.c_xy / np.sqrt(self.m2_x * self.m2_y)))
+        return corr, pearson_p_value(corr, self.n)
+
+
+class GroupSums:
+    """Sommes et effectifs (valeurs non manquantes) d'une colonne par groupe"""
+
+    def __init__(self, sums=None, counts=None):
+        self.sums = sums if sums is not None else pd.Series(dtype="float64")
+        self.counts = counts if counts is not None else pd.Series(dtype="int64")
+
+    @classmethod
+    def from_frame(cls, df, by, column):
+        grouped = df.groupby(by)[column]
+        return cls(grouped.sum(), grouped.count())
+
+    def merge(self, other):
+        return GroupSums(self.sums.add(other.sums, fill_value=0),
+                         self.counts.add(other.counts, fill_value=0))
+
+    def means(self):
+        """
+        Returns:
+            pandas.Series: Moyenne par groupe (NaN si le groupe n'a aucune valeur), triée par groupe
+        """
+        counts = self.counts.astype("float64").replace(0, np.nan)
+        return (self.sums / counts).sort_index()
+
+
+class TopK:
+    """Les k lignes de plus grande valeur d'une colonne, par groupe"""
+
+    def __init__(self, k, column, groups=None):
+        self.k = k
+        self.column = column
+        self.groups = groups or {}
+
+    @classmethod
+    def from_frame(cls, df, k, column, by):
+        groups = {key: group.nlargest(k, column) for key, group in df.groupby(by)}
+        return cls(k, column, groups)
+
+    def merge(self, other):
+        groups = dict(self.groups)
+        for key, rows in other.groups.items():
+            if key in groups:
+                # À égalité, les lignes de la première partition restent devant (keep="first")
+                rows = pd.concat([groups[key], rows], ignore_index=True).nlargest(self.k, self.column)
+            groups[key] = rows
+        return TopK(self.k, self.column, groups)
+
+    def records(self, columns):
+        """
+        Returns:
+            dict: Groupe -> liste des lignes (dictionnaires), groupes triés
+        """
+        return {key: self.groups[key][columns].to_dict("records") for key in sorted(self.groups)}
+
+
+class ParallelScan:
+    """
+    Lecture d'une collection en plusieurs partitions lues en parallèle
+
+    La collection est découpée en plages d'un champ indexé (_id par défaut, ou year).
+    Chaque partition est lue avec son propre curseur (find_frame) dans un pool de
+    threads, donc sur des connexions distinctes du pool du client, et réduite
+    localement en un agrégat partiel ; les agrégats sont ensuite fusionnés dans
+    l'ordre des partitions.
+    """
+
+    def __init__(self, collection, field="_id", workers=4, partitions=None):
+        """
+        Args:
+            collection: Collection pymongo
+            field (str): Champ indexé servant au découpage
+            workers (int): Nombre de lectures simultanées
+            partitions (int): Nombre de partitions (par défaut deux par worker)
+        """
+        self.collection = collection
+        self.field = field
+        self.workers = max(1, workers)
+        self.partitions = partitions or (1 if self.workers == 1 else 2 * self.workers)
+
+    def boundaries(self):
+        """
+        Bornes des partitions, à effectifs à peu près égaux
+
+        Les bornes sont relevées en un seul parcours trié de l'index du champ (seul
+        le champ est projeté, la lecture est couverte par l'index), arrêté après la
+        dernière borne. Seules les valeurs comparables à la première borne sont gardées.
+
+        Returns:
+            list: Bornes croissantes (partitions - 1 au plus)
+        """
+        if self.partitions < 2:
+            return []
+        total = self.collection.estimated_document_count()
+        positions = {i * total // self.partitions for i in range(1, self.partitions)}
+        last = max(positions)
+        projection = {self.field: 1} if self.field == "_id" else {self.field: 1, "_id": 0}
+        bounds = []
+        with self.collection.find({self.field: {"$ne": None}}, projection).sort(self.field, 1) as cursor:
+            for position, doc in enumerate(cursor):
+                if position > last:
+                    break
+                if position not in positions or doc.get(self.field) is None:
+                    continue
+                value = doc[self.field]
+                if bounds and (_bracket(value) is not _bracket(bounds[0]) or value <= bounds[-1]):
+                    continue
+                bounds.append(value)
+        return bounds
+
+    def filters(self, filter=None):
+        """
+        Filtres des partitions : chaque document est dans exactement une partition
+
+        La première partition contient aussi les documents sans valeur comparable
+        aux bornes (champ absent, null ou d'un autre type).
+
+        Args:
+            filter (dict): Filtre ajouté à chaque partition
+
+        Returns:
+            list: Un filtre par partition
+        """
+        bounds = self.boundaries()
+        if not bounds:
+            return [filter or {}]
+        ranges = [{"$not": {"$gte": bounds[0]}}]
+        ranges += [{"$gte": low, "$lt": high} for low, high in zip(bounds, bounds[1:])]
+        ranges.append({"$gte": bounds[-1]})
+        return [{"$and": [filter, {self.field: r}]} if filter else {self.field: r} for r in ranges]
+
+    def map(self, function, filter=None, schema=None, batch_size=10000):
+        """
+        Applique une fonction au DataFrame de chaque partition
+
+        Args:
+            function: Fonction DataFrame -> agrégat partiel
+            filter (dict): Filtre de la requête
+            schema (dict): Champ -> type Python (voir find_frame)
+            batch_size (int): Nombre de documents par lot
+
+        Returns:
+            list: Agrégats partiels, dans l'ordre des partitions
+        """
+        def scan(partition):
+            return function(find_frame(self.collection, partition, schema, batch_size=batch_size))
+
+        partitions = self.filters(filter)
+        if self.workers == 1 or len(partitions) == 1:
+            return [scan(partition) for partition in partitions]
+        # Les commandes des workers sont rattachées à la requête instrumentée en cours
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan") as pool:
+            return list(pool.map(propagate_context(scan), partitions))
+
+    def reduce(self, function, filter=None, schema=None, batch_size=10000):
+        """
+        Comme map, puis fusionne les agrégats partiels (méthode merge)
+
+        Returns:
+            L'agrégat fusionné
+        """
+        return functools.reduce(lambda left, right: left.merge(right),
+                                self.map(function, filter, schema, batch_size))
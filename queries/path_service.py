@@ -0,0 +1,327 @@
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Nombre de cibles à partir duquel un parcours unique depuis la source est plus rentable
+# que des recherches bidirectionnelles séparées
+SINGLE_SOURCE_THRESHOLD = 4
+
+
+class _Adjacency:
+    """
+    Tableaux d'adjacence d'un instantané de la projection, avec ses repères
+
+    Construit entièrement avant d'être publié par PathService, puis jamais modifié.
+    """
+
+    def __init__(self, snapshot, landmarks=(), landmark_distances=None):
+        self.snapshot = snapshot
+        matrix = snapshot.matrix
+        self.matrix = matrix
+        self.actor_ptr, self.actor_films = matrix.indptr, matrix.indices
+        by_film = matrix.T.tocsr()
+        self.film_ptr, self.film_actors = by_film.indptr, by_film.indices
+        self.by_film = by_film
+        self.landmarks = list(landmarks)
+        self.landmark_distances = landmark_distances
+
+    def films_of(self, actor):
+        return self.actor_films[self.actor_ptr[actor]:self.actor_ptr[actor + 1]].tolist()
+
+    def actors_of(self, film):
+        return self.film_actors[self.film_ptr[film]:self.film_ptr[film + 1]].tolist()
+
+
+class PathService:
+    """
+    Plus courts chemins entre acteurs sur la projection Actor-Film en mémoire
+
+    Le graphe parcouru est le graphe biparti des relations A_JOUE_DANS : un
+    chemin alterne acteurs et films. La recherche est un parcours en largeur
+    bidirectionnel, borné en profondeur (nombre de relations) et en temps.
+    Des repères (landmarks) optionnels donnent en temps constant un encadrement
+    du nombre de degrés de séparation entre deux acteurs.
+
+    Les tableaux d'adjacence et les repères d'un même instantané de la projection
+    sont publiés ensemble (une seule affectation) : une recherche concurrente d'un
+    rafraîchissement utilise toujours des tableaux cohérents entre eux.
+    """
+
+    def __init__(self, projection):
+        """
+        Args:
+            projection (CoStarProjection): Projection Actor-Film (queries.graph_projection)
+        """
+        self.projection = projection
+        self._state = None
+        self._landmark_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def landmarks(self):
+        return self._state.landmarks if self._state else []
+
+    @property
+    def landmark_distances(self):
+        return self._state.landmark_distances if self._state else None
+
+    def _sync(self):
+        """
+        Tableaux d'adjacence de l'instantané courant de la projection
+
+        Returns:
+            _Adjacency: État à utiliser pour toute la durée d'une recherche
+        """
+        state = self._state
+        snapshot = self.projection.snapshot()
+        if state is not None and state.snapshot is snapshot:
+            return state
+        with self._lock:
+            state = self._state
+            if state is None or state.snapshot is not snapshot:
+                state = self._build(snapshot, self._landmark_count)
+                self._state = state
+        return state
+
+    def _build(self, snapshot, landmark_count):
+        """Construit les tableaux d'adjacence et les repères d'un instantané"""
+        state = _Adjacency(snapshot)
+        if landmark_count:
+            degrees = np.diff(state.actor_ptr)
+            chosen = np.argsort(-degrees, kind="stable")[:landmark_count].tolist()
+            distances = np.vstack([self._distances_from(state, actor) for actor in chosen]) if chosen else None
+            state = _Adjacency(snapshot, chosen, distances)
+        return state
+
+    @staticmethod
+    def _expand(state, frontier, parents, seen_films, other_parents):
+        """
+        Avance un côté de la recherche d'un acteur (deux relations)
+
+        Returns:
+            tuple: (nouvelle frontière, acteurs atteints par les deux côtés)
+        """
+        next_frontier = []
+        meetings = []
+        for actor in frontier:
+            depth = parents[actor][2]
+            for film in state.films_of(actor):
+                if film in seen_films:
+                    continue
+                seen_films.add(film)
+                for other in state.actors_of(film):
+                    if other in parents:
+                        continue
+                    parents[other] = (actor, film, depth + 1)
+                    next_frontier.append(other)
+                    if other in other_parents:
+                        meetings.append(other)
+        return next_frontier, meetings
+
+    def _bidirectional(self, state, source, target, max_hops, deadline):
+        """
+        Parcours en largeur bidirectionnel entre deux numéros d'acteurs
+
+        Returns:
+            tuple: (acteurs, films) du chemin, None si aucun chemin, ou "timeout"
+        """
+        if source == target:
+            return [source], []
+
+        forward = {source: (None, None, 0)}
+        backward = {target: (None, None, 0)}
+        forward_films, backward_films = set(), set()
+        forward_frontier, backward_frontier = [source], [target]
+        depth_forward = depth_backward = 0
+
+        while forward_frontier and backward_frontier and depth_forward + depth_backward < max_hops:
+            if deadline is not None and time.monotonic() > deadline:
+                return "timeout"
+
+            # Étendre le côté dont la frontière est la plus petite
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meetings = self._expand(state, forward_frontier, forward, forward_films, backward)
+                depth_forward += 1
+            else:
+                backward_frontier, meetings = self._expand(state, backward_frontier, backward, backward_films, forward)
+                depth_backward += 1
+
+            if meetings:
+                meeting = min(meetings, key=lambda actor: forward[actor][2] + backward[actor][2])
+                return self._join(forward, backward, meeting)
+        return None
+
+    @staticmethod
+    def _walk(parents, actor):
+        """Remonte les parents d'un acteur jusqu'à l'origine du parcours"""
+        actors, films = [actor], []
+        while parents[actor][0] is not None:
+            actor, film, _ = parents[actor]
+            actors.append(actor)
+            films.append(film)
+        return actors, films
+
+    def _join(self, forward, backward, meeting):
+        """Assemble les deux moitiés d'un chemin autour de l'acteur de rencontre"""
+        head_actors, head_films = self._walk(forward, meeting)
+        tail_actors, tail_films = self._walk(backward, meeting)
+        return head_actors[::-1] + tail_actors[1:], head_films[::-1] + tail_films
+
+    @staticmethod
+    def _path_nodes(state, actors, films):
+        """Chemin au format de query_25 (acteurs et films alternés)"""
+        snapshot = state.snapshot
+        nodes = [{"type": "Actor", "name": snapshot.actor_names[actors[0]]}]
+        for film, actor in zip(films, actors[1:]):
+            nodes.append({"type": "Film", "title": snapshot.film_titles[film]})
+            nodes.append({"type": "Actor", "name": snapshot.actor_names[actor]})
+        return nodes
+
+    def shortest_path(self, actor1_name, actor2_name, max_depth=10, timeout=None):
+        """
+        Plus court chemin entre deux acteurs
+
+        Args:
+            actor1_name (str): Nom du premier acteur
+            actor2_name (str): Nom du deuxième acteur
+            max_depth (int): Nombre maximum de relations du chemin
+            timeout (float): Durée maximale de la recherche en secondes (None pour illimitée)
+
+        Returns:
+            list: Nœuds du chemin ({type, name} ou {type, title}), liste vide si aucun
+                chemin n'est trouvé dans les limites
+        """
+        return self.shortest_paths([(actor1_name, actor2_name)], max_depth, timeout)[0]
+
+    def shortest_paths(self, pairs, max_depth=10, timeout=None):
+        """
+        Plus courts chemins pour plusieurs paires d'acteurs en un appel
+
+        Les paires partageant la même source et assez nombreuses sont résolues par
+        un seul parcours depuis cette source.
+
+        Args:
+            pairs (list): Tuples (acteur1, acteur2)
+            max_depth (int): Nombre maximum de relations par chemin
+            timeout (float): Durée maximale de chaque recherche en secondes
+
+        Returns:
+            list: Un chemin (liste de nœuds, éventuellement vide) par paire, dans l'ordre des paires
+        """
+        state = self._sync()
+        index = state.snapshot.actor_index
+        max_hops = max_depth // 2
+        results = [[] for _ in pairs]
+
+        by_source = defaultdict(list)
+        for position, (actor1, actor2) in enumerate(pairs):
+            if actor1 in index and actor2 in index:
+                by_source[index[actor1]].append((position, index[actor2]))
+
+        for source, targets in by_source.items():
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            if len(targets) >= SINGLE_SOURCE_THRESHOLD:
+                parents = self._single_source(state, source, {target for _, target in targets}, max_hops, deadline)
+                for position, target in targets:
+                    if target in parents:
+                        results[position] = self._path_nodes(state, *(part[::-1] for part in self._walk(parents, target)))
+                continue
+
+            for position, target in targets:
+                found = self._bidirectional(state, source, target, max_hops, deadline)
+                if found == "timeout":
+                    print(f"⚠️ Recherche de chemin interrompue après {timeout} s")
+                elif found:
+                    results[position] = self._path_nodes(state, *found)
+        return results
+
+    def _single_source(self, state, source, targets, max_hops, deadline):
+        """
+        Parcours en largeur depuis une source jusqu'à atteindre toutes les cibles
+
+        Returns:
+            dict: Parents (acteur -> (acteur précédent, film, profondeur)) des acteurs atteints
+        """
+        parents = {source: (None, None, 0)}
+        seen_films = set()
+        frontier = [source]
+        remaining = set(targets) - {source}
+        depth = 0
+        while frontier and remaining and depth < max_hops:
+            if deadline is not None and time.monotonic() > deadline:
+                print("⚠️ Recherche de chemins interrompue (délai dépassé)")
+                break
+            frontier, _ = self._expand(state, frontier, parents, seen_films, {})
+            remaining.difference_update(frontier)
+            depth += 1
+        return parents
+
+    @staticmethod
+    def _distances_from(state, actor):
+        """Degrés de séparation (en acteurs) entre actor et tous les autres, -1 si inaccessible"""
+        matrix = state.matrix
+        distances = np.full(matrix.shape[0], -1, dtype=np.int32)
+        distances[actor] = 0
+        frontier = np.zeros(matrix.shape[0], dtype=bool)
+        frontier[actor] = True
+        depth = 0
+        while frontier.any():
+            depth += 1
+            films = (state.by_film @ frontier) > 0
+            reached = (matrix @ films) > 0
+            frontier = reached & (distances < 0)
+            distances[frontier] = depth
+        return distances
+
+    def build_landmarks(self, count=16):
+        """
+        Précalcule les distances depuis les acteurs les plus connectés
+
+        Args:
+            count (int): Nombre de repères (chaque repère coûte un parcours complet)
+
+        Returns:
+            list: Noms des acteurs choisis comme repères
+        """
+        with self._lock:
+            self._landmark_count = count
+            state = self._build(self.projection.snapshot(), count)
+            self._state = state
+        return [state.snapshot.actor_names[actor] for actor in state.landmarks]
+
+    def separation_bounds(self, actor1_name, actor2_name):
+        """
+        Encadrement des degrés de séparation par les repères (temps constant)
+
+        Returns:
+            tuple: (borne inférieure, borne supérieure), (None, None) sans repère
+                commun aux deux acteurs
+        """
+        state = self._sync()
+        index = state.snapshot.actor_index
+        if state.landmark_distances is None or actor1_name not in index or actor2_name not in index:
+            return None, None
+        d1 = state.landmark_distances[:, index[actor1_name]]
+        d2 = state.landmark_distances[:, index[actor2_name]]
+        both = (d1 >= 0) & (d2 >= 0)
+        if not both.any():
+            return None, None
+        return int(np.abs(d1[both] - d2[both]).max()), int((d1[both] + d2[both]).min())
+
+    def degrees_of_separation(self, actor1_name, actor2_name, max_depth=10, timeout=None, approximate=False):
+        """
+        Nombre de films séparant deux acteurs (1 s'ils ont joué ensemble)
+
+        Args:
+            approximate (bool): Retourner la borne supérieure des repères sans parcours
+
+        Returns:
+            int: Degrés de séparation, ou None si aucun chemin n'est connu
+        """
+        lower, upper = self.separation_bounds(actor1_name, actor2_name)
+        if upper is not None and (approximate or lower == upper):
+            return upper
+        path = self.shortest_path(actor1_name, actor2_name, max_depth, timeout)
+        return len(path) // 2 if path else None
@@ -0,0 +1,437 @@
+"""
+Synchronisation continue de la collection MongoDB 'films' vers le graphe Neo4j.
+
+Le démon lit le change stream de la collection (replica set ou Atlas) et reporte
+les insertions, modifications et suppressions dans Neo4j par lots MERGE/DELETE.
+Sur une instance MongoDB autonome, sans change stream, il interroge périodiquement
+les documents dont le champ updated_at a changé.
+
+Limites du mode polling :
+- seules les écritures qui mettent à jour le champ updated_at sont vues (écritures de
+  MongoDBConnector, ou $set/$currentDate explicite) ; une modification faite par un
+  autre client sans ce champ n'est reportée qu'à la reconstruction du graphe ;
+- les dates updated_at de MongoDBConnector sont prises sur l'horloge du serveur
+  ($$NOW, ou MongoDBConnector.server_time à l'import). Une écriture validée après une
+  écriture plus récente est relue grâce à une marge de POLL_OVERLAP ; au-delà (écriture
+  restée plus longtemps en cours, ou date posée par l'horloge d'un autre client), elle
+  n'est reportée qu'à la reconstruction du graphe ;
+- les suppressions sont retrouvées par une réconciliation périodique (films présents
+  dans Neo4j mais plus dans MongoDB). Elle est suspendue pendant un import
+  (MongoDBConnector.import_running) et ne supprime jamais plus de
+  MAX_RECONCILE_FRACTION des films du graphe en une fois.
+
+Un document qui ne peut pas être reporté (champ manquant ou de type inattendu) est
+copié dans la collection 'sync_dead_letter' avec son erreur, et la synchronisation
+continue.
+
+La position de lecture (resume token du change stream, ou dernier updated_at/_id
+traité) est enregistrée dans la collection 'sync_state' après chaque lot : après
+un arrêt, la synchronisation reprend là où elle s'était arrêtée.
+
+Utilisation :
+    python sync_daemon.py                      # MongoDB et Neo4j locaux
+    python sync_daemon.py --mode poll --interval 5
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from py2neo.errors import ConnectionBroken, ConnectionUnavailable, Neo4jError, ServiceUnavailable
+from pymongo.errors import OperationFailure, PyMongoError
+
+from mongodb_connect import MongoDBConnector
+from neo4j_connect import Neo4jConnector
+
+# Code d'erreur MongoDB : le resume token n'est plus dans l'oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+# Erreurs après lesquelles la synchronisation reprend (connexions rouvertes)
+RETRYABLE_ERRORS = (PyMongoError, Neo4jError, ServiceUnavailable, ConnectionUnavailable, ConnectionBroken, OSError)
+
+# Part maximale des films du graphe supprimée par une réconciliation
+MAX_RECONCILE_FRACTION = 0.2
+
+# Attente maximale (secondes) entre deux tentatives après des erreurs successives
+MAX_BACKOFF = 60.0
+
+# Marge relue avant la position de polling : écritures validées dans le désordre
+POLL_OVERLAP = timedelta(seconds=5)
+
+GRAPH_FILM_IDS_QUERY = "MATCH (f:Film) RETURN f.id AS id"
+
+
+def _utc(value):
+    """Date UTC avec fuseau (MongoDB retourne des dates naïves en UTC)"""
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class FilmSyncDaemon:
+    """
+    Reporte en continu dans Neo4j les changements de la collection 'films'
+
+    Les événements d'un lot sont regroupés par film (le dernier l'emporte) puis
+    appliqués par Neo4jConnector.apply_film_changes. Les écritures étant des
+    MERGE, un lot rejoué après un arrêt avant l'enregistrement de la position
+    ne crée pas de doublon.
+    """
+
+    STATE_ID = "films_to_neo4j"
+
+    def __init__(self, mongo_connector, neo4j_connector, mode="auto", batch_size=500,
+                 max_wait=1.0, poll_interval=2.0):
+        """
+        Args:
+            mongo_connector: Instance de MongoDBConnector
+            neo4j_connector: Instance de Neo4jConnector
+            mode (str): "stream" (change stream), "poll" (champ updated_at) ou "auto"
+                (change stream si le serveur le permet, sinon polling)
+            batch_size (int): Nombre maximum de changements par lot
+            max_wait (float): Attente maximale (secondes) avant d'appliquer un lot incomplet
+            poll_interval (float): Intervalle (secondes) entre deux lectures en mode polling
+        """
+        self.mongo = mongo_connector
+        self.neo4j = neo4j_connector
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.state = mongo_connector.db["sync_state"]
+        # Documents qui n'ont pas pu être reportés, conservés pour correction
+        self.dead_letter = mongo_connector.db["sync_dead_letter"]
+        # Documents déjà appliqués dans la marge de polling : _id -> updated_at
+        self._recent = {}
+        # Date jusqu'à laquelle tous les changements sont appliqués (voir lag)
+        self._synced_through = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {
+            "mode": None,
+            "batches": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "last_event_at": None,
+            "last_applied_at": None,
+            "lag_seconds": 0.0,
+            "errors": 0,
+            "skipped": 0,
+            "reconcile_skipped": 0
+        }
+
+    # Position de lecture
+
+    def load_position(self):
+        """Dernière position enregistrée (resume token ou curseur de polling), ou None"""
+        document = self.state.find_one({"_id": self.STATE_ID})
+        return document.get("position") if document else None
+
+    def save_position(self, position):
+        """Enregistre la position de lecture après l'application d'un lot"""
+        self.state.update_one(
+            {"_id": self.STATE_ID},
+            {"$set": {"position": position, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    # Application des changements
+
+    def _apply(self, changes, event_time):
+        """
+        Applique un lot de changements regroupés par film
+
+        Args:
+            changes (dict): _id -> document complet, ou None pour une suppression
+            event_time (datetime): Date d'écriture du dernier changement du lot dans MongoDB
+        """
+        movies = [document for document in changes.values() if document is not None]
+        deleted = [film_id for film_id, document in changes.items() if document is None]
+        result = self.neo4j.apply_film_changes(movies, deleted, self.batch_size)
+        for document, error in result.get("skipped", []):
+            self._dead_letter(document, error)
+
+        now = datetime.now(timezone.utc)
+        self.metrics["batches"] += 1
+        self.metrics["upserted"] += result["upserted"]
+        self.metrics["deleted"] += result["deleted"]
+        self.metrics["last_applied_at"] = now
+        if event_time is not None:
+            self.metrics["last_event_at"] = event_time
+            self._synced_through = event_time
+        print(f"🔄 Synchronisation : {result['upserted']} films écrits, {result['deleted']} supprimés "
+              f"(retard {self.lag():.1f} s)")
+
+    def _dead_letter(self, document, error):
+        """Copie un document qui n'a pas pu être reporté dans 'sync_dead_letter'"""
+        self.metrics["skipped"] += 1
+        try:
+            self.dead_letter.replace_one(
+                {"_id": document.get("_id")},
+                {"document": document, "error": error, "failed_at": datetime.now(timezone.utc)},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Document {document.get('_id')} non copié dans 'sync_dead_letter': {e}")
+
+    def _caught_up(self):
+        """Signale une lecture sans changement en attente"""
+        self._synced_through = datetime.now(timezone.utc)
+
+    def lag(self):
+        """
+        Retard de la synchronisation en secondes
+
+        Le retard est mesuré depuis la date jusqu'à laquelle tous les changements sont
+        appliqués (date d'écriture du dernier lot, ou dernière lecture sans changement) :
+        il augmente tant que la synchronisation est bloquée (erreurs, base indisponible).
+
+        Returns:
+            float: Retard en secondes, 0 avant la première lecture
+        """
+        if self._synced_through is None:
+            return 0.0
+        lag = max(0.0, (datetime.now(timezone.utc) - self._synced_through).total_seconds())
+        self.metrics["lag_seconds"] = lag
+        return lag
+
+    # Change stream
+
+    def supports_change_streams(self):
+        """Indique si le serveur accepte les change streams (replica set ou mongos)"""
+        try:
+            hello = self.mongo.client.admin.command("hello")
+        except Exception:
+            return False
+        return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    def _run_stream(self):
+        """Lit le change stream et applique les changements par lots"""
+        options = {"full_document": "updateLookup"}
+        position = self.load_position()
+        if isinstance(position, dict) and "_data" in position:
+            options["resume_after"] = position
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+
+        with self.mongo.films.watch(pipeline, **options) as stream:
+            self.metrics["mode"] = "stream"
+            print("✅ Synchronisation par change stream démarrée")
+            while not self._stop.is_set():
+                changes, event_time = {}, None
+                deadline = time.monotonic() + self.max_wait
+                while len(changes) < self.batch_size and time.monotonic() < deadline:
+                    event = stream.try_next()
+                    if event is None:
+                        if changes:
+                            break
+                        time.sleep(0.1)
+                        continue
+                    film_id = event["documentKey"]["_id"]
+                    # Un document déjà supprimé au moment de la lecture est traité comme une suppression
+                    changes[film_id] = event.get("fullDocument") if event["operationType"] != "delete" else None
+                    if "clusterTime" in event:
+                        event_time = datetime.fromtimestamp(event["clusterTime"].time, timezone.utc)
+
+                if changes:
+                    self._apply(changes, event_time)
+                    self.save_position(stream.resume_token)
+                else:
+                    self._caught_up()
+
+    # Polling
+
+    def _poll_once(self, position):
+        """
+        Applique les documents modifiés après la position donnée
+
+        Les documents datés de la marge POLL_OVERLAP qui précède la position sont relus
+        (écriture validée après une écriture plus récente) ; ceux qui ont déjà été
+        appliqués avec la même date sont ignorés.
+
+        Returns:
+            dict: Nouvelle position {"updated_at", "_id"} (inchangée si rien n'a été lu)
+        """
+        field = MongoDBConnector.UPDATED_AT_FIELD
+        projection = Neo4jConnector.MOVIE_PROJECTION | {field: 1}
+        query = {field: {"$ne": None}}
+        late = []
+        if position:
+            query = {"$or": [
+                {field: {"$gt": position["updated_at"]}},
+                {field: position["updated_at"], "_id": {"$gt": position["_id"]}}
+            ]}
+            window = {field: {"$gte": position["updated_at"] - POLL_OVERLAP, "$lte": position["updated_at"]}}
+            late = [document for document in self.mongo.films.find(window, projection)
+                    if self._recent.get(document["_id"]) != document[field]]
+        documents = list(self.mongo.films.find(query, projection)
+                         .sort([(field, 1), ("_id", 1)]).limit(self.batch_size))
+        if not documents and not late:
+            self._caught_up()
+            return position
+
+        changes = {document["_id"]: document for document in late + documents}
+        last = documents[-1] if documents else None
+        self._apply(changes, _utc(last[field]) if last else None)
+        if last:
+            position = {"updated_at": last[field], "_id": last["_id"]}
+        # Mémoire des documents appliqués limitée à la marge
+        for document in changes.values():
+            self._recent[document["_id"]] = document[field]
+        oldest = position["updated_at"] - POLL_OVERLAP
+        self._recent = {film_id: updated_at for film_id, updated_at in self._recent.items()
+                        if updated_at >= oldest}
+        return position
+
+    def _deleted_ids(self):
+        """
+        Films présents dans Neo4j mais plus dans MongoDB (le polling ne voit pas les suppressions)
+
+        Rien n'est retourné pendant un import (la collection est vidée puis remplie), ni
+        si plus de MAX_RECONCILE_FRACTION des films du graphe (et plus d'un) manquent dans
+        MongoDB : une suppression massive est plus probablement une collection vidée ou en
+        cours de rechargement qu'une suite de suppressions, et le graphe doit alors être
+        reconstruit.
+
+        Returns:
+            set: Identifiants des films à supprimer du graphe
+        """
+        if self.mongo.import_running():
+            print("ℹ️ Import en cours : recherche des films supprimés reportée")
+            self.metrics["reconcile_skipped"] += 1
+            return set()
+
+        graph_ids = {row["id"] for row in self.neo4j.graph.run(GRAPH_FILM_IDS_QUERY).data()}
+        mongo_ids = set(self.mongo.films.distinct("_id"))
+        deleted = graph_ids - mongo_ids
+        if len(deleted) > max(1, MAX_RECONCILE_FRACTION * len(graph_ids)):
+            print(f"⚠️ {len(deleted)} films sur {len(graph_ids)} absents de MongoDB : suppression ignorée, "
+                  f"reconstruisez le graphe (Neo4jConnector.build_graph) si elle est voulue")
+            self.metrics["reconcile_skipped"] += 1
+            return set()
+        return deleted
+
+    def _run_poll(self, reconcile_every=30):
+        """
+        Interroge périodiquement les documents modifiés
+
+        Args:
+            reconcile_every (int): Nombre de lectures entre deux recherches de films supprimés
+        """
+        self.metrics["mode"] = "poll"
+        position = self.load_position()
+        if not (isinstance(position, dict) and "updated_at" in position):
+            position = None
+        print("✅ Synchronisation par polling démarrée")
+
+        polls = 0
+        while not self._stop.is_set():
+            new_position = self._poll_once(position)
+            if new_position != position:
+                position = new_position
+                self.save_position(position)
+                # Un lot complet : d'autres documents attendent, pas de pause
+                continue
+
+            polls += 1
+            if polls % reconcile_every == 1:
+                deleted = self._deleted_ids()
+                if deleted:
+                    self._apply(dict.fromkeys(deleted), None)
+            self._stop.wait(self.poll_interval)
+
+    # Boucle principale
+
+    def run(self):
+        """
+        Synchronise jusqu'à l'appel de stop()
+
+        En mode "auto", le polling est utilisé si le serveur n'accepte pas les change
+        streams (instance autonome). Si le resume token a expiré, la position est effacée et le
+        graphe doit être reconstruit (Neo4jConnector.build_graph) avant de reprendre.
+
+        Après une erreur, l'erreur est comptée dans metrics["errors"] et la lecture reprend
+        depuis la dernière position enregistrée, après une attente doublée à chaque erreur
+        successive (au plus MAX_BACKOFF secondes). Pour une erreur MongoDB ou Neo4j
+        (réseau, serveur indisponible, requête refusée), les deux connexions sont
+        vérifiées avant de reprendre ; les autres erreurs n'arrêtent pas non plus le thread.
+        """
+        if not self.mongo.client or not self.neo4j.graph:
+            print("❌ MongoDB et Neo4j doivent être connectés pour la synchronisation")
+            return
+
+        failures = 0
+        batches = self.metrics["batches"]
+        while not self._stop.is_set():
+            try:
+                if self.mode == "auto" and not self.supports_change_streams():
+                    print("ℹ️ Change streams indisponibles (instance autonome), passage en mode polling")
+                    self.mode = "poll"
+                if self.mode == "poll":
+                    self._run_poll()
+                else:
+                    self._run_stream()
+            except Exception as e:
+                if isinstance(e, OperationFailure) and e.code == CHANGE_STREAM_HISTORY_LOST:
+                    print("⚠️ Position de reprise expirée : reconstruisez le graphe, la synchronisation repart de maintenant")
+                    self.state.delete_one({"_id": self.STATE_ID})
+                    continue
+                # Nouvelle tentative depuis la dernière position enregistrée
+                self.metrics["errors"] += 1
+                # Des lots appliqués depuis l'erreur précédente : l'attente repart du minimum
+                failures = 1 if self.metrics["batches"] != batches else failures + 1
+                batches = self.metrics["batches"]
+                print(f"❌ Erreur de synchronisation ({type(e).__name__}): {e}")
+                self._stop.wait(min(MAX_BACKOFF, self.poll_interval * 2 ** (failures - 1)))
+                if isinstance(e, RETRYABLE_ERRORS):
+                    self.mongo.ensure_connected(max_age=0)
+                    self.neo4j.ensure_connected(max_age=0)
+        print("ℹ️ Synchronisation arrêtée")
+
+    def start(self):
+        """
+        Lance la synchronisation dans un thread
+
+        Returns:
+            threading.Thread: Thread de synchronisation
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="film-sync", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=10):
+        """Arrête la synchronisation (le lot en cours est terminé)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronisation continue MongoDB -> Neo4j")
+    parser.add_argument("--mongo-uri", help="Chaîne de connexion MongoDB Atlas (local par défaut)")
+    parser.add_argument("--neo4j-uri", help="URI Neo4j (local par défaut)")
+    parser.add_argument("--neo4j-user")
+    parser.add_argument("--neo4j-password")
+    parser.add_argument("--mode", choices=["auto", "stream", "poll"], default="auto",
+                        help="Lecture des changements : change stream, ou polling du champ updated_at "
+                             "(poll : les écritures qui ne modifient pas updated_at ne sont pas vues, "
+                             "les suppressions sont retrouvées par réconciliation périodique)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=2.0, help="Intervalle de polling en secondes")
+    args = parser.parse_args()
+
+    mongo = MongoDBConnector(connection_string=args.mongo_uri, local=not args.mongo_uri)
+    neo4j = Neo4jConnector(uri=args.neo4j_uri, user=args.neo4j_user, password=args.neo4j_password,
+                           local=not args.neo4j_uri)
+    daemon = FilmSyncDaemon(mongo, neo4j, mode=args.mode, batch_size=args.batch_size,
+                            poll_interval=args.interval)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from neo4j_connect import Neo4jConnector
+from tests.fake_graph import FakeGraph
+
+
+@pytest.fixture
+def graph():
+    return FakeGraph()
+
+
+@pytest.fixture
+def neo4j(graph):
+    """Connecteur Neo4j branché sur le graphe en mémoire"""
+    connector = Neo4jConnector(local=False)
+    connector.graph = graph
+    return connector
@@ -0,0 +1,199 @@
+"""
+Graphe Neo4j en mémoire pour les tests
+
+Chaque requête Cypher du projet utilisée par les tests est reconnue par son texte
+et exécutée sur des dictionnaires Python. Une requête inconnue lève une erreur.
+
+La sémantique du Cypher n'est pas vérifiée ici (les plans des requêtes sont
+contrôlés sur un vrai serveur par queries.index_advisor.GraphIndexAdvisor), mais
+chaque appel est confronté au texte de la requête : paramètres $nom attendus et
+fournis, champs row.x lus dans les lignes d'un UNWIND $rows, et colonnes de la
+clause RETURN finale identiques aux clés des lignes retournées.
+"""
+import re
+
+from neo4j_connect import Neo4jConnector
+import sync_daemon
+from queries import derived_relationships, graph_projection
+
+
+class Cursor:
+    """Résultat d'une requête (itérable, comme un curseur py2neo)"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def data(self):
+        return list(self.rows)
+
+
+def check_query(query, params, rows):
+    """Vérifie la cohérence entre le texte d'une requête, ses paramètres et ses résultats"""
+    expected = set(re.findall(r"\$(\w+)", query))
+    assert expected == set(params), f"paramètres {sorted(params)} au lieu de {sorted(expected)}"
+
+    fields = set(re.findall(r"\brow\.(\w+)", query))
+    for row in params.get("rows", ()):
+        missing = fields - set(row)
+        assert not missing, f"champs {sorted(missing)} absents des lignes transmises"
+
+    returned = query.rsplit("RETURN", 1)[1] if "RETURN" in query else ""
+    columns = re.findall(r"\bAS\s+(\w+)\s*(?:,|$)", returned.strip())
+    for row in rows:
+        assert sorted(row) == sorted(columns), f"colonnes {sorted(row)} au lieu de {sorted(columns)}"
+
+
+class FakeGraph:
+
+    def __init__(self):
+        self.films = {}
+        self.acted = set()       # (acteur, film)
+        self.directed = set()    # (réalisateur, film)
+        self.genres = set()      # (film, genre)
+        self.derived = {}        # (type, source, cible) -> propriétés
+        self.state = None
+        self.clock = 1000
+        self.handlers = {
+            Neo4jConnector.FILM_ROWS_QUERY: self._film_rows,
+            Neo4jConnector.ACTOR_ROWS_QUERY: self._link_rows(self.acted, "actor"),
+            Neo4jConnector.DIRECTOR_ROWS_QUERY: self._link_rows(self.directed, "director"),
+            Neo4jConnector.GENRE_ROWS_QUERY: self._genre_rows,
+            Neo4jConnector.FILM_STALE_LINKS_QUERY: self._stale_links,
+            Neo4jConnector.FILM_DELETE_QUERY: self._delete_films,
+            Neo4jConnector.GRAPH_STATE_WRITE_QUERY: self._write_state,
+            Neo4jConnector.GRAPH_STATE_QUERY: lambda: [{key: value for key, value in row.items() if key != "now"}
+                                                        for row in self._read_state()],
+            graph_projection.GRAPH_STATE_QUERY: self._read_state,
+            graph_projection.EDGES_QUERY: self._edges,
+            graph_projection.CHANGED_FILMS_QUERY: self._changed_films,
+            graph_projection.EDGE_COUNT_QUERY: lambda: [{"edges": len(self.acted)}],
+            derived_relationships.DIRECTED_QUERY: self._directed_films,
+            derived_relationships.CHANGED_FILMS_QUERY: self._changed_directed_films,
+            derived_relationships.FILMS_BY_ID_QUERY: self._directed_films_by_id,
+            derived_relationships.DIRECTED_COUNT_QUERY: lambda: [{"edges": len(self.directed)}],
+            derived_relationships.INFLUENCE_WRITE_QUERY: self._write_derived("INFLUENCE_PAR"),
+            derived_relationships.COMPETITION_WRITE_QUERY: self._write_derived("EN_CONCURRENCE_AVEC"),
+            derived_relationships.DELETE_FOR_DIRECTORS_QUERY: self._delete_derived_for,
+            derived_relationships.DELETE_ALL_QUERY: self._delete_all_derived,
+            sync_daemon.GRAPH_FILM_IDS_QUERY: lambda: [{"id": film_id} for film_id in sorted(self.films)],
+        }
+
+    def run(self, query, **params):
+        # Horloge du serveur (timestamp()), en millisecondes
+        self.clock += 1000
+        handler = self.handlers.get(query)
+        if handler is None:
+            raise NotImplementedError(query)
+        rows = handler(**params) or []
+        check_query(query, params, rows)
+        return Cursor(rows)
+
+    # Écritures (Neo4jConnector)
+
+    def _touch(self, film_id):
+        self.films[film_id]["updated_at"] = self.clock
+
+    def _film_rows(self, rows):
+        for row in rows:
+            film = self.films.setdefault(row["id"], {})
+            film.update({key: value for key, value in row.items() if key != "id"})
+            self._touch(row["id"])
+
+    def _link_rows(self, links, key):
+        def handler(rows):
+            for row in rows:
+                if row["film_id"] in self.films:
+                    links.add((row[key], row["film_id"]))
+                    self._touch(row["film_id"])
+        return handler
+
+    def _genre_rows(self, rows):
+        for row in rows:
+            if row["film_id"] in self.films:
+                self.genres.add((row["film_id"], row["genre"]))
+                self._touch(row["film_id"])
+
+    def _stale_links(self, rows):
+        for row in rows:
+            film_id = row["id"]
+            if film_id not in self.films:
+                continue
+            self.acted -= {(a, f) for a, f in self.acted if f == film_id and a not in row["actors"]}
+            self.directed -= {(d, f) for d, f in self.directed if f == film_id and d not in row["directors"]}
+            self.genres -= {(f, g) for f, g in self.genres if f == film_id and g not in row["genres"]}
+            self._touch(film_id)
+
+    def _delete_films(self, rows):
+        for row in rows:
+            film_id = row["id"]
+            self.films.pop(film_id, None)
+            self.acted -= {(a, f) for a, f in self.acted if f == film_id}
+            self.directed -= {(d, f) for d, f in self.directed if f == film_id}
+            self.genres -= {(f, g) for f, g in self.genres if f == film_id}
+
+    def _write_state(self, deleted):
+        state = self.state or {"writes": 0, "deletes": 0}
+        self.state = {"writes": state["writes"] + 1, "deletes": state["deletes"] + deleted}
+
+    def _read_state(self):
+        state = self.state or {"writes": None, "deletes": None}
+        return [dict(state, now=self.clock)]
+
+    # Écriture directe, sans passer par Neo4jConnector (ni marqueur, ni updated_at)
+
+    def delete_edge(self, actor, film_id):
+        self.acted.discard((actor, film_id))
+
+    # Projection Actor-Film
+
+    def _film_record(self, film_id):
+        film = self.films[film_id]
+        return {"film_id": film_id, "title": film.get("title"), "year": film.get("year"),
+                "votes": film.get("votes")}
+
+    def _edges(self):
+        return [dict(self._film_record(film_id), actor=actor) for actor, film_id in sorted(self.acted)]
+
+    def _changed_films(self, since):
+        return [dict(self._film_record(film_id), actors=[a for a, f in sorted(self.acted) if f == film_id])
+                for film_id, film in sorted(self.films.items()) if film.get("updated_at", 0) >= since]
+
+    # Relations dérivées entre réalisateurs
+
+    def _directed_record(self, film_id):
+        film = self.films[film_id]
+        return {"film_id": film_id, "title": film.get("title"), "year": film.get("year"),
+                "genre": film.get("genre"),
+                "directors": [d for d, f in sorted(self.directed) if f == film_id]}
+
+    def _directed_films(self):
+        return [self._directed_record(film_id) for film_id in sorted({f for _, f in self.directed})]
+
+    def _changed_directed_films(self, since):
+        return [self._directed_record(film_id) for film_id, film in sorted(self.films.items())
+                if film.get("updated_at", 0) >= since]
+
+    def _directed_films_by_id(self, ids):
+        return [self._directed_record(film_id) for film_id in ids if film_id in self.films]
+
+    def _write_derived(self, kind):
+        def handler(rows):
+            for row in rows:
+                properties = {key: value for key, value in row.items() if key not in ("source", "target")}
+                self.derived[(kind, row["source"], row["target"])] = properties
+        return handler
+
+    def _delete_derived_for(self, names):
+        self.derived = {key: value for key, value in self.derived.items()
+                        if key[1] not in names and key[2] not in names}
+
+    def _delete_all_derived(self, limit):
+        deleted = len(self.derived)
+        self.derived = {}
+        return [{"deleted": deleted}]
+
+    def derived_pairs(self, kind):
+        return {(source, target) for k, source, target in self.derived if k == kind}
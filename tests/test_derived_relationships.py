@@ -0,0 +1,106 @@
+from itertools import combinations
+
+from queries.cache import dataset_version, dry_run
+from queries.derived_relationships import DirectorRelationships, split_genres
+
+
+def movie(film_id, director, year, genre):
+    return {"_id": film_id, "title": "Film " + film_id, "year": year, "genre": genre,
+            "Director": director, "Actors": ""}
+
+
+def expected_pairs(graph):
+    """Relations dérivées recalculées naïvement à partir du graphe"""
+    films_of = {}
+    for director, film_id in graph.directed:
+        films_of.setdefault(director, set()).add(film_id)
+    genres = {film_id: split_genres(film.get("genre")) for film_id, film in graph.films.items()}
+
+    influence = set()
+    for d1, d2 in combinations(sorted(films_of), 2):
+        g1 = set().union(*(genres[f] for f in films_of[d1]))
+        g2 = set().union(*(genres[f] for f in films_of[d2]))
+        if g1 | g2 and len(g1 & g2) / len(g1 | g2) > DirectorRelationships.JACCARD_THRESHOLD:
+            influence.add((d1, d2))
+
+    competition = set()
+    for d1 in films_of:
+        for d2 in films_of:
+            if d1 == d2:
+                continue
+            for f1 in films_of[d1]:
+                for f2 in films_of[d2]:
+                    year = graph.films[f1].get("year")
+                    if f1 != f2 and year is not None and year == graph.films[f2].get("year") \
+                            and genres[f1] & genres[f2]:
+                        competition.add((d1, d2))
+    return influence, competition
+
+
+def assert_matches(relationships, graph):
+    influence, competition = expected_pairs(graph)
+    assert set(relationships.influence) == influence == graph.derived_pairs("INFLUENCE_PAR")
+    assert set(relationships.competition) == competition == graph.derived_pairs("EN_CONCURRENCE_AVEC")
+
+
+def test_refresh_follows_genre_and_year_changes(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "Ava", 2000, "Action,Drama"), movie("2", "Ben", 2000, "Action"),
+                              movie("3", "Cy", 2001, "Comedy")])
+    relationships = DirectorRelationships().refresh(graph)
+    assert_matches(relationships, graph)
+    assert ("Ava", "Ben") in relationships.competition
+
+    # Changement d'année et de genre : les anciennes paires ne sont plus valides
+    neo4j.apply_film_changes([movie("2", "Ben", 2001, "Comedy")])
+    relationships.refresh(graph)
+
+    assert_matches(relationships, graph)
+    assert ("Ava", "Ben") not in relationships.competition
+    assert ("Ben", "Cy") in relationships.competition
+
+
+def test_refresh_follows_director_change(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "Ava", 2000, "Action"), movie("2", "Ben", 2000, "Action")])
+    relationships = DirectorRelationships().refresh(graph)
+
+    neo4j.apply_film_changes([movie("2", "Cy", 2000, "Action")])
+    relationships.refresh(graph)
+
+    assert_matches(relationships, graph)
+    assert "Ben" not in relationships.director_films
+
+
+def test_update_films_with_writer_ids(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "Ava", 2000, "Action"), movie("2", "Ben", 2000, "Action"),
+                              movie("3", "Cy", 2000, "Drama")])
+    relationships = DirectorRelationships().refresh(graph)
+
+    result = neo4j.apply_film_changes([movie("3", "Cy", 2000, "Action")], deleted_ids=["2"])
+    affected = relationships.update_films(graph, result["film_ids"], result["deleted_ids"])
+
+    assert affected == {"Ben", "Cy"}
+    assert_matches(relationships, graph)
+
+
+def test_refresh_rebuilds_after_delete(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "Ava", 2000, "Action"), movie("2", "Ben", 2000, "Action")])
+    relationships = DirectorRelationships().refresh(graph)
+
+    neo4j.apply_film_changes(deleted_ids=["2"])
+    neo4j.apply_film_changes([movie("2", "Cy", 2000, "Action")])
+    relationships.refresh(graph)
+
+    assert_matches(relationships, graph)
+
+
+def test_dry_run_does_not_mark_data_changed(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "Ann", 2000, "Drama"), movie("2", "Bob", 2000, "Drama")])
+    version, state = dataset_version("neo4j"), dict(graph.state)
+
+    with dry_run():
+        DirectorRelationships().rebuild(graph)
+        neo4j.mark_data_changed()
+
+    assert dataset_version("neo4j") == version
+    assert graph.state == state
+
@@ -0,0 +1,35 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from queries.frame_transfer import _frame_from_arrow, find_frame
+
+SCHEMA = {"votes": int, "revenue": float, "title": str}
+
+DOCUMENTS = [
+    {"votes": 12, "revenue": "3.5", "title": "A"},
+    {"votes": "7", "revenue": "", "title": 5},
+    {"votes": float("inf"), "revenue": True, "title": None},
+    {"votes": 2.5, "revenue": " 4"},
+    {}
+]
+
+
+def test_fallback_and_arrow_convert_values_the_same_way():
+    collection = mongomock.MongoClient().db.films
+    collection.insert_many([dict(document) for document in DOCUMENTS])
+    fallback = find_frame(collection, schema=SCHEMA)
+
+    # Colonnes telles que retournées par le serveur après _numeric_expression
+    table = pa.table({
+        "votes": pa.array([12.0, 7.0, float("inf"), 2.5, None]),
+        "revenue": pa.array([3.5, None, None, None, None], type=pa.float64()),
+        "title": pa.array(["A", None, None, None, None])
+    })
+    arrow = _frame_from_arrow(table, SCHEMA)
+
+    pd.testing.assert_frame_equal(fallback, arrow)
+    assert fallback["votes"].tolist() == [12, 7, pd.NA, pd.NA, pd.NA]
+    assert np.isnan(fallback["revenue"].to_numpy()[1:]).all()
+    assert fallback["title"].iloc[0] == "A" and fallback["title"].iloc[1:].isna().all()
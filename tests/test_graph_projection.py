@@ -0,0 +1,97 @@
+from queries.graph_projection import CoStarProjection
+
+
+def movie(film_id, title, year, actors, votes=100):
+    return {"_id": film_id, "title": title, "year": year, "Votes": votes,
+            "genre": "Drama", "Director": "Director " + film_id, "Actors": ", ".join(actors)}
+
+
+def projected_edges(projection):
+    matrix = projection.matrix.tocoo()
+    return {(projection.actor_names[a], projection.film_ids[f]) for a, f in zip(matrix.row, matrix.col)}
+
+
+def assert_matches(projection, graph):
+    assert projected_edges(projection) == graph.acted
+    for film_id, film in graph.films.items():
+        index = projection.film_index.get(film_id)
+        if index is not None:
+            assert projection.film_titles[index] == film["title"]
+            assert projection.film_years[index] == film["year"]
+
+
+def test_refresh_adds_films_and_updates_properties(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann", "Bob"]), movie("2", "B", 2001, ["Bob"])])
+    projection = CoStarProjection().load(graph)
+    assert_matches(projection, graph)
+
+    neo4j.apply_film_changes([movie("3", "C", 2002, ["Ann", "Cid"]), movie("1", "A (director's cut)", 2005, ["Ann", "Bob"])])
+    matrix = projection.matrix
+    projection.refresh(graph)
+
+    assert projection.matrix is not matrix
+    assert_matches(projection, graph)
+    assert projection.film_years[projection.film_index["1"]] == 2005
+
+
+def test_refresh_drops_removed_actor(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann", "Bob"]), movie("2", "B", 2001, ["Ann", "Bob"])])
+    projection = CoStarProjection().load(graph)
+    assert len(projection.films_with_costars("Ann")) == 2
+
+    neo4j.apply_film_changes([movie("2", "B", 2001, ["Ann"])])
+    projection.refresh(graph)
+
+    assert_matches(projection, graph)
+    # Bob ne partage plus qu'un film avec Ann
+    assert projection.films_with_costars("Ann") == []
+
+
+def test_refresh_reloads_after_delete(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann"]), movie("2", "B", 2001, ["Bob"])])
+    projection = CoStarProjection().load(graph)
+
+    # Le film supprimé puis recréé reprend le même identifiant avec d'autres acteurs
+    neo4j.apply_film_changes(deleted_ids=["2"])
+    neo4j.apply_film_changes([movie("2", "B2", 2010, ["Cid"])])
+    projection.refresh(graph)
+
+    assert_matches(projection, graph)
+    assert ("Bob", "2") not in projected_edges(projection)
+
+
+def test_refresh_without_change_reads_only_marker(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann"])])
+    projection = CoStarProjection().load(graph)
+    matrix = projection.matrix
+
+    projection.refresh(graph)
+
+    assert projection.matrix is matrix
+
+
+def test_refresh_reloads_when_edge_count_differs(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann", "Bob"])])
+    projection = CoStarProjection().load(graph)
+
+    # Relation supprimée hors de Neo4jConnector, puis autre écriture
+    graph.delete_edge("Bob", "1")
+    neo4j.apply_film_changes([movie("2", "B", 2001, ["Cid"])])
+    projection.refresh(graph)
+
+    assert_matches(projection, graph)
+
+
+def test_refresh_publishes_a_new_snapshot(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann", "Bob"])])
+    projection = CoStarProjection().load(graph)
+    snapshot = projection.snapshot()
+
+    neo4j.apply_film_changes([movie("2", "B", 2001, ["Bob", "Cid"]), movie("1", "A2", 2000, ["Ann"])])
+    projection.refresh(graph)
+
+    # Un lecteur qui a pris l'instantané avant le rafraîchissement le voit inchangé
+    assert projection.snapshot() is not snapshot
+    assert snapshot.film_ids == ["1"] and snapshot.film_titles == ["A"]
+    assert snapshot.actor_names == ["Ann", "Bob"] and snapshot.edge_count == 2
+    assert_matches(projection, graph)
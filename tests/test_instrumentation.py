@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from queries import instrumentation
+from queries.cache import QueryCache, cached_query
+from queries.instrumentation import Instrumentation, instrumented, propagate_context, query_failed
+
+MEASURES = Instrumentation(sample_every=0)
+
+
+class Connector:
+    graph = object()
+
+
+class Queries:
+
+    def __init__(self):
+        self.neo4j = Connector()
+        self.calls = 0
+
+    @cached_query("neo4j", "neo4j", cache=QueryCache())
+    @instrumented("neo4j", "neo4j", instrumentation=MEASURES)
+    def query_fallback(self):
+        self.calls += 1
+        try:
+            raise RuntimeError("serveur indisponible")
+        except Exception:
+            query_failed()
+            return 0
+
+
+def test_reported_failure_is_counted_and_not_cached():
+    MEASURES.reset()
+    queries = Queries()
+
+    assert queries.query_fallback() == 0
+    assert queries.query_fallback() == 0
+
+    assert queries.calls == 2
+    row = MEASURES.query_table().iloc[0]
+    assert row["calls"] == 2 and row["errors"] == 2
+
+
+def test_worker_threads_see_the_calling_query():
+    instrumentation._active.context = context = {"backend": "mongodb", "profile": True}
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            seen = list(pool.map(propagate_context(lambda _: instrumentation._active.context), range(4)))
+    finally:
+        instrumentation._active.context = None
+
+    assert all(value is context for value in seen)
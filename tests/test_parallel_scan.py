@@ -0,0 +1,27 @@
+import mongomock
+
+from queries.parallel_scan import ParallelScan
+
+
+def films(count):
+    collection = mongomock.MongoClient().db.films
+    collection.insert_many([{"_id": i, "year": 1990 + i % 25} for i in range(count)])
+    collection.insert_one({"_id": "sans-annee"})
+    return collection
+
+
+def test_partitions_cover_each_document_once():
+    collection = films(100)
+    scan = ParallelScan(collection, field="year", workers=4)
+
+    bounds = scan.boundaries()
+    sizes = scan.map(len, schema={"year": int})
+
+    assert bounds == sorted(set(bounds)) and len(bounds) > 1
+    assert sum(sizes) == collection.count_documents({})
+
+
+def test_boundaries_split_the_index_evenly():
+    scan = ParallelScan(films(100), workers=2, partitions=4)
+
+    assert scan.boundaries() == [25, 50, 75]
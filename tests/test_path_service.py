@@ -0,0 +1,24 @@
+from queries.graph_projection import CoStarProjection
+from queries.path_service import PathService
+from tests.test_graph_projection import movie
+
+
+def names(path):
+    return [node.get("name") or node.get("title") for node in path]
+
+
+def test_paths_and_landmarks_follow_refreshed_projection(neo4j, graph):
+    neo4j.apply_film_changes([movie("1", "A", 2000, ["Ann", "Bob"]), movie("2", "B", 2001, ["Bob", "Cid"])])
+    projection = CoStarProjection().load(graph)
+    service = PathService(projection)
+    service.build_landmarks(2)
+    assert names(service.shortest_path("Ann", "Cid")) == ["Ann", "A", "Bob", "B", "Cid"]
+    assert service.shortest_path("Ann", "Dan") == []
+
+    neo4j.apply_film_changes([movie("3", "C", 2002, ["Cid", "Dan"])])
+    projection.refresh(graph)
+
+    assert names(service.shortest_path("Ann", "Dan")) == ["Ann", "A", "Bob", "B", "Cid", "C", "Dan"]
+    # Repères recalculés sur le nouvel instantané
+    assert service.separation_bounds("Ann", "Dan") == (1, 3)
+    assert service.degrees_of_separation("Ann", "Dan") == 3
@@ -0,0 +1,108 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+from py2neo.errors import ServiceUnavailable
+
+from mongodb_connect import MongoDBConnector
+from sync_daemon import FilmSyncDaemon
+
+
+@pytest.fixture
+def mongo():
+    return MongoDBConnector(client=mongomock.MongoClient())
+
+
+def movie(film_id):
+    return {"_id": film_id, "title": "Film " + film_id, "year": 2000, "genre": "Drama",
+            "Director": "Ava", "Actors": "Ann", "updated_at": datetime.now(timezone.utc)}
+
+
+def test_reconcile_deletes_missing_films(mongo, neo4j, graph):
+    neo4j.apply_film_changes([movie(str(i)) for i in range(10)])
+    mongo.films.insert_many([movie(str(i)) for i in range(9)])
+
+    assert FilmSyncDaemon(mongo, neo4j)._deleted_ids() == {"9"}
+
+
+def test_reconcile_is_capped(mongo, neo4j, graph):
+    neo4j.apply_film_changes([movie(str(i)) for i in range(10)])
+    mongo.films.insert_many([movie("0")])
+    daemon = FilmSyncDaemon(mongo, neo4j)
+
+    assert daemon._deleted_ids() == set()
+    assert daemon.metrics["reconcile_skipped"] == 1
+
+
+def test_reconcile_waits_for_import(mongo, neo4j, graph):
+    neo4j.apply_film_changes([movie("1"), movie("2")])
+    mongo.films.insert_many([movie("1")])
+    daemon = FilmSyncDaemon(mongo, neo4j)
+
+    mongo.mark_import(True)
+    assert daemon._deleted_ids() == set()
+    mongo.mark_import(False)
+    assert daemon._deleted_ids() == {"2"}
+
+
+@pytest.mark.parametrize("error", [ServiceUnavailable("Neo4j indisponible"), TypeError("donnée inattendue")])
+def test_run_survives_errors(mongo, neo4j, graph, error):
+    mongo.films.insert_one(movie("1"))
+    apply_film_changes = neo4j.apply_film_changes
+    failures = []
+
+    def flaky(*args, **kwargs):
+        if not failures:
+            failures.append(1)
+            raise error
+        return apply_film_changes(*args, **kwargs)
+
+    neo4j.apply_film_changes = flaky
+    daemon = FilmSyncDaemon(mongo, neo4j, mode="poll", poll_interval=0.01)
+    thread = daemon.start()
+    deadline = time.monotonic() + 5
+    while "1" not in graph.films and time.monotonic() < deadline:
+        time.sleep(0.01)
+    daemon.stop()
+
+    assert "1" in graph.films
+    assert daemon.metrics["errors"] == 1
+    assert not thread.is_alive()
+
+
+def test_malformed_document_is_dead_lettered(mongo, neo4j, graph):
+    broken = dict(movie("2"), Actors=["Ann", "Bob"])
+    daemon = FilmSyncDaemon(mongo, neo4j)
+
+    daemon._apply({"1": movie("1"), "2": broken}, None)
+
+    assert "1" in graph.films
+    assert daemon.metrics["skipped"] == 1
+    assert mongo.db["sync_dead_letter"].count_documents({}) == 1
+
+
+def test_poll_rereads_late_writes_in_overlap(mongo, neo4j, graph):
+    now = datetime.now(timezone.utc)
+    mongo.films.insert_one(dict(movie("1"), updated_at=now))
+    daemon = FilmSyncDaemon(mongo, neo4j)
+    position = daemon._poll_once(None)
+
+    # Écriture validée après celle du film 1, mais datée juste avant
+    mongo.films.insert_one(dict(movie("2"), updated_at=now - timedelta(seconds=1)))
+    assert daemon._poll_once(position) == position
+    assert "2" in graph.films
+
+    # Déjà appliqué : rien n'est relu
+    batches = daemon.metrics["batches"]
+    daemon._poll_once(position)
+    assert daemon.metrics["batches"] == batches
+
+
+def test_lag_grows_while_stalled(mongo, neo4j, graph):
+    daemon = FilmSyncDaemon(mongo, neo4j)
+    daemon._apply({"1": movie("1")}, datetime.now(timezone.utc) - timedelta(seconds=30))
+
+    assert daemon.lag() >= 30
+    daemon._synced_through -= timedelta(seconds=60)
+    assert daemon.lag() >= 90